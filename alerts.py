@@ -0,0 +1,417 @@
+"""
+Headless alert engine for large watchlists.
+
+`AlertEngine` keeps, per (symbol, interval), the indicator state as of the
+last bar it evaluated and steps only through bars that arrived since, one
+`_IndicatorState.step` each, so a poll costs a few steps per symbol however
+long the history is. Rules compare each new bar's indicator row with the
+previous bar's and fire on the transition, at most once per bar: a revised
+forming bar is re-evaluated from the state before it, but a rule that
+already fired for that bar stays quiet.
+
+Rules (`RULES`): breakout / breakdown of the 20-bar range, RSI crossing
+into overbought / oversold, and EMA 50/200 golden / death crosses.
+
+Sinks are callables that receive each alert dict:
+- `LogSink`: JSON lines appended to a file
+- `WebhookSink`: POSTs the alert as JSON (`WebhookStub` is a local receiver)
+- `ToastSink`: a numbered buffer each dashboard session reads from
+
+`AlertWatcher` runs the engine from a daemon thread: every `every` seconds
+it downloads the watchlist's new bars in multi-ticker batches, starting at
+the bars the engine has already seen, and evaluates what came in. Symbols
+whose market is closed are skipped after one poll past the close (see
+markets.fresh_until), and symbols whose market is open are polled first.
+`AlertHub` shares one engine and its sinks between the watchers a process
+runs, stopping a watcher once nobody has asked for it for a while.
+
+Configuration from the environment:
+DASHBOARD_ALERT_LOG      JSON lines file (default .alerts/alerts.jsonl)
+DASHBOARD_ALERT_WEBHOOK  URL alerts are POSTed to (off when unset)
+"""
+import json
+import logging
+import os
+import threading
+import time
+import urllib.request
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from bar_store import download_many
+from indicators import INDICATOR_COLUMNS, _IndicatorState
+from markets import fresh_until, is_open
+from telemetry import metrics
+
+ALERT_LOG = os.environ.get(
+    'DASHBOARD_ALERT_LOG',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.alerts', 'alerts.jsonl'),
+)
+RSI_HIGH = 70
+RSI_LOW = 30
+
+logger = logging.getLogger('dashboard.alerts')
+
+# name -> (bars of warm-up before it may fire, test(prev, row), message(prev, row))
+RULES = {
+    'breakout': (
+        20, lambda p, r: r['signal'] == 1 and p['signal'] != 1,
+        lambda p, r: f"closed {r['close']:,.4g} above the 20-bar high {p['res']:,.4g}",
+    ),
+    'breakdown': (
+        20, lambda p, r: r['signal'] == -1 and p['signal'] != -1,
+        lambda p, r: f"closed {r['close']:,.4g} below the 20-bar low {p['sup']:,.4g}",
+    ),
+    'rsi_overbought': (
+        15, lambda p, r: r['rsi'] > RSI_HIGH >= p['rsi'],
+        lambda p, r: f"RSI {r['rsi']:.1f} crossed above {RSI_HIGH}",
+    ),
+    'rsi_oversold': (
+        15, lambda p, r: r['rsi'] < RSI_LOW <= p['rsi'],
+        lambda p, r: f"RSI {r['rsi']:.1f} crossed below {RSI_LOW}",
+    ),
+    'golden_cross': (
+        200, lambda p, r: p['ema50'] <= p['ema200'] and r['ema50'] > r['ema200'],
+        lambda p, r: "EMA 50 crossed above EMA 200",
+    ),
+    'death_cross': (
+        200, lambda p, r: p['ema50'] >= p['ema200'] and r['ema50'] < r['ema200'],
+        lambda p, r: "EMA 50 crossed below EMA 200",
+    ),
+}
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🔔 ENGINE
+# ═══════════════════════════════════════════════════════════════
+class _Watch:
+    """Incremental state of one (symbol, interval)"""
+    __slots__ = ('state', 'before_last', 'last_stamp', 'last_bar', 'prev_row', 'row', 'count', 'fired')
+
+    def __init__(self):
+        self.state = _IndicatorState()
+        self.before_last = None  # state before the last bar, to re-apply a revision of it
+        self.last_stamp = None
+        self.last_bar = None
+        self.prev_row = None  # row before the last bar
+        self.row = None
+        self.count = 0
+        self.fired = {}  # rule -> timestamp of the bar it last fired on
+
+
+class AlertEngine:
+    """
+    Rule evaluation over newly arrived bars, with pluggable sinks
+
+    The first `evaluate` of a symbol only seeds its state from the history
+    given: alerts are for bars that arrive after the engine started watching.
+    """
+
+    def __init__(self, rules=None, sinks=()):
+        self.rules = {name: RULES[name] for name in (rules or RULES)}
+        self.sinks = list(sinks)
+        self._watches = {}
+        self._lock = threading.Lock()
+
+    def last_stamp(self, symbol, interval):
+        """Timestamp of the newest bar evaluated for the pair, or None"""
+        watch = self._watches.get((symbol, interval))
+        return None if watch is None else watch.last_stamp
+
+    def evaluate(self, symbol, interval, bars):
+        """
+        Step through the bars of `bars` not evaluated yet and return the alerts they fired
+
+        `bars` is a normalized bar frame (UTC index, high/low/close columns)
+        that reaches back at least to the last bar evaluated; a top-up
+        download starting there is enough. A history that no longer lines
+        up re-seeds the pair without alerting.
+        """
+        if bars.empty:
+            return []
+        with self._lock:
+            key = (symbol, interval)
+            watch = self._watches.get(key)
+            seeding = watch is None or watch.last_stamp is None
+            if not seeding:
+                pos = int(bars.index.searchsorted(watch.last_stamp))
+                if pos >= len(bars) or bars.index[pos] != watch.last_stamp:
+                    seeding = True
+            if seeding:
+                watch = self._watches[key] = _Watch()
+                pos = 0
+            high = bars['high'].to_numpy(dtype=float)[pos:]
+            low = bars['low'].to_numpy(dtype=float)[pos:]
+            close = bars['close'].to_numpy(dtype=float)[pos:]
+            if not seeding:
+                if len(close) == 1 and (high[0], low[0], close[0]) == watch.last_bar:
+                    return []  # nothing new, nothing revised
+                # Re-apply the last evaluated bar: it may have been revised
+                watch.state, watch.row = watch.before_last, watch.prev_row
+                watch.count -= 1
+
+            alerts = []
+            last = len(close) - 1
+            for i in range(len(close)):
+                if i == last:
+                    watch.before_last = watch.state.clone()
+                    watch.last_bar = (high[i], low[i], close[i])
+                values = watch.state.step(high[i], low[i], close[i])
+                watch.count += 1
+                if seeding and i < last - 1:
+                    continue  # seeding only needs the rows of the last two bars
+                row = dict(zip(INDICATOR_COLUMNS, values))
+                row['close'] = close[i]
+                watch.prev_row, watch.row = watch.row, row
+                if not seeding and watch.prev_row is not None:
+                    alerts.extend(self._check(symbol, interval, bars.index[pos + i], watch))
+            watch.last_stamp = bars.index[-1]
+
+        for alert in alerts:
+            self._dispatch(alert)
+        return alerts
+
+    def _check(self, symbol, interval, stamp, watch):
+        fired = []
+        for name, (warmup, test, message) in self.rules.items():
+            if watch.count <= warmup or watch.fired.get(name) == stamp:
+                continue
+            if test(watch.prev_row, watch.row):
+                watch.fired[name] = stamp
+                fired.append({
+                    'symbol': symbol, 'interval': interval, 'rule': name,
+                    'time': pd.Timestamp(stamp).isoformat(), 'close': float(watch.row['close']),
+                    'message': message(watch.prev_row, watch.row),
+                })
+        return fired
+
+    def _dispatch(self, alert):
+        metrics().count('alerts', rule=alert['rule'])
+        for sink in self.sinks:
+            try:
+                sink(alert)
+            except Exception:
+                metrics().count('alert_sink_failures', sink=type(sink).__name__)
+                logger.exception("Alert sink %s failed", type(sink).__name__)
+
+
+# ═══════════════════════════════════════════════════════════════
+# 📤 SINKS
+# ═══════════════════════════════════════════════════════════════
+class LogSink:
+    """Appends each alert as one JSON line"""
+
+    def __init__(self, path=ALERT_LOG):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, alert):
+        line = json.dumps(alert, ensure_ascii=False)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+
+class WebhookSink:
+    """POSTs each alert as a JSON body to `url`"""
+
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+
+    def __call__(self, alert):
+        request = urllib.request.Request(
+            self.url, data=json.dumps(alert).encode(), method='POST',
+            headers={'Content-Type': 'application/json'},
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class ToastSink:
+    """
+    The last `keep` alerts, numbered so each reader can ask for what is new
+
+    Every dashboard session remembers the last number it showed and calls
+    `since(number)` on its next run.
+    """
+
+    def __init__(self, keep=200):
+        self.seq = 0
+        self._alerts = deque(maxlen=keep)  # (seq, alert)
+        self._lock = threading.Lock()
+
+    def __call__(self, alert):
+        with self._lock:
+            self.seq += 1
+            self._alerts.append((self.seq, alert))
+
+    def since(self, seq):
+        """[(seq, alert)] numbered after `seq`, oldest first"""
+        with self._lock:
+            return [(n, alert) for n, alert in self._alerts if n > seq]
+
+
+class WebhookStub:
+    """
+    Local HTTP receiver for `WebhookSink`, for trying alerts without a real endpoint
+
+    Keeps the last `keep` JSON bodies it was sent in `received`.
+    """
+
+    def __init__(self, port=0, host='127.0.0.1', keep=200):
+        self.received = deque(maxlen=keep)
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                try:
+                    stub.received.append(json.loads(body))
+                    self.send_response(204)
+                except ValueError:
+                    self.send_response(400)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.url = f"http://{host}:{self.server.server_address[1]}/"
+        threading.Thread(target=self.server.serve_forever, name='webhook-stub', daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def sinks_from_env():
+    """LogSink, plus a WebhookSink when DASHBOARD_ALERT_WEBHOOK is set"""
+    sinks = [LogSink()]
+    url = os.environ.get('DASHBOARD_ALERT_WEBHOOK')
+    if url:
+        sinks.append(WebhookSink(url))
+    return sinks
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🛰️ WATCHER
+# ═══════════════════════════════════════════════════════════════
+class AlertWatcher:
+    """
+    Polls a watchlist for new bars and feeds them to an `AlertEngine`
+
+    Symbols the engine has not seen are downloaded once for `period` to
+    seed their state; after that each chunk is topped up from the oldest
+    of its symbols' last evaluated bars, so only new bars cross the wire.
+    With `calendar`, a symbol is only polled again once its last poll has
+    gone stale under its market's hours.
+    """
+
+    def __init__(self, engine, symbols, interval='5m', period='5d', every=60, chunk_size=200, idle=None,
+                 calendar=True):
+        self.engine = engine
+        self.symbols = list(dict.fromkeys(symbols))
+        self.interval = interval
+        self.period = period
+        self.every = every
+        self.chunk_size = chunk_size
+        self.idle = idle  # stop after this many seconds without a `touch` (None: run until stopped)
+        self.calendar = calendar
+        self.polls = 0
+        self._polled = {}  # symbol -> time of its last top-up
+        self.last_seen = time.time()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'alerts-{interval}', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    @property
+    def alive(self):
+        return self._thread.is_alive()
+
+    def stop(self):
+        self._stopped.set()
+
+    def touch(self):
+        self.last_seen = time.time()
+
+    def due(self, now=None):
+        """Symbols to top up in this poll, those whose market is open first"""
+        now = time.time() if now is None else now
+        if not self.calendar:
+            return list(self.symbols)
+        due = [sym for sym in self.symbols
+               if sym not in self._polled or now >= fresh_until(sym, self._polled[sym], self.every)]
+        return sorted(due, key=lambda sym: not is_open(sym, now))
+
+    def poll(self):
+        """One pass over the watchlist; returns the alerts it fired"""
+        now = time.time()
+        due = self.due(now)
+        if len(due) < len(self.symbols):
+            metrics().count('alert_poll_skipped', len(self.symbols) - len(due), interval=self.interval)
+        seen = {sym: self.engine.last_stamp(sym, self.interval) for sym in due}
+        groups = (
+            [sym for sym, stamp in seen.items() if stamp is None],
+            [sym for sym, stamp in seen.items() if stamp is not None],
+        )
+        alerts = []
+        with metrics().span('alert_poll', interval=self.interval) as s:
+            for group in groups:
+                for i in range(0, len(group), self.chunk_size):
+                    chunk = group[i:i + self.chunk_size]
+                    if seen[chunk[0]] is None:
+                        window = {'period': self.period}
+                    else:
+                        window = {'start': min(seen[sym] for sym in chunk)}
+                    for symbol, bars in download_many(chunk, self.interval, **window).items():
+                        alerts.extend(self.engine.evaluate(symbol, self.interval, bars))
+                    self._polled.update(dict.fromkeys(chunk, now))
+            s['rows'] = len(due)
+        self.polls += 1
+        return alerts
+
+    def _run(self):
+        while not self._stopped.is_set():
+            if self.idle is not None and time.time() - self.last_seen > self.idle:
+                return
+            try:
+                self.poll()
+            except Exception:
+                metrics().count('alert_poll_failures', interval=self.interval)
+                logger.exception("Alert poll failed")
+            self._stopped.wait(self.every)
+
+
+class AlertHub:
+    """One engine, its sinks and the running watchers of a process, keyed by (name, interval)"""
+
+    def __init__(self, sinks=(), every=60, idle=600, calendar=True):
+        self.toasts = ToastSink()
+        self.engine = AlertEngine(sinks=[self.toasts, *sinks])
+        self.every = every
+        self.idle = idle
+        self.calendar = calendar
+        self._watchers = {}
+        self._lock = threading.Lock()
+
+    def watch(self, name, symbols, interval, period):
+        """Start (or keep alive) the watcher for a named watchlist"""
+        with self._lock:
+            watcher = self._watchers.get((name, interval))
+            if watcher is None or not watcher.alive:
+                watcher = AlertWatcher(self.engine, symbols, interval, period, every=self.every,
+                                       idle=self.idle, calendar=self.calendar).start()
+                self._watchers[(name, interval)] = watcher
+            watcher.touch()
+            return watcher
+
+    def watchers(self):
+        with self._lock:
+            return {key: w for key, w in self._watchers.items() if w.alive}
@@ -1,10 +1,26 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import numpy as np
-from lightweight_charts.widgets import StreamlitChart
+import time
 from streamlit_autorefresh import st_autorefresh
-from datetime import datetime
+from datetime import datetime, timedelta
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from bar_store import load_bars_many
+from payload import build_payload, set_series, sparkline_svg
+from charts import load_chart, new_chart, render_full_chart, render_main_chart
+from shared_cache import shared_cache
+from telemetry import metrics, setup_from_env
+from live import attach_live, start_from_env, stream_url
+from downsample import DEFAULT_BUDGET, bucket_payload, lttb_payload
+from bar_cache import bar_cache
+from layouts import LayoutStore
+from alerts import AlertHub, sinks_from_env
+from providers import provider
+from fetch_client import fetch_client
+from pro_data import (TIMEFRAME_INTERVALS, TIMEFRAME_PERIODS, background_refresher, invalidate_pro_data,
+                      load_pro_data, warm_pro_data, watch_pro_data)
+# Page-only modules (plotly, scanner, backtest, correlation, universe) are imported where their page or
+# expander runs, so a cold start and a fresh session's first run only load what the shown page needs
 
 # ══════
 # UI JA
@@ -139,9 +155,6 @@ st.markdown("""
     <div class="animated-bg"></div>
     """, unsafe_allow_html=True)
 
-# Auto-refresh every 2 minutes
-st_autorefresh(interval=120000, key="dashboard_refresh")
-
 # ═══════════════════════════════════════════════════════════════
 # 💾 SYSTEM STATE
 # ═══════════════════════════════════════════════════════════════
@@ -149,8 +162,9 @@ if 'lang' not in st.session_state:
     st.session_state.lang = 'TH'
 if 'selected_stock' not in st.session_state: 
     st.session_state.selected_stock = "AAPL"
-if 'last_update' not in st.session_state:
-    st.session_state.last_update = None
+# Oldest data shown in this run and when the first of it goes stale; drive the freshness indicator
+st.session_state.last_update = None
+st.session_state.fresh_until = None
 
 def t(th, en): 
     return th if st.session_state.lang == 'TH' else en
@@ -175,148 +189,196 @@ ASSET_GROUPS = {
 }
 ALL_SYMBOLS = [s for sub in ASSET_GROUPS.values() for s in sub]
 
+RANGE_STEPS = {'5min': timedelta(minutes=5), '15min': timedelta(minutes=15),
+               '1hour': timedelta(hours=1), '1day': timedelta(days=1)}
+
 # ═══════════════════════════════════════════════════════════════
 # 📊 DATA ENGINE - IMPROVED ERROR HANDLING
 # ═══════════════════════════════════════════════════════════════
-@st.cache_data(ttl=110)
-def get_pro_data(symbol, timeframe):
-    """
-    Fetch and process market data with comprehensive error handling
-    
-    Improvements:
-    - Better error handling with specific error messages
-    - Data validation
-    - Safer timezone handling
-    - Division by zero protection for RSI calculation
-    """
-    tf_map = {'5min': '5m', '15min': '15m', '1hour': '1h', '1day': '1d'}
-    interval = tf_map.get(timeframe, '1d')
-    
-    period_map = {'5min': '5d', '15min': '5d', '1hour': '1mo', '1day': '6mo'}
-    period = period_map.get(timeframe, '6mo')
-    
+GRID_MAX_SIDE = 8  # up to an 8×8 wall
+GRID_SPARKLINE_ABOVE = 9  # 'Auto' mode draws sparklines once a wall has more panels than this
+GRID_PANEL_REFRESH = timedelta(minutes=2)
+AUTO_REFRESH = timedelta(minutes=2)  # Single Asset and Correlation views
+CORRELATION_MAX_SYMBOLS = 500
+
+@st.cache_resource(show_spinner=False)
+def start_telemetry():
+    """JSON span logs and the /metrics endpoint, once per process (see telemetry.py)"""
+    registry = metrics()
+    registry.add_collector('shared_cache', lambda: shared_cache().stats)
+    registry.add_collector('refresher', lambda: background_refresher().stats)
+    registry.add_collector('bar_cache', lambda: bar_cache().stats)
+    registry.add_collector('fetch', lambda: fetch_client().stats)
+    return setup_from_env(registry)
+
+@st.cache_resource(show_spinner=False)
+def get_live_hub():
+    """Live-mode streams and their SSE endpoint, once per process (see live.py)"""
+    return start_from_env(TIMEFRAME_INTERVALS, TIMEFRAME_PERIODS)
+
+@st.cache_resource(show_spinner=False)
+def get_alert_hub():
+    """Alert engine, its sinks and the watched watchlists, once per process (see alerts.py)"""
+    return AlertHub(sinks_from_env(), calendar=provider().mode != 'replay')
+
+def watchlist_tickers(source):
+    """Tickers of an asset group or of a universe file"""
+    if source in ASSET_GROUPS:
+        return list(ASSET_GROUPS[source])
+    from universe import load_universe, universe_files
+    return [ticker for _, _, ticker in load_universe(universe_files()[source])]
+
+def live_url(symbol, timeframe, payload):
+    """Stream URL for a chart drawn from `payload`, or None when live mode is off"""
+    if not live_mode:
+        return None
     try:
-        # Download data
-        df = yf.download(symbol, interval=interval, period=period, progress=False, auto_adjust=False)
-        
-        # Validate data
-        if df.empty:
-            st.warning(f"⚠️ No data available for {symbol}")
-            return pd.DataFrame()
-        
-        # Handle MultiIndex columns
-        if isinstance(df.columns, pd.MultiIndex):
-            df.columns = df.columns.get_level_values(0)
-        
-        df.columns = df.columns.str.lower()
-        
-        # Timezone handling
-        if isinstance(df.index, pd.DatetimeIndex):
-            if df.index.tz is None:
-                df.index = df.index.tz_localize('UTC')
-            df.index = df.index.tz_convert('Asia/Bangkok')
-        
-        # Reset index
-        df = df.reset_index()
-        df.rename(columns={'Datetime': 'time', 'Date': 'time'}, inplace=True)
-        df['time'] = df['time'].apply(lambda x: x.strftime('%Y-%m-%d %H:%M:%S'))
-        
-        # === TECHNICAL INDICATORS ===
-        
-        # EMAs
-        df['ema50'] = df['close'].ewm(span=50, adjust=False).mean()
-        df['ema200'] = df['close'].ewm(span=200, adjust=False).mean()
-        
-        # Bollinger Bands
-        df['sma20'] = df['close'].rolling(window=20).mean()
-        df['std20'] = df['close'].rolling(window=20).std()
-        df['bb_up'] = df['sma20'] + (df['std20'] * 2)
-        df['bb_low'] = df['sma20'] - (df['std20'] * 2)
-        
-        # RSI - with division by zero protection
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        
-        # Avoid division by zero
-        rs = gain / loss.replace(0, np.nan)
-        df['rsi'] = 100 - (100 / (1 + rs))
-        df['rsi'].fillna(50, inplace=True)  # Fill NaN with neutral 50
-        
-        # MACD
-        df['macd_line'] = df['close'].ewm(span=12, adjust=False).mean() - df['close'].ewm(span=26, adjust=False).mean()
-        df['macd_signal'] = df['macd_line'].ewm(span=9, adjust=False).mean()
-        df['macd_hist'] = df['macd_line'] - df['macd_signal']
-        
-        # Support/Resistance
-        df['res'] = df['high'].rolling(window=20).max()
-        df['sup'] = df['low'].rolling(window=20).min()
-        
-        # Trading signals
-        df['signal'] = 0
-        df.loc[df['close'] > df['res'].shift(1), 'signal'] = 1
-        df.loc[df['close'] < df['sup'].shift(1), 'signal'] = -1
-        
-        # Strategy returns
-        df['cum_ret'] = (1 + (df['signal'].shift(1) * df['close'].pct_change()).fillna(0)).cumprod() - 1
-        
-        # Update last update time
-        st.session_state.last_update = datetime.now()
-        
-        return df.dropna().tail(300)
-        
-    except Exception as e:
-        st.error(f"❌ Error fetching data for {symbol}: {str(e)}")
-        return pd.DataFrame()
+        _, base_url = get_live_hub()
+    except OSError as e:
+        st.warning(f"⚠️ {t('เปิดโหมดสดไม่ได้', 'Live mode unavailable')}: {e}")
+        return None
+    return stream_url(base_url, symbol, timeframe, payload['time'][-1])
+
+def note_fetched_at(df, symbol):
+    """Track the oldest frame shown in this run, and the earliest time one of them goes stale"""
+    stamp = df.attrs.get('fetched_at')
+    if not stamp:
+        return
+    if isinstance(stamp, datetime):  # cached before the stamp became epoch seconds
+        stamp = stamp.timestamp()
+    fetched_at = datetime.fromtimestamp(stamp)
+    if st.session_state.last_update is None or fetched_at < st.session_state.last_update:
+        st.session_state.last_update = fetched_at
+    expires = background_refresher().expires(symbol)
+    until = expires(stamp) if expires else stamp + shared_cache().ttl
+    if st.session_state.fresh_until is None or until < st.session_state.fresh_until:
+        st.session_state.fresh_until = until
+
+@st.cache_resource(show_spinner=False)
+def get_layout_store():
+    """Saved grid layouts (see layouts.py)"""
+    return LayoutStore()
+
+@st.cache_resource(show_spinner=False)
+def get_symbol_index():
+    """Index of every symbol in the regional CSVs, built once and shared by all sessions"""
+    from universe import SymbolIndex
+    return SymbolIndex.build()
+
+def show_load_problem(problem):
+    """Render a (level, message) problem from load_pro_data in the current container"""
+    if problem:
+        level, message = problem
+        getattr(st, level)(message)
+
+def get_pro_data(symbol, timeframe, long_history=False):
+    """Load one symbol and report any problem where the caller is rendering"""
+    watch_pro_data(symbol, timeframe, long_history)
+    metrics().count('cache_requests', layer='process', symbol=symbol, timeframe=timeframe)
+    df, problem = load_pro_data(symbol, timeframe, long_history)
+    show_load_problem(problem)
+    note_fetched_at(df, symbol)
+    return df
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_watchlist_closes(tickers, timeframe):
+    """Aligned closes of a whole watchlist, fetched in multi-ticker batches through the bar store"""
+    from correlation import align_closes
+    with metrics().span('watchlist_fetch', timeframe=timeframe) as s:
+        frames = load_bars_many(list(tickers), TIMEFRAME_INTERVALS[timeframe], TIMEFRAME_PERIODS[timeframe])
+        s['rows'] = sum(len(df) for df in frames.values())
+    return align_closes(frames)
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def get_correlation(tickers, timeframe, window):
+    """Rolling correlation state per watchlist, shared by all sessions and updated bar by bar"""
+    from correlation import RollingCorrelation
+    return RollingCorrelation(window)
+
+start_telemetry()
 
 # ═══════════════════════════════════════════════════════════════
-# 📊 CHART RENDERING FUNCTIONS
+# 🧱 GRID PANELS
 # ═══════════════════════════════════════════════════════════════
-def render_main_chart(chart_obj, data):
-    """Render main price chart with price-related indicators"""
-    try:
-        chart_obj.legend(visible=True, font_size=12, font_family='SF Pro Display, Segoe UI, sans-serif')
-        chart_obj.set(data)
-        
-        if show_vol:
-            v = chart_obj.create_histogram(name='Volume', color='rgba(102, 126, 234, 0.3)')
-            v.set(data[['time', 'volume']].rename(columns={'volume': 'Volume'}))
-        
-        if show_bb:
-            chart_obj.create_line(name='BB Upper', color='rgba(147, 197, 253, 0.6)').set(
-                data[['time', 'bb_up']].rename(columns={'bb_up': 'BB Upper'}))
-            chart_obj.create_line(name='BB Lower', color='rgba(147, 197, 253, 0.6)').set(
-                data[['time', 'bb_low']].rename(columns={'bb_low': 'BB Lower'}))
-        
-        if show_ema50:
-            chart_obj.create_line(name='EMA 50', color='#fbbf24', width=2).set(
-                data[['time', 'ema50']].rename(columns={'ema50': 'EMA 50'}))
-        
-        if show_ema200:
-            chart_obj.create_line(name='EMA 200', color='#a855f7', width=2).set(
-                data[['time', 'ema200']].rename(columns={'ema200': 'EMA 200'}))
-    except Exception as e:
-        st.error(f"Chart rendering error: {str(e)}")
+def grid_default(i):
+    return ALL_SYMBOLS[i % len(ALL_SYMBOLS)]
 
-def render_full_chart(chart_obj, data):
-    """Render simplified chart for grid view"""
-    try:
-        chart_obj.legend(visible=True, font_size=11, font_family='SF Pro Display, Segoe UI, sans-serif')
-        chart_obj.set(data)
-        
-        if show_vol:
-            v = chart_obj.create_histogram(name='Volume', color='rgba(102, 126, 234, 0.3)')
-            v.set(data[['time', 'volume']].rename(columns={'volume': 'Volume'}))
-        
-        if show_ema50:
-            chart_obj.create_line(name='EMA 50', color='#fbbf24', width=2).set(
-                data[['time', 'ema50']].rename(columns={'ema50': 'EMA 50'}))
-        
-        if show_ema200:
-            chart_obj.create_line(name='EMA 200', color='#a855f7', width=2).set(
-                data[['time', 'ema200']].rename(columns={'ema200': 'EMA 200'}))
-    except Exception as e:
-        st.error(f"Grid chart error: {str(e)}")
+def grid_symbols(count):
+    """Symbol of each of the first `count` panels"""
+    return [st.session_state.get(f"grid_sel_{i}", grid_default(i)) for i in range(count)]
+
+def apply_grid_layout(name):
+    """Button callback: load a saved layout into the grid widgets"""
+    layout = get_layout_store().load().get(name)
+    if layout:
+        st.session_state.grid_rows = layout['rows']
+        st.session_state.grid_cols = layout['cols']
+        for i, sym in enumerate(layout['symbols']):
+            st.session_state[f"grid_sel_{i}"] = sym
+
+def fill_grid(tickers, count):
+    """Button callback: put the first `count` tickers of a watchlist into the panels"""
+    for i, sym in enumerate(tickers[:count]):
+        st.session_state[f"grid_sel_{i}"] = sym
+
+def grid_panel(i, timeframe, height, sparkline):
+    """
+    One grid panel, rerun on its own (a fragment)
+    
+    Changing its symbol, opening its chart or its periodic refresh reruns
+    only this panel; in live mode the stream updates the chart instead of
+    the refresh. In sparkline mode the full chart is only built once
+    the panel is opened.
+    """
+    key = f"grid_sel_{i}"
+    if key not in st.session_state:
+        st.session_state[key] = grid_default(i)
+    current = st.session_state[key]
+    options = ALL_SYMBOLS if current in ALL_SYMBOLS else ALL_SYMBOLS + [current]
+    sel = st.selectbox(t("สัญลักษณ์", "Symbol"), options, key=key, label_visibility="collapsed",
+                       accept_new_options=True)
+    
+    d = get_pro_data(sel, timeframe)
+    if d.empty:
+        st.warning(f"⚠️ {t('ไม่สามารถโหลด', 'Cannot load')} {sel}")
+        return
+    
+    curr_price = d['close'].iloc[-1]
+    prev_price = d['close'].iloc[-2] if len(d) > 1 else curr_price
+    change = ((curr_price - prev_price) / prev_price) * 100 if prev_price != 0 else 0
+    
+    # Compact Price Display
+    st.markdown(f"""
+        <div style='background: rgba(255,255,255,0.05); padding: 8px 12px; border-radius: 8px; margin-bottom: 8px;'>
+            <div style='display: flex; justify-content: space-between; align-items: center;'>
+                <span style='font-weight: 600; font-size: 0.95em;'>{sel}</span>
+                <span style='font-size: 1.1em; font-weight: 700; color: {"#10b981" if change >= 0 else "#ef4444"};'>
+                    ${curr_price:,.2f} <span style='font-size: 0.75em;'>({change:+.2f}%)</span>
+                </span>
+            </div>
+        </div>
+    """, unsafe_allow_html=True)
+    
+    opened = f"grid_open_{i}"
+    if sparkline and not st.session_state.get(opened):
+        closes = d['close'].to_numpy()
+        color = "#10b981" if closes[-1] >= closes[0] else "#ef4444"
+        st.markdown(sparkline_svg(closes, color), unsafe_allow_html=True)
+        st.button(f"🔍 {t('เปิดกราฟ', 'Open chart')}", key=f"grid_open_btn_{i}", use_container_width=True,
+                  on_click=st.session_state.__setitem__, args=(opened, True))
+        return
+    
+    if sparkline:
+        st.button(f"✕ {t('ย่อ', 'Collapse')}", key=f"grid_close_btn_{i}", use_container_width=True,
+                  on_click=st.session_state.__setitem__, args=(opened, False))
+    
+    c = new_chart(height)
+    grid_payload = build_payload(d)
+    series = render_full_chart(c, grid_payload, volume=show_vol, ema50=show_ema50, ema200=show_ema200)
+    url = live_url(sel, timeframe, grid_payload)
+    if url:
+        attach_live(c, series, url)
+    load_chart(c, 'grid')
 
 # ═══════════════════════════════════════════════════════════════
 # 🎨 SIDEBAR
@@ -333,12 +395,8 @@ with st.sidebar:
     
     # Language Toggle
     col1, col2 = st.columns(2)
-    if col1.button("🇹🇭 ไทย", use_container_width=True): 
-        st.session_state.lang = 'TH'
-        st.rerun()
-    if col2.button("🇺🇸 EN", use_container_width=True): 
-        st.session_state.lang = 'EN'
-        st.rerun()
+    col1.button("🇹🇭 ไทย", use_container_width=True, on_click=st.session_state.__setitem__, args=('lang', 'TH'))
+    col2.button("🇺🇸 EN", use_container_width=True, on_click=st.session_state.__setitem__, args=('lang', 'EN'))
     
     st.markdown("<br>", unsafe_allow_html=True)
     
@@ -347,7 +405,9 @@ with st.sidebar:
     page = st.radio(
         "",
         [t("🔍 วิเคราะห์รายตัว", "🔍 Single Asset"), 
-         t("📊 กระดาน 4 จอ", "📊 Multi-View Grid")],
+         t("📊 กระดานหลายจอ", "📊 Multi-View Grid"),
+         t("🛰️ สแกนทั้งตลาด", "🛰️ Market Scanner"),
+         t("🔗 สหสัมพันธ์", "🔗 Correlation")],
         label_visibility="collapsed"
     )
     
@@ -356,6 +416,10 @@ with st.sidebar:
     # Timeframe
     st.markdown(f"### {t('⏰ ช่วงเวลา', '⏰ Timeframe')}")
     timeframe = st.selectbox("", ['5min', '15min', '1hour', '1day'], index=0, label_visibility="collapsed")
+    live_mode = st.checkbox(t("🔴 โหมดสด (สตรีมแท่งใหม่เข้ากราฟ)", "🔴 Live mode (stream new bars into the charts)"),
+                            key='live_mode')
+    long_history = st.checkbox(t("📜 ประวัติยาว (ย่อตามความกว้างกราฟ)", "📜 Long history (downsampled to chart width)"),
+                               key='long_history')
     
     st.markdown("<br>", unsafe_allow_html=True)
     
@@ -373,27 +437,103 @@ with st.sidebar:
     
     # Asset Selection
     st.markdown(f"### {t('🎯 เลือกสินทรัพย์', '🎯 Select Asset')}")
+    
+    # Search across every exchange CSV; the index is only built on first use
+    query = st.text_input(t("🔎 ค้นหาหุ้น", "🔎 Search symbol"), key="symbol_query",
+                          placeholder="AAPL, PTT.BK, 7203 ...")
+    if query:
+        matches = get_symbol_index().search(query, limit=8)
+        if not matches:
+            st.caption(t("ไม่พบสัญลักษณ์", "No matching symbols"))
+        for exchange, sym, ticker in matches:
+            st.button(f"{ticker} · {exchange}", key=f"q_{ticker}", use_container_width=True,
+                      on_click=st.session_state.__setitem__, args=('selected_stock', ticker))
+    
     for cat, items in ASSET_GROUPS.items():
         with st.expander(cat, expanded=(cat == "🇺🇸 US MARKET")):
             for sym, name in items.items():
-                if st.button(name, key=f"s_{sym}", use_container_width=True):
-                    st.session_state.selected_stock = sym
-                    st.rerun()
+                st.button(name, key=f"s_{sym}", use_container_width=True,
+                          on_click=st.session_state.__setitem__, args=('selected_stock', sym))
     
-    # Last update info
-    if st.session_state.last_update:
-        st.markdown(f"""
-            <div style='text-align: center; color: #64748b; font-size: 0.75em; padding: 10px; margin-top: 20px;'>
-                <p>🕐 {t('อัปเดตล่าสุด', 'Last Update')}:<br>{st.session_state.last_update.strftime('%H:%M:%S')}</p>
-            </div>
-        """, unsafe_allow_html=True)
+    # Background alerts on a whole watchlist, shown as toasts on the next run
+    with st.expander(t("🔔 แจ้งเตือน", "🔔 Alerts")):
+        from universe import universe_files
+        alerts_on = st.checkbox(t("เฝ้าดูสัญญาณทั้งรายการ", "Watch a watchlist for signals"), key='alerts_on')
+        alert_source = st.selectbox(t("รายการ", "Watchlist"), list(ASSET_GROUPS) + list(universe_files()),
+                                    key='alert_source', disabled=not alerts_on)
+        if alerts_on:
+            get_alert_hub().watch(alert_source, watchlist_tickers(alert_source),
+                                  TIMEFRAME_INTERVALS[timeframe], TIMEFRAME_PERIODS[timeframe])
+            st.caption(t("ฝ่าทะลุกรอบ · RSI สุดขั้ว · EMA ตัดกัน (เฉพาะแท่งใหม่)",
+                         "Breakouts · RSI extremes · EMA crosses (new bars only)"))
+            for _, alert in reversed(get_alert_hub().toasts.since(0)[-8:]):
+                st.caption(f"🔔 **{alert['symbol']}** · {alert['message']}")
+    
+    # Data freshness (filled in once this run has loaded its data)
+    freshness_slot = st.empty()
+
+def fragment_rerun():
+    """True in a rerun of fragments alone, where nothing outside them runs"""
+    ctx = get_script_run_ctx()
+    return bool(ctx and ctx.fragment_ids_this_run)
+
+def show_new_alerts():
+    """Toast the alerts fired since this session last looked (nothing from before it turned them on)"""
+    if not alerts_on:
+        st.session_state.pop('alert_seq', None)
+        return
+    new_alerts = get_alert_hub().toasts.since(st.session_state.get('alert_seq', get_alert_hub().toasts.seq))
+    for _, alert in new_alerts[-5:]:
+        st.toast(f"🔔 {alert['symbol']} ({alert['interval']}) · {alert['message']}")
+    if new_alerts or 'alert_seq' not in st.session_state:
+        st.session_state.alert_seq = new_alerts[-1][0] if new_alerts else get_alert_hub().toasts.seq
+
+def show_freshness():
+    """Fill the sidebar's freshness line from the oldest data loaded in this run"""
+    if not st.session_state.last_update:
+        freshness_slot.empty()
+        return
+    age = (datetime.now() - st.session_state.last_update).total_seconds()
+    age_text = f"{int(age)}s" if age < 120 else f"{int(age // 60)}m"
+    if age < shared_cache().ttl:
+        status = f"🟢 {t('ข้อมูลสด', 'Live')}"
+    elif st.session_state.fresh_until and time.time() < st.session_state.fresh_until:
+        # Older than the TTL but still fresh: the market has closed since
+        status = f"🌙 {t('ตลาดปิด ข้อมูลล่าสุดแล้ว', 'Market closed, up to date')}"
+    else:
+        status = f"🟡 {t('ข้อมูลเก่า กำลังอัปเดต', 'Stale, refreshing')}"
+    if provider().mode == 'replay':
+        status += f"<br>⏪ {t('เล่นซ้ำ ณ', 'Replay at')} {provider().now():%Y-%m-%d %H:%M} UTC"
+    elif provider().mode == 'record':
+        status += f"<br>⏺️ {t('กำลังบันทึกข้อมูล', 'Recording')}"
+    freshness_slot.markdown(f"""
+        <div style='text-align: center; color: #64748b; font-size: 0.75em; padding: 10px; margin-top: 20px;'>
+            <p>{status}<br>🕐 {st.session_state.last_update.strftime('%H:%M:%S')} ({age_text} {t('ที่แล้ว', 'ago')})</p>
+        </div>
+    """, unsafe_allow_html=True)
+
+show_new_alerts()
+
+# Timed refreshes rerun only the page's own fragment (Single Asset, Correlation
+# and each grid panel); live mode streams into the charts instead. Only the
+# scanner page still reruns whole.
+if not live_mode and page == t("🛰️ สแกนทั้งตลาด", "🛰️ Market Scanner"):
+    st_autorefresh(interval=120000, key="dashboard_refresh")
 
 # ═══════════════════════════════════════════════════════════════
 # 🎯 MAIN CONTENT - SINGLE VIEW
 # ═══════════════════════════════════════════════════════════════
-if page == t("🔍 วิเคราะห์รายตัว", "🔍 Single Asset"):
+def single_view(timeframe, long_history):
+    """
+    Metrics, charts and signals of the selected symbol, rerun on their own
+    
+    Run as a fragment: its timed refresh and its own buttons redraw only
+    this view, while the sidebar and page chrome stay as they are.
+    """
+    st.session_state.last_update = None
+    st.session_state.fresh_until = None
     symbol = st.session_state.selected_stock
-    df = get_pro_data(symbol, timeframe)
+    df = get_pro_data(symbol, timeframe, long_history)
     
     if not df.empty:
         # Header
@@ -406,9 +546,8 @@ if page == t("🔍 วิเคราะห์รายตัว", "🔍 Single
                 </h1>
             """, unsafe_allow_html=True)
         with col2:
-            if st.button(f"🔄 {t('รีเฟรช', 'Refresh')}", use_container_width=True):
-                st.cache_data.clear()
-                st.rerun()
+            st.button(f"🔄 {t('รีเฟรช', 'Refresh')}", use_container_width=True,
+                      on_click=invalidate_pro_data, args=([symbol], timeframe))
         
         st.markdown("<br>", unsafe_allow_html=True)
         
@@ -453,10 +592,33 @@ if page == t("🔍 วิเคราะห์รายตัว", "🔍 Single
         
         st.markdown("<br>", unsafe_allow_html=True)
         
+        # Long history: the full series stays server-side; narrowing the
+        # range re-slices it, so zooming in brings back finer bars
+        view = df
+        if long_history and len(df) > 1:
+            first, last = df['time'].iloc[0].to_pydatetime(), df['time'].iloc[-1].to_pydatetime()
+            start, end = st.slider(
+                t("🔭 ช่วงที่แสดง", "🔭 Visible range"), min_value=first, max_value=last, value=(first, last),
+                step=RANGE_STEPS.get(timeframe, timedelta(days=1)), format="YYYY-MM-DD HH:mm",
+                key=f"range_{symbol}_{timeframe}"
+            )
+            view = df[(df['time'] >= start) & (df['time'] <= end)]
+            st.caption(f"{len(view):,} {t('แท่ง', 'bars')} → ≤ {DEFAULT_BUDGET} {t('จุดต่อกราฟ', 'points per chart')}")
+        
+        # One serialization pass shared by every chart below
+        payload = build_payload(view)
+        # Candles keep each bucket's OHLC; RSI/MACD lines use LTTB below
+        chart_payload = bucket_payload(payload) if long_history else payload
+        
         # Main Chart
-        chart = StreamlitChart(height=550)
-        render_main_chart(chart, df)
-        chart.load()
+        chart = new_chart(550)
+        series = render_main_chart(chart, chart_payload, volume=show_vol, bollinger=show_bb, ema50=show_ema50,
+                                   ema200=show_ema200)
+        # Streamed bars would not line up with downsampled buckets
+        url = live_url(symbol, timeframe, payload) if not long_history else None
+        if url:
+            attach_live(chart, series, url)
+        load_chart(chart, 'main')
         
         # RSI Chart
         if show_rsi:
@@ -465,25 +627,21 @@ if page == t("🔍 วิเคราะห์รายตัว", "🔍 Single
             with col_rsi1:
                 st.markdown("### ⚡")
             with col_rsi2:
-                rsi_chart = StreamlitChart(height=180)
+                rsi_chart = new_chart(180)
                 rsi_chart.legend(visible=True, font_size=11)
                 
+                rsi_payload = lttb_payload(payload, 'rsi', columns=['rsi']) if long_history else payload
                 rsi_line = rsi_chart.create_line(name='RSI', color='#8b5cf6', width=2)
-                rsi_line.set(df[['time', 'rsi']].rename(columns={'rsi': 'RSI'}))
-                
-                df_temp = df.copy()
-                df_temp['rsi_70'] = 70
-                df_temp['rsi_30'] = 30
-                df_temp['rsi_50'] = 50
+                set_series(rsi_line, rsi_payload, 'rsi')
                 
-                rsi_chart.create_line(name='', color='rgba(239, 68, 68, 0.3)', width=1).set(
-                    df_temp[['time', 'rsi_70']].rename(columns={'rsi_70': '70'}))
-                rsi_chart.create_line(name='', color='rgba(34, 197, 94, 0.3)', width=1).set(
-                    df_temp[['time', 'rsi_30']].rename(columns={'rsi_30': '30'}))
-                rsi_chart.create_line(name='', color='rgba(148, 163, 184, 0.2)', width=1).set(
-                    df_temp[['time', 'rsi_50']].rename(columns={'rsi_50': '50'}))
+                # Guide levels as price lines, not full constant series
+                rsi_line.horizontal_line(70, color='rgba(239, 68, 68, 0.3)', width=1, axis_label_visible=False)
+                rsi_line.horizontal_line(30, color='rgba(34, 197, 94, 0.3)', width=1, axis_label_visible=False)
+                rsi_line.horizontal_line(50, color='rgba(148, 163, 184, 0.2)', width=1, axis_label_visible=False)
                 
-                rsi_chart.load()
+                if url:
+                    attach_live(rsi_chart, {'rsi': rsi_line}, url, candles=False)
+                load_chart(rsi_chart, 'rsi')
         
         # MACD Chart
         if show_macd:
@@ -492,24 +650,28 @@ if page == t("🔍 วิเคราะห์รายตัว", "🔍 Single
             with col_macd1:
                 st.markdown("### 🌊")
             with col_macd2:
-                macd_chart = StreamlitChart(height=180)
+                macd_chart = new_chart(180)
                 macd_chart.legend(visible=True, font_size=11)
                 
+                macd_payload = payload
+                if long_history:
+                    macd_payload = lttb_payload(payload, 'macd_line', columns=['macd_hist', 'macd_line', 'macd_signal'])
+                
                 macd_hist = macd_chart.create_histogram(name='Histogram', color='rgba(102, 126, 234, 0.4)')
-                macd_hist.set(df[['time', 'macd_hist']].rename(columns={'macd_hist': 'Histogram'}))
+                set_series(macd_hist, macd_payload, 'macd_hist')
                 
                 macd_line = macd_chart.create_line(name='MACD', color='#3b82f6', width=2)
-                macd_line.set(df[['time', 'macd_line']].rename(columns={'macd_line': 'MACD'}))
+                set_series(macd_line, macd_payload, 'macd_line')
                 
                 signal_line = macd_chart.create_line(name='Signal', color='#f59e0b', width=2)
-                signal_line.set(df[['time', 'macd_signal']].rename(columns={'macd_signal': 'Signal'}))
+                set_series(signal_line, macd_payload, 'macd_signal')
                 
-                df_temp = df.copy()
-                df_temp['zero'] = 0
-                macd_chart.create_line(name='', color='rgba(148, 163, 184, 0.3)', width=1).set(
-                    df_temp[['time', 'zero']].rename(columns={'zero': '0'}))
+                macd_line.horizontal_line(0, color='rgba(148, 163, 184, 0.3)', width=1, axis_label_visible=False)
                 
-                macd_chart.load()
+                if url:
+                    attach_live(macd_chart, {'macd_hist': macd_hist, 'macd_line': macd_line,
+                                             'macd_signal': signal_line}, url, candles=False)
+                load_chart(macd_chart, 'macd')
         
         st.markdown("<br>", unsafe_allow_html=True)
         
@@ -565,68 +727,278 @@ if page == t("🔍 วิเคราะห์รายตัว", "🔍 Single
             with stat_col3:
                 st.metric(t("ปริมาณเฉลี่ย", "Avg Volume"), f"{df['volume'].tail(20).mean():,.0f}")
                 st.metric(t("ปริมาณล่าสุด", "Last Volume"), f"{df['volume'].iloc[-1]:,.0f}")
+        
+        # Parameter Sweep
+        with st.expander(t("🧪 ทดสอบพารามิเตอร์", "🧪 Parameter Sweep")):
+            from backtest import BARS_PER_YEAR, param_grid, sweep_many
+            scope = st.radio(
+                t("ขอบเขต", "Scope"),
+                [symbol, t("ทุกสินทรัพย์ในแดชบอร์ด", "All dashboard assets")],
+                horizontal=True
+            )
+            st.caption(t(
+                f"{len(param_grid())} ชุดพารามิเตอร์ (ช่วงเบรกเอาท์ × EMA × RSI) รวมค่าคอมมิชชัน+สลิปเพจ",
+                f"{len(param_grid())} parameter sets (breakout window × EMA filter × RSI) with commission + slippage"
+            ))
+            if st.button(f"▶️ {t('รันแบ็คเทสต์', 'Run Sweep')}", use_container_width=True):
+                interval = TIMEFRAME_INTERVALS.get(timeframe, '1d')
+                period = TIMEFRAME_PERIODS.get(timeframe, '6mo')
+                with st.spinner(t("กำลังคำนวณ...", "Sweeping...")):
+                    # One multi-ticker request per chunk instead of a download per symbol
+                    frames = load_bars_many([symbol] if scope == symbol else ALL_SYMBOLS, interval, period)
+                    _, summary = sweep_many(frames, bars_per_year=BARS_PER_YEAR.get(interval, 252))
+                st.dataframe(summary.head(15), use_container_width=True, hide_index=True)
     else:
         st.error(f"❌ {t('ไม่สามารถโหลดข้อมูลสำหรับ', 'Unable to load data for')} {symbol}")
+    
+    # On full runs too: a fragment may only update an outside slot it filled on its first run
+    show_freshness()
+    if fragment_rerun():
+        show_new_alerts()
+
+# ═══════════════════════════════════════════════════════════════
+# 🔗 CORRELATION MATRIX
+# ═══════════════════════════════════════════════════════════════
+def correlation_view(timeframe):
+    """Correlation heatmap and top pairs of a watchlist, rerun on their own (a fragment)"""
+    import plotly.graph_objects as go
+    from correlation import DEFAULT_WINDOW, cluster_order, top_pairs
+    from universe import load_universe, universe_files
+    
+    st.markdown(f"""
+        <h2 style='margin: 0; padding: 10px 0;'>
+            🔗 {t('สหสัมพันธ์ของผลตอบแทน', 'Rolling Return Correlation')}
+        </h2>
+    """, unsafe_allow_html=True)
+    
+    files = universe_files()
+    all_groups = t('ทุกกลุ่ม', 'All groups')
+    sources = [all_groups] + list(ASSET_GROUPS) + list(files)
+    cc1, cc2, cc3 = st.columns([4, 2, 2])
+    with cc1:
+        source = st.selectbox(t('รายการหุ้น', 'Watchlist'), sources, key='corr_source')
+    with cc2:
+        window = st.number_input(t('หน้าต่าง (แท่ง)', 'Window (bars)'), 10, 250, DEFAULT_WINDOW, key='corr_window')
+    with cc3:
+        max_symbols = st.number_input(t('จำนวนหุ้นสูงสุด', 'Max symbols'), 2, 2000, CORRELATION_MAX_SYMBOLS,
+                                      key='corr_max')
+    
+    if source == all_groups:
+        tickers = ALL_SYMBOLS
+    elif source in ASSET_GROUPS:
+        tickers = list(ASSET_GROUPS[source])
+    else:
+        tickers = [ticker for _, _, ticker in load_universe(files[source])]
+    tickers = tuple(dict.fromkeys(tickers))[:max_symbols]
+    
+    try:
+        with st.spinner(t(f"กำลังโหลด {len(tickers)} สัญลักษณ์...", f"Loading {len(tickers)} symbols...")):
+            closes = load_watchlist_closes(tickers, timeframe)
+    except Exception as e:
+        closes = pd.DataFrame()
+        st.error(f"❌ Error fetching data for {source}: {str(e)}")
+    
+    book = get_correlation(tickers, timeframe, window)
+    with metrics().span('correlation', timeframe=timeframe) as s:
+        mode = book.sync(closes)
+        corr = book.matrix()
+        order = cluster_order(corr)
+        s['symbols'] = len(book.symbols)
+    
+    if mode == 'empty':
+        st.warning(t("ข้อมูลไม่พอสำหรับหน้าต่างนี้", "Not enough bars for this window"))
+    else:
+        labels = [book.symbols[i] for i in order]
+        n = len(labels)
+        st.caption(t(f"{n} สัญลักษณ์ · {window} แท่ง · ถึง {book.last_time:%Y-%m-%d %H:%M} UTC",
+                     f"{n} symbols · {window} bars · up to {book.last_time:%Y-%m-%d %H:%M} UTC"))
+        
+        fig = go.Figure(go.Heatmap(z=np.round(corr[np.ix_(order, order)], 3), x=labels, y=labels,
+                                   zmin=-1, zmax=1, colorscale='RdBu_r'))
+        fig.update_layout(template='plotly_dark', height=min(900, max(450, 14 * n)),
+                          margin=dict(l=10, r=10, t=10, b=10),
+                          paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
+        fig.update_xaxes(showticklabels=n <= 80)
+        fig.update_yaxes(showticklabels=n <= 80, autorange='reversed')
+        st.plotly_chart(fig, use_container_width=True)
+        
+        pc1, pc2 = st.columns(2)
+        with pc1:
+            st.markdown(f"#### {t('คู่ที่เคลื่อนไหวไปด้วยกัน', 'Most correlated')}")
+            st.dataframe(top_pairs(corr, book.symbols, k=15), hide_index=True, use_container_width=True)
+        with pc2:
+            st.markdown(f"#### {t('คู่ที่สวนทางกัน', 'Most inversely correlated')}")
+            st.dataframe(top_pairs(corr, book.symbols, k=15, lowest=True), hide_index=True, use_container_width=True)
+    
+    if fragment_rerun():
+        show_new_alerts()
+
+# ═══════════════════════════════════════════════════════════════
+# 🧭 PAGES
+# ═══════════════════════════════════════════════════════════════
+if page == t("🔍 วิเคราะห์รายตัว", "🔍 Single Asset"):
+    # Timed refreshes rerun only the view; live mode streams into the charts instead
+    st.fragment(single_view, run_every=None if live_mode else AUTO_REFRESH)(timeframe, long_history)
+
+elif page == t("🔗 สหสัมพันธ์", "🔗 Correlation"):
+    st.fragment(correlation_view, run_every=None if live_mode else AUTO_REFRESH)(timeframe)
 
 # ═══════════════════════════════════════════════════════════════
 # 📊 MULTI-VIEW GRID
 # ═══════════════════════════════════════════════════════════════
-else:
+elif page == t("📊 กระดานหลายจอ", "📊 Multi-View Grid"):
+    for key, default in (('grid_rows', 2), ('grid_cols', 2)):
+        if key not in st.session_state:
+            st.session_state[key] = default
+    
+    with st.expander(t("⚙️ จัดกระดาน", "⚙️ Grid layout")):
+        from universe import load_universe, universe_files
+        gc1, gc2, gc3 = st.columns([1, 1, 3])
+        with gc1:
+            st.number_input(t("แถว", "Rows"), 1, GRID_MAX_SIDE, key='grid_rows')
+        with gc2:
+            st.number_input(t("คอลัมน์", "Columns"), 1, GRID_MAX_SIDE, key='grid_cols')
+        with gc3:
+            grid_mode = st.radio(t("แสดงผล", "Panels"), ['Auto', t('กราฟเต็ม', 'Charts'), t('เส้นย่อ', 'Sparklines')],
+                                 key='grid_mode', horizontal=True)
+        
+        count = st.session_state.grid_rows * st.session_state.grid_cols
+        files = universe_files()
+        lc1, lc2 = st.columns([3, 1])
+        with lc1:
+            fill_source = st.selectbox(t("เติมจากรายการ", "Fill from watchlist"), list(ASSET_GROUPS) + list(files),
+                                       key='grid_fill_source')
+        with lc2:
+            st.markdown("<br>", unsafe_allow_html=True)
+            if fill_source in ASSET_GROUPS:
+                fill_tickers = list(ASSET_GROUPS[fill_source])
+            else:
+                fill_tickers = [ticker for _, _, ticker in load_universe(files[fill_source])[:count]]
+            st.button(t("เติม", "Fill"), on_click=fill_grid, args=(fill_tickers, count), use_container_width=True)
+        
+        layouts = get_layout_store().load()
+        sc1, sc2, sc3, sc4, sc5 = st.columns([3, 1, 1, 3, 1])
+        with sc1:
+            layout_name = st.selectbox(t("กระดานที่บันทึกไว้", "Saved layouts"), list(layouts), key='grid_layout')
+        with sc2:
+            st.markdown("<br>", unsafe_allow_html=True)
+            st.button(t("โหลด", "Load"), on_click=apply_grid_layout, args=(layout_name,),
+                      disabled=not layout_name, use_container_width=True)
+        with sc3:
+            st.markdown("<br>", unsafe_allow_html=True)
+            st.button(t("ลบ", "Delete"), on_click=get_layout_store().delete, args=(layout_name,),
+                      disabled=not layout_name, use_container_width=True)
+        with sc4:
+            save_name = st.text_input(t("ชื่อสำหรับบันทึก", "Save as"), key='grid_save_name')
+        with sc5:
+            st.markdown("<br>", unsafe_allow_html=True)
+            if st.button(t("บันทึก", "Save"), disabled=not save_name, use_container_width=True):
+                get_layout_store().save(save_name, st.session_state.grid_rows, st.session_state.grid_cols,
+                                        grid_symbols(count))
+                st.rerun()
+    
+    rows, cols = st.session_state.grid_rows, st.session_state.grid_cols
+    count = rows * cols
+    sparkline = grid_mode == t('เส้นย่อ', 'Sparklines') or (grid_mode == 'Auto' and count > GRID_SPARKLINE_ABOVE)
+    height = {1: 420, 2: 320, 3: 260}.get(cols, 200)
+    
     # Compact Header
     col1, col2 = st.columns([8, 2])
     with col1:
         st.markdown(f"""
             <h2 style='margin: 0; padding: 10px 0;'>
-                📊 {t('กระดาน 4 จอ', 'Multi-View Dashboard')}
+                📊 {t('กระดานหลายจอ', 'Multi-View Dashboard')} · {rows}×{cols}
             </h2>
         """, unsafe_allow_html=True)
     with col2:
         if st.button(f"🔄 {t('รีเซ็ต', 'Reset')}", use_container_width=True):
-            st.cache_data.clear()
+            invalidate_pro_data(grid_symbols(count), timeframe)
             st.rerun()
     
-    # Grid Layout - 2x2
-    row1_cols = st.columns(2)
-    row2_cols = st.columns(2)
-    
-    all_cols = [row1_cols[0], row1_cols[1], row2_cols[0], row2_cols[1]]
-    
-    for i in range(4):
-        with all_cols[i]:
-            # Compact Symbol Selector
-            sel = st.selectbox(
-                "", 
-                ALL_SYMBOLS, 
-                index=min(i, len(ALL_SYMBOLS)-1), 
-                key=f"grid_sel_{i}",
-                label_visibility="collapsed"
-            )
-            
-            d = get_pro_data(sel, timeframe)
-            
-            if not d.empty:
-                curr_price = d['close'].iloc[-1]
-                prev_price = d['close'].iloc[-2] if len(d) > 1 else curr_price
-                change = ((curr_price - prev_price) / prev_price) * 100 if prev_price != 0 else 0
-                
-                # Compact Price Display
-                st.markdown(f"""
-                    <div style='background: rgba(255,255,255,0.05); padding: 8px 12px; border-radius: 8px; margin-bottom: 8px;'>
-                        <div style='display: flex; justify-content: space-between; align-items: center;'>
-                            <span style='font-weight: 600; font-size: 0.95em;'>{sel}</span>
-                            <span style='font-size: 1.1em; font-weight: 700; color: {"#10b981" if change >= 0 else "#ef4444"};'>
-                                ${curr_price:,.2f} <span style='font-size: 0.75em;'>({change:+.2f}%)</span>
-                            </span>
-                        </div>
-                    </div>
-                """, unsafe_allow_html=True)
-                
-                # Smaller Chart
-                c = StreamlitChart(height=320)
-                render_full_chart(c, d)
-                c.load()
-            else:
-                st.warning(f"⚠️ {t('ไม่สามารถโหลด', 'Cannot load')} {sel}")
+    # Start every panel's load at once without waiting; each panel then waits for its own symbol only
+    warm_pro_data(grid_symbols(count), timeframe)
+    
+    panel = st.fragment(grid_panel, run_every=None if live_mode else GRID_PANEL_REFRESH)
+    for r in range(rows):
+        for c, column in enumerate(st.columns(cols)):
+            with column:
+                panel(r * cols + c, timeframe, height, sparkline)
+
+# ═══════════════════════════════════════════════════════════════
+# 🛰️ MARKET SCANNER
+# ═══════════════════════════════════════════════════════════════
+else:
+    from scanner import scan_universe
+    from universe import universe_files
+    
+    st.markdown(f"""
+        <h2 style='margin: 0; padding: 10px 0;'>
+            🛰️ {t('สแกนเบรกเอาท์ทั้งตลาด', 'Universe Breakout Scanner')}
+        </h2>
+    """, unsafe_allow_html=True)
+    
+    files = universe_files()
+    names = list(files)
+    sc1, sc2, sc3, sc4 = st.columns([4, 2, 2, 2])
+    with sc1:
+        universe = st.selectbox(t('ตลาด', 'Universe'), names, index=names.index('America/symbols_US.csv'))
+    with sc2:
+        rsi_max = st.number_input(t('RSI สูงสุด (เบรกขึ้น)', 'Max RSI (breakout)'), 0, 100, 70)
+    with sc3:
+        rsi_min = st.number_input(t('RSI ต่ำสุด (หลุดลง)', 'Min RSI (breakdown)'), 0, 100, 30)
+    with sc4:
+        trend_filter = st.checkbox(t('กรองด้วย EMA 200', 'EMA 200 trend filter'), value=True)
+        fresh_scan = st.checkbox(t('เริ่มใหม่ทั้งหมด', 'Restart from scratch'), value=False)
+    
+    if st.button(f"🚀 {t('เริ่มสแกน', 'Run Scan')}", use_container_width=True):
+        bar = st.progress(0.0)
+        
+        def scan_progress(done, total):
+            bar.progress(done / total if total else 1.0, text=f"{done}/{total} {t('ชุด', 'chunks')}")
+        
+        st.session_state.scan_results = scan_universe(
+            files[universe],
+            interval=TIMEFRAME_INTERVALS.get(timeframe, '1d'),
+            period=TIMEFRAME_PERIODS.get(timeframe, '6mo'),
+            rsi_max=rsi_max, rsi_min=rsi_min, trend_filter=trend_filter,
+            resume=not fresh_scan, on_progress=scan_progress,
+        )
+        st.session_state.scan_universe = universe
+        failed = st.session_state.scan_results.attrs.get('failed_chunks')
+        if failed:
+            st.warning(t(f"⚠️ ดาวน์โหลดไม่สำเร็จ {failed} ชุด กดสแกนอีกครั้งเพื่อลองใหม่เฉพาะชุดนั้น",
+                         f"⚠️ {failed} chunks could not be downloaded; run the scan again to retry just those"))
+    
+    results = st.session_state.get('scan_results')
+    if results is not None:
+        st.markdown(f"#### {t('ผลการสแกน', 'Results')}: {st.session_state.scan_universe} ({len(results)})")
+        if results.empty:
+            st.info(t("ไม่มีหุ้นที่ผ่านเงื่อนไข", "No symbols matched"))
+        else:
+            st.dataframe(results, use_container_width=True, hide_index=True)
+
+# ═══════════════════════════════════════════════════════════════
+# 🕐 DATA FRESHNESS
+# ═══════════════════════════════════════════════════════════════
+# (the Single Asset view fills it itself, on its own reruns as well)
+if page != t("🔍 วิเคราะห์รายตัว", "🔍 Single Asset"):
+    show_freshness()
+
+# ═══════════════════════════════════════════════════════════════
+# 🩺 DEBUG PANEL (?debug=1)
+# ═══════════════════════════════════════════════════════════════
+if st.query_params.get('debug') == '1':
+    with st.expander(t("🩺 เวลาแต่ละขั้นตอน", "🩺 Stage timings"), expanded=True):
+        stages = pd.DataFrame(metrics().summary())
+        if not stages.empty:
+            st.dataframe(stages.sort_values('total_ms', ascending=False), hide_index=True, use_container_width=True)
+        counters = pd.DataFrame([{'counter': name, **labels, 'value': value}
+                                 for name, labels, value in metrics().counters()])
+        if not counters.empty:
+            st.dataframe(counters, hide_index=True, use_container_width=True)
+        st.json({'shared_cache': shared_cache().stats, 'refresher': background_refresher().stats,
+                 'bar_cache': bar_cache().stats, 'fetch': fetch_client().stats}, expanded=False)
+        st.dataframe(pd.DataFrame(metrics().recent()), hide_index=True, use_container_width=True)
 
 # ═══════════════════════════════════════════════════════════════
 # 🔗 FOOTER
@@ -0,0 +1,252 @@
+"""
+Vectorized parameter-sweep backtester for the breakout strategy.
+
+The dashboard's "Strategy P/L" is one fixed 20-bar breakout with no costs.
+`sweep` evaluates a whole grid of (breakout window, EMA trend filter, RSI
+threshold) settings in one NumPy pass: every intermediate is a
+(parameters x time) array, so 1,000 settings cost about as much as a few
+pandas runs. `sweep_many` spreads symbols over a process pool and caches
+each symbol's results under a hash of its bars and the sweep settings. The
+cache drops results unused for BACKTEST_CACHE_MAX_DAYS (default 30), then
+the least recently used ones while it is over BACKTEST_CACHE_MAX_MB
+(default 256).
+
+Rules, per parameter set:
+- long entry: close > previous `window`-bar high, close > EMA, RSI <= rsi_max
+- short entry: close < previous `window`-bar low, close < EMA, RSI >= 100 - rsi_max
+- the position is held until the opposite signal (or, with hold=False, for
+  one bar only, like the dashboard's cum_ret)
+- every change of position pays commission + slippage per unit traded
+"""
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+CACHE_DIR = os.environ.get(
+    'BACKTEST_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.backtest_cache'),
+)
+CACHE_MAX_BYTES = int(float(os.environ.get('BACKTEST_CACHE_MAX_MB', 256)) * 2**20)
+CACHE_MAX_AGE = float(os.environ.get('BACKTEST_CACHE_MAX_DAYS', 30)) * 86400
+
+DEFAULT_GRID = {
+    'window': [10, 15, 20, 30, 40, 55],
+    'ema': [0, 20, 50, 100, 200],  # 0 = no trend filter
+    'rsi_max': [60, 65, 70, 75, 80, 100],  # 100 = no RSI filter
+}
+
+BARS_PER_YEAR = {'1d': 252, '1h': 252 * 7, '15m': 252 * 26, '5m': 252 * 78}
+
+
+def param_grid(grid=None):
+    """DataFrame with one row per parameter combination"""
+    grid = grid or DEFAULT_GRID
+    rows = list(itertools.product(grid['window'], grid['ema'], grid['rsi_max']))
+    return pd.DataFrame(rows, columns=['window', 'ema', 'rsi_max'])
+
+
+def _rolling_extreme(values, window, fn):
+    """fn over the `window` bars *before* each bar (NaN until enough history)"""
+    out = np.full(len(values), np.nan)
+    if len(values) > window:
+        out[window:] = fn(sliding_window_view(values, window)[:-1], axis=-1)
+    return out
+
+
+def _rsi(close, period=14):
+    delta = np.diff(close, prepend=close[0])
+    gain = pd.Series(np.where(delta > 0, delta, 0.0)).rolling(period).mean()
+    loss = pd.Series(np.where(delta < 0, -delta, 0.0)).rolling(period).mean()
+    rs = gain / loss.replace(0, np.nan)
+    return (100 - 100 / (1 + rs)).fillna(50).to_numpy()
+
+
+def _ffill_nonzero(signal):
+    """Carry the last non-zero value of each row forward along time"""
+    t = np.arange(signal.shape[-1])
+    last = np.maximum.accumulate(np.where(signal != 0, t, 0), axis=-1)
+    return np.take_along_axis(signal, last, axis=-1)
+
+
+def sweep(bars, params=None, commission=0.0005, slippage=0.0005, hold=True, bars_per_year=252):
+    """
+    Backtest every parameter row on one symbol's bars
+
+    `bars` needs high/low/close columns. Returns `params` with total_return,
+    sharpe, max_drawdown and trades columns added.
+    """
+    params = param_grid() if params is None else params.reset_index(drop=True)
+    close = bars['close'].to_numpy(dtype=float)
+    high = bars['high'].to_numpy(dtype=float)
+    low = bars['low'].to_numpy(dtype=float)
+    n = len(close)
+
+    # Per-setting building blocks, computed once per distinct value: (k, T)
+    windows = np.unique(params['window'])
+    res = np.stack([_rolling_extreme(high, w, np.max) for w in windows])
+    sup = np.stack([_rolling_extreme(low, w, np.min) for w in windows])
+    emas = np.unique(params['ema'])
+    ema = np.stack([pd.Series(close).ewm(span=e, adjust=False).mean().to_numpy() if e else np.full(n, np.nan)
+                    for e in emas])
+    rsi = _rsi(close)
+
+    # Gather each parameter row's arrays: (P, T)
+    wi = np.searchsorted(windows, params['window'])
+    ei = np.searchsorted(emas, params['ema'])
+    no_trend = (params['ema'].to_numpy() == 0)[:, None]
+    rsi_max = params['rsi_max'].to_numpy(dtype=float)[:, None]
+
+    up = (close > res[wi]) & (no_trend | (close > ema[ei])) & (rsi <= rsi_max)
+    down = (close < sup[wi]) & (no_trend | (close < ema[ei])) & (rsi >= 100 - rsi_max)
+    signal = up.astype(np.int8) - down.astype(np.int8)
+
+    position = _ffill_nonzero(signal) if hold else signal
+    held = np.zeros_like(position, dtype=float)
+    held[:, 1:] = position[:, :-1]  # act on the bar after the signal
+
+    ret = np.zeros(n)
+    ret[1:] = close[1:] / close[:-1] - 1
+    turnover = np.abs(np.diff(held, axis=1, prepend=0.0))
+    strat = held * ret - turnover * (commission + slippage)
+
+    equity = np.cumprod(1 + strat, axis=1)
+    drawdown = equity / np.maximum.accumulate(equity, axis=1) - 1
+    std = strat.std(axis=1)
+    sharpe = np.divide(strat.mean(axis=1), std, out=np.zeros(len(params)), where=std > 0) * np.sqrt(bars_per_year)
+
+    out = params.copy()
+    out['total_return'] = equity[:, -1] - 1 if n else 0.0
+    out['sharpe'] = sharpe
+    out['max_drawdown'] = drawdown.min(axis=1) if n else 0.0
+    out['trades'] = (turnover > 0).sum(axis=1)
+    return out
+
+
+def data_hash(bars, params, settings):
+    """Key for the result cache: the bars, the grid and the cost settings"""
+    h = hashlib.sha1()
+    for col in ('high', 'low', 'close'):
+        h.update(np.ascontiguousarray(bars[col].to_numpy(dtype=float)).tobytes())
+    h.update(pd.util.hash_pandas_object(params, index=False).to_numpy().tobytes())
+    h.update(json.dumps(settings, sort_keys=True).encode())
+    return h.hexdigest()
+
+
+def cached_sweep(bars, params=None, cache_dir=CACHE_DIR, **settings):
+    """`sweep` with results stored on disk under the data hash"""
+    params = param_grid() if params is None else params.reset_index(drop=True)
+    path = os.path.join(cache_dir, f"{data_hash(bars, params, settings)}.parquet")
+    if os.path.exists(path):
+        try:
+            out = pd.read_parquet(path)
+            os.utime(path)  # recently used: last to be pruned
+            return out
+        except Exception:
+            pass
+    out = sweep(bars, params, **settings)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    out.to_parquet(tmp)
+    os.replace(tmp, path)
+    return out
+
+
+def prune_cache(cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, max_age=CACHE_MAX_AGE):
+    """Drop results unused for `max_age` seconds, then the least recently used while over `max_bytes`"""
+    files = []
+    try:
+        with os.scandir(cache_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith('.parquet'):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+    except FileNotFoundError:
+        return 0
+
+    files.sort()  # least recently used first
+    total = sum(size for _, size, _ in files)
+    now = time.time()
+    removed = 0
+    for mtime, size, path in files:
+        if now - mtime <= max_age and total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+        total -= size
+    return removed
+
+
+def _sweep_symbol(args):
+    symbol, bars, params, settings = args
+    out = cached_sweep(bars, params, **settings)
+    out.insert(0, 'symbol', symbol)
+    return out
+
+
+def sweep_many(frames, params=None, workers=None, **settings):
+    """
+    Sweep {symbol: bars} on a process pool
+
+    Returns (per_symbol, summary): every (symbol, parameter) row, and the
+    parameter rows averaged across symbols, best Sharpe first.
+    """
+    params = param_grid() if params is None else params.reset_index(drop=True)
+    jobs = [(sym, bars[['high', 'low', 'close']], params, settings) for sym, bars in frames.items()]
+    if not jobs:
+        return pd.DataFrame(), pd.DataFrame()
+
+    if workers == 1 or len(jobs) == 1:
+        results = [_sweep_symbol(job) for job in jobs]
+    else:
+        ctx = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            results = list(pool.map(_sweep_symbol, jobs))
+    prune_cache()
+
+    per_symbol = pd.concat(results, ignore_index=True)
+    summary = (per_symbol.groupby(['window', 'ema', 'rsi_max'], as_index=False)
+               .agg(total_return=('total_return', 'mean'), sharpe=('sharpe', 'mean'),
+                    max_drawdown=('max_drawdown', 'mean'), trades=('trades', 'sum'))
+               .sort_values('sharpe', ascending=False, ignore_index=True))
+    return per_symbol, summary
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from bar_store import load_bars
+
+    parser = argparse.ArgumentParser(description='Breakout parameter sweep over stored/downloaded bars')
+    parser.add_argument('symbols', nargs='+')
+    parser.add_argument('--interval', default='1d')
+    parser.add_argument('--period', default='2y')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--commission', type=float, default=0.0005)
+    parser.add_argument('--slippage', type=float, default=0.0005)
+    args = parser.parse_args()
+
+    frames = {}
+    for sym in args.symbols:
+        bars = load_bars(sym, args.interval, args.period)
+        if not bars.empty:
+            frames[sym] = bars
+
+    started = time.perf_counter()
+    _, summary = sweep_many(frames, workers=args.workers, commission=args.commission, slippage=args.slippage,
+                            bars_per_year=BARS_PER_YEAR.get(args.interval, 252))
+    print(summary.head(20).to_string(index=False))
+    print(f"{len(param_grid())} parameter sets x {len(frames)} symbols in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,188 @@
+"""
+Memory-bounded in-process cache for bars, indicator frames and engines.
+
+Everything the process keeps per (symbol, timeframe) goes through one
+`BarCache` with a byte budget, so memory stays flat however many symbols of
+the universe users open. When an insert goes over budget, entries are
+evicted least recently used first (or least frequently used, with
+`policy='lfu'`) until it fits. Keys are tuples whose first item is the kind
+of entry ('frame', 'engine', 'base'), which the stats break down by.
+
+Chart frames are stored as `CompactFrame`s: int64 epoch times, float32
+price and indicator columns (volume kept exact) and no intermediates that can be derived from other columns.
+
+Configuration from the environment:
+DASHBOARD_MEMORY_BUDGET_MB  byte budget in MiB (default 512)
+DASHBOARD_MEMORY_POLICY     'lru' (default) or 'lfu'
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_BUDGET_MB = 512
+
+# Intermediates dropped on packing: column -> (columns it is derived from, how)
+DERIVED = {
+    'sma20': (('bb_up', 'bb_low'), lambda f: (f['bb_up'] + f['bb_low']) / 2),
+    'std20': (('bb_up', 'bb_low'), lambda f: (f['bb_up'] - f['bb_low']) / 4),
+    'macd_hist': (('macd_line', 'macd_signal'), lambda f: f['macd_line'] - f['macd_signal']),
+}
+
+# Columns left at full width: float32 is exact only up to 2**24, which
+# volumes of liquid symbols exceed
+EXACT = {'volume'}
+
+
+def nbytes(value):
+    """Approximate memory held by a cached value"""
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, tuple):
+        return sum(nbytes(v) for v in value)
+    return 64
+
+
+class CompactFrame:
+    """
+    An indicator frame packed for caching
+
+    The naive 'time' column becomes int64 nanoseconds, float columns other
+    than `EXACT` ones become float32, small integer columns (the signal) int8, and `DERIVED` columns
+    are dropped. `to_frame` rebuilds a DataFrame with them recomputed.
+    """
+    __slots__ = ('times', 'columns', 'attrs', 'nbytes')
+
+    def __init__(self, df):
+        self.times = df['time'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        self.columns = {}
+        for col in df.columns:
+            if col == 'time' or col in DERIVED:
+                continue
+            values = df[col].to_numpy()
+            if col in EXACT:
+                self.columns[col] = values
+            elif np.issubdtype(values.dtype, np.integer):
+                small = values.min(initial=0) >= -128 and values.max(initial=0) <= 127
+                self.columns[col] = values.astype(np.int8) if small else values
+            else:
+                self.columns[col] = values.astype(np.float32)
+        self.attrs = dict(df.attrs)
+        self.nbytes = self.times.nbytes + sum(v.nbytes for v in self.columns.values())
+
+    @classmethod
+    def pack(cls, df):
+        """CompactFrame for an indicator frame; an empty (failed) load is kept as it is"""
+        return cls(df) if 'time' in df else df
+
+    def __len__(self):
+        return len(self.times)
+
+    def to_frame(self):
+        df = pd.DataFrame({'time': self.times.view('datetime64[ns]'), **self.columns})
+        for col, (sources, derive) in DERIVED.items():
+            if all(c in self.columns for c in sources):
+                df[col] = derive(df)
+        df.attrs.update(self.attrs)
+        return df
+
+
+class BarCache:
+    """Thread-safe key/value cache bounded by the total `nbytes` of its values"""
+
+    def __init__(self, budget, policy='lru'):
+        if policy not in ('lru', 'lfu'):
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        self.budget = budget
+        self.policy = policy
+        self._entries = OrderedDict()  # key -> [value, size, uses], least recently used first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return default
+            self._hits += 1
+            entry[2] += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value):
+        """Store `value`, evicting others as needed; a value bigger than the whole budget is not kept"""
+        size = nbytes(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if size > self.budget:
+                return value
+            self._entries[key] = [value, size, old[2] if old else 1]
+            self._bytes += size
+            self._evict()
+        return value
+
+    def resize(self, key):
+        """Re-measure an entry whose value grew in place (an engine that took new bars)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            size = nbytes(entry[0])
+            self._bytes += size - entry[1]
+            entry[1] = size
+            self._evict(keep=key)
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+
+    def _evict(self, keep=None):
+        while self._bytes > self.budget and len(self._entries) > 1:
+            candidates = (k for k in self._entries if k != keep)
+            if self.policy == 'lru':
+                victim = next(candidates)
+            else:
+                # Fewest uses; ties go to the least recently used (earliest in order)
+                victim = min(candidates, key=lambda k: self._entries[k][2])
+            self._bytes -= self._entries.pop(victim)[1]
+            self._evictions += 1
+
+    @property
+    def stats(self):
+        with self._lock:
+            by_kind = {}
+            for key, (_, size, _) in self._entries.items():
+                kind = key[0] if isinstance(key, tuple) else 'other'
+                by_kind[f"bytes_{kind}"] = by_kind.get(f"bytes_{kind}", 0) + size
+            requests = self._hits + self._misses
+            return {
+                'entries': len(self._entries), 'bytes': self._bytes, 'budget_bytes': self.budget,
+                'hits': self._hits, 'misses': self._misses, 'evictions': self._evictions,
+                'hit_rate': self._hits / requests if requests else 0.0, **by_kind,
+            }
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def bar_cache():
+    """Process-wide cache configured by DASHBOARD_MEMORY_BUDGET_MB and DASHBOARD_MEMORY_POLICY"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            budget = float(os.environ.get('DASHBOARD_MEMORY_BUDGET_MB', DEFAULT_BUDGET_MB)) * 2**20
+            _default = BarCache(int(budget), os.environ.get('DASHBOARD_MEMORY_POLICY', 'lru'))
+        return _default
@@ -0,0 +1,277 @@
+"""
+Persistent OHLCV bar store.
+
+Bars are kept on disk as Parquet files per (symbol, interval). A refresh
+reads the stored history first and only downloads the bars from the last
+stored timestamp onward, so the still-forming last bar is re-fetched (and
+revised) while the rest of the history never leaves the disk.
+
+Top-ups go to a small tail file next to the main one, which is only
+rewritten (and trimmed to the interval's `RETENTION`) once the tail has
+collected `TAIL_ROWS` bars, so a refresh costs the same however long the
+history is. Loads return the requested period, not everything stored.
+"""
+import os
+import re
+import tempfile
+
+import pandas as pd
+
+import providers
+from providers import PERIOD_SPANS
+from telemetry import metrics
+
+STORE_DIR = os.environ.get(
+    'BAR_STORE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.bar_store'),
+)
+# How far after the start of a period its first bar may be (weekends, holidays) and still reach it
+EXTEND_SLACK = pd.Timedelta(days=7)
+# Longest history kept per interval: as far back as Yahoo serves it (anything else: 10 years)
+RETENTION = {'5m': '60d', '15m': '60d', '30m': '60d', '1h': '2y', '1d': '10y'}
+TAIL_ROWS = 500  # top-up bars collected in the tail file before it is folded into the main file
+
+
+def normalize_bars(raw):
+    """Flatten a `yf.download` frame to lowercase columns on a UTC index named 'time'"""
+    if raw is None or raw.empty:
+        return pd.DataFrame()
+
+    df = raw.copy()
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
+    df.columns = df.columns.str.lower()
+    df.columns.name = None
+
+    df.index = pd.DatetimeIndex(df.index)
+    if df.index.tz is None:
+        df.index = df.index.tz_localize('UTC')
+    else:
+        df.index = df.index.tz_convert('UTC')
+    df.index.name = 'time'
+    return df
+
+
+class BarStore:
+    """
+    Parquet files keyed by symbol and interval
+
+    Without a `root`, the store lives in STORE_DIR, in a subdirectory of
+    its own when replaying (providers.namespace).
+    """
+
+    def __init__(self, root=None):
+        if root is None:
+            root = os.path.join(STORE_DIR, providers.namespace()) if providers.namespace() else STORE_DIR
+        self.root = root
+
+    def path(self, symbol, interval):
+        safe = re.sub(r'[^A-Za-z0-9._-]', '_', symbol)
+        return os.path.join(self.root, interval, f"{safe}.parquet")
+
+    def tail_path(self, symbol, interval):
+        return self.path(symbol, interval)[:-len('.parquet')] + '.tail.parquet'
+
+    def read(self, symbol, interval):
+        """Everything stored for (symbol, interval): the main file with its tail on top"""
+        return self.merge(self._read(self.path(symbol, interval)), self._read(self.tail_path(symbol, interval)))
+
+    def write(self, symbol, interval, df):
+        """Replace the stored bars with `df`, trimmed to the interval's RETENTION"""
+        keep = PERIOD_SPANS[RETENTION.get(interval, '10y')] + EXTEND_SLACK
+        if not df.empty:
+            df = df[df.index > providers.now() - keep]
+        self._write(self.path(symbol, interval), df)
+        try:
+            os.remove(self.tail_path(symbol, interval))
+        except FileNotFoundError:
+            pass
+
+    def append(self, symbol, interval, fresh):
+        """Add topped-up bars; only the tail file is rewritten until it holds TAIL_ROWS bars"""
+        tail = self.merge(self._read(self.tail_path(symbol, interval)), fresh)
+        if len(tail) >= TAIL_ROWS:
+            self.write(symbol, interval, self.merge(self._read(self.path(symbol, interval)), tail))
+        else:
+            self._write(self.tail_path(symbol, interval), tail)
+
+    @staticmethod
+    def _read(path):
+        if not os.path.exists(path):
+            return pd.DataFrame()
+        try:
+            return pd.read_parquet(path)
+        except Exception:
+            # A corrupt or half-written file is just a cache miss
+            return pd.DataFrame()
+
+    @staticmethod
+    def _write(path, df):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write-then-rename so concurrent readers never see a partial file; the
+        # temp name is unique per call, as several threads may write one symbol
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                df.to_parquet(f)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    @staticmethod
+    def merge(stored, fresh):
+        """Append new bars; a bar that comes back with a known timestamp replaces the stored one"""
+        if stored.empty:
+            return fresh
+        if fresh.empty:
+            return stored
+        merged = pd.concat([stored, fresh])
+        merged = merged[~merged.index.duplicated(keep='last')]
+        return merged.sort_index()
+
+
+def as_of(stored, now):
+    """
+    Stored bars a replay may see: none after the replay clock
+
+    A replay's store keeps what an earlier replay of the same recording,
+    run to a later clock, wrote. Live reads are left alone: a daily bar is
+    labelled by its exchange date, which can be ahead of UTC.
+    """
+    if stored.empty or providers.provider().mode != 'replay':
+        return stored
+    return stored[stored.index <= now]
+
+
+def within(bars, period, now):
+    """The bars of the last `period` (with EXTEND_SLACK to spare); all of them for an unknown period"""
+    span = PERIOD_SPANS.get(period)
+    if span is None or bars.empty:
+        return bars
+    return bars[bars.index > now - span - EXTEND_SLACK]
+
+
+def load_bars(symbol, interval, period, store=None, extend=False):
+    """
+    Return the stored bars for `symbol`, topped up with anything newer from Yahoo.
+
+    Only the bars from the last stored timestamp onward are downloaded. The
+    first call (or one after a gap longer than `period`) downloads the full
+    period instead, as does one with `extend` when the stored bars do not
+    reach back `period`.
+    """
+    store = store or BarStore()
+    now = providers.now()
+    with metrics().span('store_read', symbol=symbol, interval=interval) as s:
+        stored = as_of(store.read(symbol, interval), now)
+        s['rows'] = len(stored)
+
+    span = PERIOD_SPANS.get(period)
+    full = stored.empty or (span is not None and stored.index[-1] < now - span) or (
+        extend and span is not None and stored.index[0] > now - span + EXTEND_SLACK)
+    with metrics().span('download', symbol=symbol, interval=interval) as s:
+        if full:
+            s['mode'] = 'full'
+            raw = providers.download(symbol, interval=interval, period=period, progress=False, auto_adjust=False)
+        else:
+            s['mode'] = 'topup'
+            raw = providers.download(symbol, interval=interval, start=stored.index[-1], progress=False, auto_adjust=False)
+        if raw is not None:
+            s['rows'] = len(raw)
+            s['bytes'] = int(raw.memory_usage(index=True).sum())
+
+    fresh = normalize_bars(raw)
+    if fresh.empty:
+        return within(stored, period, now)
+
+    bars = BarStore.merge(stored, fresh)
+    with metrics().span('store_write', symbol=symbol, interval=interval) as s:
+        if full:
+            store.write(symbol, interval, bars)
+        else:
+            store.append(symbol, interval, fresh)
+        s['rows'] = len(fresh)
+    return within(bars, period, now)
+
+
+def split_download(raw, tickers):
+    """{ticker: bars} from one multi-ticker `yf.download` frame; tickers that did not come back are left out"""
+    if raw is None or raw.empty:
+        return {}
+
+    frames = {}
+    for ticker in tickers:
+        if isinstance(raw.columns, pd.MultiIndex):
+            if ticker not in raw.columns.get_level_values(-1):
+                continue
+            part = raw.xs(ticker, axis=1, level=-1)
+        else:
+            part = raw
+        bars = normalize_bars(part).dropna(how='all')
+        if not bars.empty:
+            frames[ticker] = bars
+    return frames
+
+
+def download_many(symbols, interval, **window):
+    """
+    {symbol: bars} from one multi-ticker request, without touching the store
+
+    `window` is `period=...` for a full download or `start=...` for a top-up.
+    """
+    symbols = list(symbols)
+    with metrics().span('download', interval=interval) as s:
+        s['mode'] = 'batch_topup' if 'start' in window else 'batch_full'
+        raw = providers.download(symbols, interval=interval, group_by='column', progress=False,
+                                 auto_adjust=False, threads=True, **window)
+        if raw is not None:
+            s['rows'] = len(raw)
+            s['bytes'] = int(raw.memory_usage(index=True).sum())
+    return split_download(raw, symbols)
+
+
+def load_bars_many(symbols, interval, period, store=None, chunk_size=200):
+    """
+    `load_bars` for a whole watchlist, one multi-ticker request per chunk
+
+    Symbols with no usable stored history are downloaded for the full
+    period; the rest are topped up together from the oldest of their last
+    stored timestamps. Returns {symbol: bars}, leaving out symbols Yahoo has
+    nothing for.
+    """
+    store = store or BarStore()
+    now = providers.now()
+    with metrics().span('store_read', interval=interval) as s:
+        stored = {symbol: as_of(store.read(symbol, interval), now) for symbol in symbols}
+        s['rows'] = sum(len(df) for df in stored.values())
+
+    span = PERIOD_SPANS.get(period)
+    full = [sym for sym, df in stored.items() if df.empty or (span is not None and df.index[-1] < now - span)]
+    whole = set(full)
+    topup = [sym for sym in stored if sym not in whole]
+
+    fresh = {}
+    for mode, group in (('full', full), ('topup', topup)):
+        for i in range(0, len(group), chunk_size):
+            chunk = group[i:i + chunk_size]
+            if mode == 'full':
+                window = {'period': period}
+            else:
+                window = {'start': min(stored[sym].index[-1] for sym in chunk)}
+            fresh.update(download_many(chunk, interval, **window))
+
+    out = {}
+    for symbol, old in stored.items():
+        new = fresh.get(symbol)
+        if new is None:
+            if not old.empty:
+                out[symbol] = within(old, period, now)
+            continue
+        bars = BarStore.merge(old, new)
+        if symbol in whole:
+            store.write(symbol, interval, bars)
+        else:
+            store.append(symbol, interval, new)
+        out[symbol] = within(bars, period, now)
+    return out
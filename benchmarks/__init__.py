@@ -0,0 +1 @@
+"""Offline benchmarks for the data and render pipeline (python -m benchmarks.run)"""
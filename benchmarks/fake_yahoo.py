@@ -0,0 +1,172 @@
+"""
+Local stand-in for Yahoo's chart API, for exercising fetch_client.py.
+
+    python -m benchmarks.fake_yahoo --port 8765 --fail 0.1 --limit 20
+    DASHBOARD_YAHOO_URL=http://127.0.0.1:8765 streamlit run app.py
+
+Serves `/v8/finance/chart/<ticker>` from `benchmarks.synthetic` bars, in
+the JSON layout Yahoo answers with, and a crumb at `/v1/test/getcrumb`.
+Faults can be injected: a share of requests failing with 500, a request
+rate above which requests get 429 and a Retry-After, extra latency per
+request, symbols that always fail or answer with a malformed chart, and
+a crumb that must be sent (401 without it) and can be rotated.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+import pandas as pd
+
+from benchmarks.synthetic import PERIOD_BARS, synthetic_bars
+
+PREFIX = '/v8/finance/chart/'
+CRUMB_PATH = '/v1/test/getcrumb'
+
+
+def chart_json(symbol, interval, params):
+    """The chart API answer for a synthetic symbol"""
+    bars = synthetic_bars(PERIOD_BARS.get(params.get('range'), 390), interval, seed=zlib.crc32(symbol.encode()))
+    if 'period1' in params:
+        bars = bars[bars.index >= pd.Timestamp(int(params['period1']), unit='s', tz='UTC')]
+    if 'period2' in params:
+        bars = bars[bars.index < pd.Timestamp(int(params['period2']), unit='s', tz='UTC')]
+    return {'chart': {'error': None, 'result': [{
+        'meta': {'symbol': symbol, 'dataGranularity': interval, 'exchangeTimezoneName': 'UTC'},
+        'timestamp': bars.index.as_unit('s').asi8.tolist(),
+        'indicators': {
+            'quote': [{col: bars[col].tolist() for col in ('open', 'high', 'low', 'close', 'volume')}],
+            'adjclose': [{'adjclose': bars['adj close'].tolist()}],
+        },
+    }]}}
+
+
+class FakeYahoo:
+    """The fake chart API on a local port, run on a background thread"""
+
+    def __init__(self, port=0, fail=0.0, limit=None, latency=0.0, down=(), seed=0, malformed=(),
+                 require_crumb=False):
+        self.fail = fail
+        self.limit = limit
+        self.latency = latency
+        self.down = set(down)
+        self.malformed = set(malformed)
+        self.require_crumb = require_crumb
+        self.crumb = 'fake-crumb-0'
+        self.requests = Counter()  # status -> count
+        self._rng = random.Random(seed)
+        self._recent = deque()  # arrival times within the last second
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def rotate_crumb(self):
+        """Expire the current crumb, as Yahoo does now and then"""
+        with self._lock:
+            self.crumb = f"fake-crumb-{int(self.crumb.rsplit('-', 1)[1]) + 1}"
+
+    def _status(self, symbol, crumb=None):
+        """The fault (if any) to answer this request with"""
+        if self.require_crumb and crumb != self.crumb:
+            return 401
+        now = time.monotonic()
+        with self._lock:
+            self._recent.append(now)
+            while self._recent[0] < now - 1:
+                self._recent.popleft()
+            if self.limit is not None and len(self._recent) > self.limit:
+                return 429
+            if symbol in self.down or self._rng.random() < self.fail:
+                return 500
+        return 200
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == CRUMB_PATH:
+                    return self._reply(200, fake.crumb, content_type='text/plain')
+                if not url.path.startswith(PREFIX):
+                    return self._reply(404, {'chart': {'result': None, 'error': {'code': 'Not Found'}}})
+                symbol = unquote(url.path[len(PREFIX):])
+                params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                if fake.latency:
+                    time.sleep(fake.latency)
+                status = fake._status(symbol, params.get('crumb'))
+                if status != 200:
+                    return self._reply(status, {'chart': {'result': None, 'error': {'code': str(status)}}},
+                                       {'Retry-After': '1'} if status == 429 else {})
+                body = chart_json(symbol, params.get('interval', '1d'), params)
+                if symbol in fake.malformed:
+                    del body['chart']['result'][0]['indicators']
+                self._reply(200, body)
+
+            def _reply(self, status, body, headers=(), content_type='application/json'):
+                with fake._lock:
+                    fake.requests[status] += 1
+                payload = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in dict(headers).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-yahoo', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local fake of Yahoo's chart API")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--fail', type=float, default=0.0, help='share of requests answered with 500')
+    parser.add_argument('--limit', type=int, help='requests per second above which requests get 429')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every request')
+    parser.add_argument('--down', nargs='*', default=[], help='symbols that always fail')
+    parser.add_argument('--malformed', nargs='*', default=[], help='symbols answered with a chart missing its prices')
+    parser.add_argument('--require-crumb', action='store_true', help='answer 401 to requests without the crumb')
+    args = parser.parse_args(argv)
+
+    server = FakeYahoo(args.port, args.fail, args.limit, args.latency, args.down,
+                       malformed=args.malformed, require_crumb=args.require_crumb)
+    print(f"fake chart API on {server.url}", flush=True)
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,349 @@
+"""
+Concurrent-session load test of one app replica.
+
+    python -m benchmarks.load                          # 1, 2, 4 and 8 sessions
+    python -m benchmarks.load --sessions 4 16 32 --steps 30 --grid-share 0.5
+    python -m benchmarks.load --replay .recordings     # recorded market data
+    python -m benchmarks.load --compare benchmarks/results/load-<old>.json
+
+Starts one headless Streamlit server for app.py in a subprocess, with its
+downloads routed to `benchmarks.synthetic` (or a recording, see
+providers.py) and its caches in a throwaway directory. N simulated browser
+sessions then connect to it over the app's WebSocket and speak Streamlit's
+own protobuf messages. AppTest cannot stand in for them: it swaps
+process-wide runtime state on every run, so concurrent AppTests in one
+process corrupt each other.
+
+A 'single' user mostly lets the Single Asset view refresh on its timer,
+now and then clicking another symbol or picking another timeframe. A 'grid'
+user opens the Multi-View Grid, changes panel symbols and lets panels tick,
+both as the fragment reruns a browser sends. A rerun's latency runs from
+the request to the server's 'script finished' message.
+
+For each session count the report gives rerun latency percentiles (the
+first page load reported apart), reruns per second, and the server's CPU
+use and resident memory, read from /proc (Linux).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime
+
+import numpy as np
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+from benchmarks.run import APP_PATH, RESULTS_DIR, environment
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SESSIONS = [1, 2, 4, 8]
+SYMBOLS = ('AAPL', 'TSLA', 'NVDA', 'MSFT', 'PTT.BK', 'AOT.BK', 'BTC-USD', 'ETH-USD', '^GSPC')
+TIMEFRAMES = ('5min', '15min', '1hour', '1day')
+GRID_PANELS = 4
+GRID_PAGE = {'📊 กระดานหลายจอ', '📊 Multi-View Grid'}
+WIDGET_KEY = re.compile(r'^\$\$ID-[0-9a-f]+-(.*)$')
+
+# Run with `python -c` in the repo root: app.py <port> <replay dir or ''>
+SERVER = """
+import sys
+from benchmarks.run import isolate
+from streamlit.web import bootstrap
+
+isolate(replay=sys.argv[3] or None)
+options = {'server_port': int(sys.argv[2]), 'server_headless': True, 'browser_gatherUsageStats': False}
+bootstrap.load_config_options(options)
+bootstrap.run(sys.argv[1], False, [], options)
+"""
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🖥️ SERVER
+# ═══════════════════════════════════════════════════════════════
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class AppServer:
+    """app.py under a headless Streamlit server in a subprocess"""
+
+    def __init__(self, port=None, replay=None, startup=90):
+        self.port = port or free_port()
+        self.replay = replay
+        self.startup = startup
+        self.log_path = os.path.join(tempfile.mkdtemp(prefix='dashboard-load-'), 'server.log')
+        self.proc = None
+
+    @property
+    def url(self):
+        return f"ws://127.0.0.1:{self.port}/_stcore/stream"
+
+    def __enter__(self):
+        with open(self.log_path, 'w') as log:
+            self.proc = subprocess.Popen(
+                [sys.executable, '-c', SERVER, APP_PATH, str(self.port), self.replay or ''],
+                cwd=ROOT, stdout=log, stderr=subprocess.STDOUT,
+            )
+        deadline = time.monotonic() + self.startup
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                break
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{self.port}/_stcore/health", timeout=1).read()
+                return self
+            except OSError:
+                time.sleep(0.2)
+        self.__exit__()
+        raise RuntimeError(f"app server did not come up, see {self.log_path}")
+
+    def __exit__(self, *exc):
+        self.proc.terminate()
+        try:
+            self.proc.wait(10)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+
+    def _proc(self, name):
+        with open(f"/proc/{self.proc.pid}/{name}") as f:
+            return f.read()
+
+    def cpu_seconds(self):
+        fields = self._proc('stat').rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')  # utime + stime
+
+    def rss_mb(self):
+        return int(self._proc('statm').split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+    def peak_rss_mb(self):
+        for line in self._proc('status').splitlines():
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 2**10
+        return None
+
+
+# ═══════════════════════════════════════════════════════════════
+# 👤 SESSIONS
+# ═══════════════════════════════════════════════════════════════
+class SimulatedSession:
+    """
+    One browser tab: a WebSocket session driven through a seeded random walk of interactions
+
+    Like the browser, it learns widget ids from the deltas it receives and
+    sends the current value of every widget it has changed with each rerun.
+    """
+
+    def __init__(self, url, kind, seed, think=0.0):
+        self.url = url
+        self.kind = kind
+        self.rng = random.Random(seed)
+        self.think = think
+        self.ws = None
+        self.widgets = {}  # name -> (widget id, fragment id, options)
+        self.values = {}  # widget id -> string value
+        self.view = ''  # fragment the Single Asset view runs in, if any
+        self.cold = []
+        self.latencies = []
+        self.errors = 0
+
+    def _note(self, delta):
+        if delta.fragment_id and not self.view:
+            self.view = delta.fragment_id
+        if delta.WhichOneof('type') != 'new_element':
+            return
+        element = delta.new_element
+        kind = element.WhichOneof('type')
+        if kind == 'exception':
+            self.errors += 1
+            return
+        if kind not in ('radio', 'selectbox', 'button'):
+            return
+        widget = getattr(element, kind)
+        options = list(getattr(widget, 'options', []))
+        match = WIDGET_KEY.match(widget.id)
+        name = match.group(1) if match else widget.id
+        if name == 'None':
+            if kind == 'radio' and set(options) & GRID_PAGE:
+                name = 'page'
+            elif kind == 'selectbox' and tuple(options) == TIMEFRAMES:
+                name = 'timeframe'
+        self.widgets[name] = (widget.id, delta.fragment_id, options)
+
+    async def _rerun(self, into, trigger=None, fragment_id='', auto=False):
+        msg = BackMsg()
+        rerun = msg.rerun_script
+        rerun.query_string = ''
+        for widget_id, value in self.values.items():
+            state = rerun.widget_states.widgets.add()
+            state.id = widget_id
+            state.string_value = value
+        if trigger:
+            state = rerun.widget_states.widgets.add()
+            state.id = trigger
+            state.trigger_value = True
+        if fragment_id:
+            rerun.fragment_id = fragment_id
+            rerun.is_auto_rerun = auto
+
+        started = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        while True:
+            reply = ForwardMsg()
+            reply.ParseFromString(await self.ws.recv())
+            kind = reply.WhichOneof('type')
+            if kind == 'delta':
+                self._note(reply.delta)
+            elif kind == 'script_finished' and reply.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                break
+        into.append(time.perf_counter() - started)
+
+    def _set(self, name, value):
+        widget_id, fragment_id, _ = self.widgets[name]
+        self.values[widget_id] = value
+        return fragment_id
+
+    async def open(self):
+        self.ws = await websockets.connect(self.url, subprotocols=['streamlit'], max_size=None,
+                                           additional_headers={'Origin': self.url.replace('ws://', 'http://')})
+        await self._rerun(self.cold)
+        if self.kind == 'grid':
+            self._set('page', next(o for o in self.widgets['page'][2] if o in GRID_PAGE))
+            await self._rerun(self.cold)
+
+    async def step(self):
+        roll = self.rng.random()
+        if self.kind == 'single':
+            if roll < 0.3:
+                await self._rerun(self.latencies, trigger=self.widgets[f"s_{self.rng.choice(SYMBOLS)}"][0])
+                return
+            if roll < 0.45:
+                self._set('timeframe', self.rng.choice(TIMEFRAMES))
+                await self._rerun(self.latencies)
+            else:
+                # The timed refresh: a rerun of the view's fragment (or of the whole app)
+                await self._rerun(self.latencies, fragment_id=self.view, auto=bool(self.view))
+            return
+
+        panel = f"grid_sel_{self.rng.randrange(GRID_PANELS)}"
+        if roll < 0.3:
+            fragment_id = self._set(panel, self.rng.choice(SYMBOLS))
+            await self._rerun(self.latencies, fragment_id=fragment_id)
+        else:
+            # A panel's own periodic refresh
+            await self._rerun(self.latencies, fragment_id=self.widgets[panel][1], auto=True)
+
+    async def drive(self, steps):
+        try:
+            await self.open()
+            for _ in range(steps):
+                if self.think:
+                    await asyncio.sleep(self.rng.expovariate(1 / self.think))
+                await self.step()
+        finally:
+            if self.ws is not None:
+                await self.ws.close()
+        return self
+
+
+# ═══════════════════════════════════════════════════════════════
+# 📋 LEVELS
+# ═══════════════════════════════════════════════════════════════
+def percentiles(values):
+    if not values:
+        return {}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'p50': p50, 'p95': p95, 'p99': p99, 'max': max(values), 'mean': statistics.fmean(values)}
+
+
+async def run_level(server, sessions, steps, grid_share, think, seed=0):
+    """`sessions` users driven concurrently; returns the level's latency, CPU and memory figures"""
+    grids = round(sessions * grid_share)
+    users = [SimulatedSession(server.url, 'grid' if i < grids else 'single', seed + i, think)
+             for i in range(sessions)]
+
+    cpu, started = server.cpu_seconds(), time.perf_counter()
+    await asyncio.gather(*(user.drive(steps) for user in users))
+    wall = time.perf_counter() - started
+    cpu = server.cpu_seconds() - cpu
+
+    latencies = [x for user in users for x in user.latencies]
+    return {
+        'sessions': sessions, 'grid_sessions': grids, 'reruns': len(latencies),
+        'rerun': percentiles(latencies),
+        'rerun_single': percentiles([x for u in users if u.kind == 'single' for x in u.latencies]),
+        'rerun_grid': percentiles([x for u in users if u.kind == 'grid' for x in u.latencies]),
+        'cold': percentiles([x for user in users for x in user.cold]),
+        'reruns_per_s': len(latencies) / wall, 'wall_s': wall,
+        'cpu_pct': 100 * cpu / wall, 'rss_mb': server.rss_mb(), 'peak_rss_mb': server.peak_rss_mb(),
+        'errors': sum(user.errors for user in users),
+    }
+
+
+def report(levels, baseline=None):
+    old = {level['sessions']: level for level in baseline or []}
+    print(f"{'sessions':>8}  {'p50':>8}  {'p95':>8}  {'p99':>8}  {'cold p50':>8}  {'rerun/s':>7}  "
+          f"{'cpu':>5}  {'rss':>7}  errors" + ("  p95 baseline" if old else ''))
+    for level in levels:
+        r, cold = level['rerun'], level['cold']
+        line = (f"{level['sessions']:>8}  {r['p50'] * 1000:6.0f}ms  {r['p95'] * 1000:6.0f}ms  {r['p99'] * 1000:6.0f}ms  "
+                f"{cold['p50'] * 1000:6.0f}ms  {level['reruns_per_s']:7.1f}  {level['cpu_pct']:4.0f}%  "
+                f"{level['rss_mb']:5.0f}MB  {level['errors']:>6}")
+        before = old.get(level['sessions'])
+        if before:
+            line += f"  {before['rerun']['p95'] * 1000:6.0f}ms  x{r['p95'] / before['rerun']['p95']:.2f}"
+        print(line)
+
+
+async def run_levels(server, args):
+    levels = []
+    for sessions in args.sessions:
+        levels.append(await run_level(server, sessions, args.steps, args.grid_share, args.think, args.seed))
+        print(f"{sessions} sessions: p95 {levels[-1]['rerun']['p95'] * 1000:.0f} ms", flush=True)
+    return levels
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Concurrent-session load test of one app replica')
+    parser.add_argument('--sessions', type=int, nargs='+', default=DEFAULT_SESSIONS,
+                        help='concurrent session counts, one level each')
+    parser.add_argument('--steps', type=int, default=20, help='interactions per session after opening the app')
+    parser.add_argument('--grid-share', type=float, default=0.25, help='fraction of sessions on the Multi-View Grid')
+    parser.add_argument('--think', type=float, default=0.0, help="mean seconds between a user's interactions")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--port', type=int, help='port for the app server (default: any free port)')
+    parser.add_argument('--replay', help='recording directory to serve downloads from instead of synthetic data')
+    parser.add_argument('--output', help='result file (default: benchmarks/results/load-<timestamp>.json)')
+    parser.add_argument('--compare', help='earlier load result file to compare p95 against')
+    args = parser.parse_args(argv)
+
+    with AppServer(args.port, args.replay and os.path.abspath(args.replay)) as server:
+        levels = asyncio.run(run_levels(server, args))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['levels']
+    print()
+    report(levels, baseline)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"load-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'created': datetime.now().isoformat(timespec='seconds'), 'environment': environment(),
+                   'config': vars(args), 'levels': levels}, f, indent=2)
+    print(f"results written to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,451 @@
+"""
+Offline benchmark suite for the data and render pipeline.
+
+    python -m benchmarks.run                      # default sizes, writes benchmarks/results/<stamp>.json
+    python -m benchmarks.run --sizes 300 10000    # skip the 1M-bar case
+    python -m benchmarks.run --compare benchmarks/results/<old>.json
+
+Every fetch goes through `benchmarks.synthetic` (or, with --replay, a
+recording made with DASHBOARD_DATA_MODE=record; see providers.py), and the
+bar store, shared cache and scan/backtest caches point at a throwaway
+directory, so a run needs no network and leaves the working tree alone.
+The fetch client cases talk HTTP to a local fake chart API (fake_yahoo.py).
+
+    python -m benchmarks.run --replay .recordings    # recorded market data
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+
+DEFAULT_SIZES = [300, 10_000, 1_000_000]
+DEFAULT_RENDER_SIZES = [300, 10_000]
+
+
+def isolate(root=None, replay=None):
+    """Point every on-disk cache at `root` and route downloads to synthetic data (or the `replay` recording)"""
+    root = root or tempfile.mkdtemp(prefix='dashboard-bench-')
+    os.environ['BAR_STORE_DIR'] = os.path.join(root, 'bars')
+    os.environ['SCAN_PROGRESS_DIR'] = os.path.join(root, 'scan')
+    os.environ['BACKTEST_CACHE_DIR'] = os.path.join(root, 'backtest')
+    os.environ['DASHBOARD_CACHE_URL'] = 'memory://'
+
+    if replay:
+        # A frozen replay clock: snapshots served as fast as the disk reads them
+        os.environ['DASHBOARD_DATA_MODE'] = 'replay'
+        os.environ['DASHBOARD_RECORD_DIR'] = os.path.abspath(replay)
+        os.environ.pop('DASHBOARD_REPLAY_SPEED', None)
+    else:
+        from benchmarks import synthetic
+        synthetic.install()
+    return root
+
+
+def timed(fn, repeat=5):
+    """Wall-clock seconds of `fn()` over `repeat` runs"""
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - started)
+    return {'median': statistics.median(runs), 'min': min(runs), 'max': max(runs), 'runs': len(runs)}
+
+
+def repeats_for(n):
+    return 5 if n <= 10_000 else 1
+
+
+# ═══════════════════════════════════════════════════════════════
+# 📈 INDICATORS
+# ═══════════════════════════════════════════════════════════════
+def bench_indicators(sizes):
+    from benchmarks.synthetic import synthetic_bars
+    from indicators import IndicatorEngine, add_indicators
+    from kernels import compute_indicators
+
+    results = {}
+    for n in sizes:
+        bars = synthetic_bars(n).drop(columns='adj close')
+        repeat = repeats_for(n)
+
+        results[f'indicators.pandas[{n}]'] = timed(lambda: add_indicators(bars.copy()), repeat)
+        high, low, close = (bars[col].to_numpy() for col in ('high', 'low', 'close'))
+        results[f'indicators.kernel[{n}]'] = timed(lambda: compute_indicators(high, low, close), repeat)
+        results[f'indicators.engine_cold[{n}]'] = timed(lambda: IndicatorEngine().update(bars), repeat)
+
+        # A refresh: the forming bar is revised and re-applied on a warm engine
+        engine = IndicatorEngine()
+        engine.update(bars)
+        revised = bars.copy()
+        revised.iloc[-1, revised.columns.get_loc('close')] *= 1.001
+        results[f'indicators.engine_refresh[{n}]'] = timed(lambda: engine.update(revised), max(repeat, 5))
+    return results
+
+
+def bench_kernel_batch(symbols=500, bars=300):
+    """Many symbols at once: the per-symbol pandas loop against one kernel call per dtype"""
+    from benchmarks.synthetic import synthetic_bars
+    from indicators import add_indicators
+    from kernels import allocate, compute_indicators, stack_bars
+
+    frames = [synthetic_bars(bars, '1d', seed=i).drop(columns='adj close') for i in range(symbols)]
+    results = {f'indicators.pandas_loop[{symbols}x{bars}]': timed(lambda: [add_indicators(df.copy()) for df in frames], 1)}
+    for dtype in (np.float64, np.float32):
+        arrays = stack_bars(frames, dtype=dtype)
+        out = allocate(symbols, bars, dtype)
+        stats = timed(lambda: compute_indicators(arrays['high'], arrays['low'], arrays['close'], out=out, dtype=dtype))
+        stats['output_bytes'] = out.nbytes
+        results[f'indicators.kernel_batch_{np.dtype(dtype).name}[{symbols}x{bars}]'] = stats
+    return results
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🎨 CHART PAYLOADS
+# ═══════════════════════════════════════════════════════════════
+def chart_frame(n):
+    """Indicator frame shaped like `build_pro_data` output: naive Bangkok times in a column"""
+    from benchmarks.synthetic import synthetic_bars
+    from indicators import add_indicators
+
+    df = add_indicators(synthetic_bars(n + 200).drop(columns='adj close'))
+    df.index = df.index.tz_convert('Asia/Bangkok')
+    df = df.reset_index()
+    df['time'] = df['time'].dt.tz_localize(None)
+    return df.dropna().tail(n).reset_index(drop=True)
+
+
+def main_chart(payload):
+    """The app's main chart (charts.render_main_chart) with every indicator switched on"""
+    from charts import new_chart, render_main_chart
+
+    chart = new_chart(550)
+    render_main_chart(chart, payload, volume=True, bollinger=True, ema50=True, ema200=True)
+    return chart
+
+
+def full_chart(payload):
+    """The app's grid panel chart (charts.render_full_chart) with every indicator switched on"""
+    from charts import new_chart, render_full_chart
+
+    chart = new_chart(350)
+    render_full_chart(chart, payload, volume=True, ema50=True, ema200=True)
+    return chart
+
+
+def bench_render(sizes):
+    from lightweight_charts.widgets import StreamlitChart
+    from payload import build_payload
+
+    base = len(StreamlitChart()._html)  # the bundled JS/CSS every chart carries
+    results = {}
+    for n in sizes:
+        df = chart_frame(n)
+        payload = build_payload(df)
+        repeat = repeats_for(n)
+
+        results[f'render.build_payload[{n}]'] = timed(lambda: build_payload(df), max(repeat, 5))
+        for name, build in (('main_chart', main_chart), ('full_chart', full_chart)):
+            stats = timed(lambda: build(payload), repeat)
+            stats['script_bytes'] = len(build(payload)._html) - base
+            results[f'render.{name}[{n}]'] = stats
+    return results
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🔗 CORRELATION
+# ═══════════════════════════════════════════════════════════════
+def bench_correlation(symbols=500, bars=300, window=60):
+    from benchmarks.synthetic import synthetic_bars
+    from correlation import RollingCorrelation, align_closes, cluster_order, top_pairs
+
+    closes = align_closes({f"S{i}": synthetic_bars(bars, '1d', seed=i) for i in range(symbols)})
+    results = {}
+
+    def rebuild():
+        RollingCorrelation(window).sync(closes.iloc[:-1])
+
+    results[f'correlation.rebuild[{symbols}]'] = timed(rebuild)
+
+    # A refresh where one new bar arrived: one rank-one update
+    book = RollingCorrelation(window)
+    book.sync(closes.iloc[:-1])
+    newer = closes.iloc[:-1].copy()
+
+    def push():
+        newer.loc[newer.index[-1] + (closes.index[-1] - closes.index[-2])] = closes.iloc[-1].to_numpy()
+        book.sync(newer)
+
+    results[f'correlation.push[{symbols}]'] = timed(push, 20)
+
+    def refresh_view():
+        corr = book.matrix()
+        cluster_order(corr)
+        top_pairs(corr, book.symbols, k=15)
+        top_pairs(corr, book.symbols, k=15, lowest=True)
+
+    results[f'correlation.matrix_view[{symbols}]'] = timed(refresh_view)
+    return results
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🔔 ALERTS
+# ═══════════════════════════════════════════════════════════════
+def bench_alerts(symbols=2000, bars=300):
+    """A watchlist poll where one new bar arrived for every symbol"""
+    from alerts import AlertEngine
+    from benchmarks.synthetic import synthetic_bars
+
+    frames = [synthetic_bars(bars + 1, '5m', seed=i) for i in range(symbols)]
+    engine = AlertEngine()
+    started = time.perf_counter()
+    for i, df in enumerate(frames):
+        engine.evaluate(f"S{i}", '5m', df.iloc[:-1])
+    results = {f'alerts.seed[{symbols}x{bars}]': {'median': time.perf_counter() - started, 'runs': 1}}
+
+    def poll():
+        for i, df in enumerate(frames):
+            engine.evaluate(f"S{i}", '5m', df.iloc[-2:])
+
+    # The first poll steps the new bar; later ones find it unchanged
+    results[f'alerts.new_bar[{symbols}]'] = timed(poll, 1)
+    results[f'alerts.unchanged[{symbols}]'] = timed(poll)
+    return results
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🌐 FETCH CLIENT
+# ═══════════════════════════════════════════════════════════════
+def bench_fetch(symbols=200):
+    """Multi-ticker downloads through fetch_client.py against the local fake chart API"""
+    from benchmarks.fake_yahoo import FakeYahoo
+    from fetch_client import FetchClient
+
+    tickers = [f"S{i}" for i in range(symbols)]
+    results = {}
+
+    def download(client):
+        return client.download(tickers, interval='1d', period='6mo').columns.get_level_values(1).nunique()
+
+    with FakeYahoo() as server:
+        client = FetchClient(server.url, rate=10_000, burst=10_000)
+        results[f'fetch.batch[{symbols}]'] = timed(lambda: download(client), 3)
+
+    # Upstream throttles above 50 requests/s: a bucket at 45/s against retrying the 429s
+    for name, rate in (('paced', 45), ('unpaced', 10_000)):
+        with FakeYahoo(limit=50) as server:
+            client = FetchClient(server.url, rate=rate, burst=5, max_backoff=2.0)
+            started = time.perf_counter()
+            complete = download(client)
+            results[f'fetch.throttled_{name}[{symbols}]'] = {
+                'median': time.perf_counter() - started, 'runs': 1,
+                'complete': complete, 'throttled': server.requests[429]}
+
+    # One request in five fails: retries with jittered backoff
+    with FakeYahoo(fail=0.2) as server:
+        client = FetchClient(server.url, rate=10_000, burst=10_000, backoff=0.01, max_backoff=0.1)
+        started = time.perf_counter()
+        complete = download(client)
+        results[f'fetch.flaky[{symbols}]'] = {'median': time.perf_counter() - started, 'runs': 1,
+                                              'complete': complete, 'failed': server.requests[500]}
+    return results
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🔌 DATA API
+# ═══════════════════════════════════════════════════════════════
+def bench_api(bars=300, polls=50):
+    """Pollers of data_api.py: full answers, 304 revalidations and `since=` deltas"""
+    import http.client
+
+    from benchmarks.synthetic import synthetic_bars
+    from data_api import serve_api
+    from indicators import add_indicators
+
+    df = add_indicators(synthetic_bars(bars, '5m', seed=1)[['open', 'high', 'low', 'close', 'volume']])
+    df.index = df.index.tz_convert('Asia/Bangkok').tz_localize(None)
+    df = df.rename_axis('time').reset_index()
+    server = serve_api(lambda symbol, timeframe: (df, None), ['5min'], 0)
+    conn = http.client.HTTPConnection('127.0.0.1', server.server_address[1])
+
+    def get(path, headers=None):
+        conn.request('GET', path, headers=headers or {})
+        response = conn.getresponse()
+        return response, response.read()
+
+    path = '/v1/indicators/S1/5min'
+    first, body = get(path)
+    since = int(df['time'].iloc[-1].tz_localize('Asia/Bangkok').timestamp())
+    cases = {
+        'full': (path, {}),
+        'not_modified': (path, {'If-None-Match': first.getheader('ETag')}),
+        'since': (f"{path}?since={since}", {}),
+        'arrow': (f"{path}?format=arrow", {}),
+    }
+    results = {}
+    for name, (url, headers) in cases.items():
+        stats = timed(lambda: [get(url, headers) for _ in range(polls)], 3)
+        stats.update((key, stats[key] / polls) for key in ('median', 'min', 'max'))
+        stats['bytes'] = len(get(url, headers)[1])
+        results[f'api.{name}[{bars}]'] = stats
+    conn.close()
+    server.shutdown()
+    return results
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🕰️ MARKET CALENDAR
+# ═══════════════════════════════════════════════════════════════
+def bench_calendar(per_file=5, days=7, every=120, ttl=110):
+    """
+    Upstream fetches a global watchlist costs over a week of timed refreshes
+
+    Every `every` seconds each symbol whose data has gone stale is fetched
+    again: with a plain `ttl` that is every refresh, with the trading
+    calendar (markets.fresh_until) only while its market trades.
+    """
+    from markets import fresh_until
+    from universe import load_universe, universe_files
+
+    tickers = ['BTC-USD', 'ETH-USD']
+    for path in universe_files().values():
+        tickers += [ticker for _, _, ticker in load_universe(path)[:per_file]]
+    start = pd.Timestamp('2026-10-12', tz='UTC').timestamp()  # a Monday
+    ticks = np.arange(start, start + days * 86400, every)
+
+    def fetches():
+        count = 0
+        for ticker in tickers:
+            until = -np.inf
+            for now in ticks:
+                if now >= until:
+                    count += 1
+                    until = fresh_until(ticker, now, ttl)
+        return count
+
+    started = time.perf_counter()
+    count = fetches()
+    return {f'calendar.week[{len(tickers)}]': {
+        'median': time.perf_counter() - started, 'runs': 1,
+        'fetches': count, 'plain_fetches': len(tickers) * len(ticks)}}
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🖥️ HEADLESS APP
+# ═══════════════════════════════════════════════════════════════
+def page_bytes(at):
+    """Total size of the chart iframes the last run emitted"""
+    return sum(len(el.proto.srcdoc) for el in at.main
+               if type(el).__name__ == 'UnknownElement' and el.type == 'iframe')
+
+
+def bench_app(repeat=3):
+    from streamlit.testing.v1 import AppTest
+
+    results = {}
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+
+    started = time.perf_counter()
+    at.run()
+    results['app.single_cold'] = {'median': time.perf_counter() - started, 'runs': 1}
+    if at.exception:
+        raise RuntimeError(f"app raised: {at.exception[0].value}")
+
+    for cb in at.sidebar.checkbox:
+        cb.check()
+    stats = timed(at.run, repeat)
+    stats['page_bytes'] = page_bytes(at)
+    results['app.single_warm'] = stats
+
+    page = at.sidebar.radio[0]
+    page.set_value(page.options[1])
+    started = time.perf_counter()
+    at.run()
+    results['app.grid_cold'] = {'median': time.perf_counter() - started, 'runs': 1}
+    stats = timed(at.run, repeat)
+    stats['page_bytes'] = page_bytes(at)
+    results['app.grid_warm'] = stats
+    if at.exception:
+        raise RuntimeError(f"app raised: {at.exception[0].value}")
+    return results
+
+
+# ═══════════════════════════════════════════════════════════════
+# 📋 REPORT
+# ═══════════════════════════════════════════════════════════════
+def environment():
+    import streamlit
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'streamlit': streamlit.__version__,
+        'data': os.environ['DASHBOARD_RECORD_DIR'] if os.environ.get('DASHBOARD_DATA_MODE') == 'replay' else 'synthetic',
+    }
+
+
+def report(results, baseline=None):
+    width = max(len(name) for name in results)
+    header = f"{'case':<{width}}  {'median':>13}"
+    print(header + (f"  {'baseline':>13}  speedup" if baseline else ''))
+    for name, stats in results.items():
+        line = f"{name:<{width}}  {stats['median'] * 1000:10.2f} ms"
+        old = (baseline or {}).get(name)
+        if old:
+            line += f"  {old['median'] * 1000:10.2f} ms  x{old['median'] / stats['median']:.2f}"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Offline benchmarks for the dashboard pipeline')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='bar counts for the indicator cases')
+    parser.add_argument('--render-sizes', type=int, nargs='+', default=DEFAULT_RENDER_SIZES)
+    parser.add_argument('--skip-app', action='store_true', help='skip the headless AppTest runs')
+    parser.add_argument('--output', help='result file (default: benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--compare', help='earlier result file to show speedups against')
+    parser.add_argument('--replay', help='recording directory to serve downloads from instead of synthetic data')
+    args = parser.parse_args(argv)
+
+    isolate(replay=args.replay)
+    results = {}
+    results.update(bench_indicators(args.sizes))
+    results.update(bench_kernel_batch())
+    results.update(bench_render(args.render_sizes))
+    results.update(bench_correlation())
+    results.update(bench_alerts())
+    results.update(bench_fetch())
+    results.update(bench_api())
+    results.update(bench_calendar())
+    if not args.skip_app:
+        results.update(bench_app())
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+    report(results, baseline)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'created': datetime.now().isoformat(timespec='seconds'), 'environment': environment(),
+                   'results': results}, f, indent=2)
+    print(f"results written to {output}")
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    main()
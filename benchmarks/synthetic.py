@@ -0,0 +1,63 @@
+"""
+Synthetic OHLCV data shaped like `yf.download` output.
+
+`install()` swaps the live provider's download for `fake_download`, so
+everything that fetches live data (bar store, scanner, backtests, the app
+itself) runs without network access and with deterministic data.
+"""
+import zlib
+
+import numpy as np
+import pandas as pd
+
+import providers
+
+FREQS = {'1m': '1min', '5m': '5min', '15m': '15min', '1h': '1h', '1d': '1D'}
+PERIOD_BARS = {'5d': 390, '1mo': 160, '60d': 60 * 288, '6mo': 126, '1y': 252, '2y': 504}
+END = pd.Timestamp('2026-01-02 20:00', tz='UTC')
+
+
+def synthetic_bars(n, interval='5m', seed=0, end=END):
+    """`n` bars of a geometric random walk with a UTC DatetimeIndex named 'time'"""
+    freq = FREQS.get(interval, '1D')
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    spread = np.abs(rng.normal(0, 0.001, n)) * close
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    index = pd.date_range(end=end.floor(freq), periods=n, freq=freq, name='time')
+    return pd.DataFrame({
+        'adj close': close,
+        'close': close,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'open': open_,
+        'volume': rng.integers(1_000, 100_000, n).astype(float),
+    }, index=index)
+
+
+def fake_download(tickers, interval='1d', period=None, start=None, end=None, **kwargs):
+    """Drop-in for `yf.download`: (Price, Ticker) MultiIndex columns, like yfinance returns"""
+    symbols = tickers.split() if isinstance(tickers, str) else list(tickers)
+    n = PERIOD_BARS.get(period, 390)
+    frames = {}
+    for sym in symbols:
+        bars = synthetic_bars(n, interval, seed=zlib.crc32(sym.encode()))
+        if start is not None:
+            start_ts = pd.Timestamp(start)
+            start_ts = start_ts.tz_localize('UTC') if start_ts.tz is None else start_ts
+            bars = bars[bars.index >= start_ts]
+        if interval == '1d':
+            bars.index = bars.index.tz_localize(None).rename('Date')
+        else:
+            bars.index = bars.index.rename('Datetime')
+        bars.columns = ['Adj Close', 'Close', 'High', 'Low', 'Open', 'Volume']
+        frames[sym] = bars
+
+    df = pd.concat(frames, axis=1).swaplevel(0, 1, axis=1)
+    df.columns.names = ['Price', 'Ticker']
+    return df
+
+
+def install():
+    """Route every live download (providers.LiveProvider) through `fake_download`"""
+    providers.LiveProvider.download = lambda self, tickers, **kwargs: fake_download(tickers, **kwargs)
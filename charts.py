@@ -0,0 +1,77 @@
+"""
+Lightweight-charts rendering of chart payloads.
+
+The dashboard's main price chart and the grid panel's chart, drawn from a
+payload (see payload.py) with the indicators to show passed in, so the page
+and the render benchmarks build exactly the same charts.
+"""
+import streamlit as st
+
+from payload import candle_frame, set_series
+from telemetry import metrics
+
+
+def new_chart(height):
+    """
+    A lightweight-charts chart
+    
+    The package is imported here rather than at the top: it pulls in
+    IPython (~0.2 s), which pages without charts never need.
+    """
+    from lightweight_charts.widgets import StreamlitChart
+    return StreamlitChart(height=height)
+
+
+def load_chart(chart_obj, name):
+    """Emit a chart's HTML page, timed and sized"""
+    with metrics().span('chart_load', chart=name) as s:
+        s['bytes'] = len(chart_obj._html)
+        chart_obj.load()
+
+
+def render_main_chart(chart_obj, payload, volume=True, bollinger=False, ema50=True, ema200=True):
+    """Render main price chart with price-related indicators; returns {column: series}"""
+    with metrics().span('render_main_chart') as s:
+        s['rows'] = len(payload['time'])
+        series = {}
+        try:
+            chart_obj.legend(visible=True, font_size=12, font_family='SF Pro Display, Segoe UI, sans-serif')
+            chart_obj.set(candle_frame(payload))
+            
+            if volume:
+                series['volume'] = set_series(chart_obj.create_histogram(name='Volume', color='rgba(102, 126, 234, 0.3)'), payload, 'volume')
+            
+            if bollinger:
+                series['bb_up'] = set_series(chart_obj.create_line(name='BB Upper', color='rgba(147, 197, 253, 0.6)'), payload, 'bb_up')
+                series['bb_low'] = set_series(chart_obj.create_line(name='BB Lower', color='rgba(147, 197, 253, 0.6)'), payload, 'bb_low')
+            
+            if ema50:
+                series['ema50'] = set_series(chart_obj.create_line(name='EMA 50', color='#fbbf24', width=2), payload, 'ema50')
+            
+            if ema200:
+                series['ema200'] = set_series(chart_obj.create_line(name='EMA 200', color='#a855f7', width=2), payload, 'ema200')
+        except Exception as e:
+            st.error(f"Chart rendering error: {str(e)}")
+        return series
+
+
+def render_full_chart(chart_obj, payload, volume=True, ema50=True, ema200=True):
+    """Render simplified chart for grid view; returns {column: series}"""
+    with metrics().span('render_full_chart') as s:
+        s['rows'] = len(payload['time'])
+        series = {}
+        try:
+            chart_obj.legend(visible=True, font_size=11, font_family='SF Pro Display, Segoe UI, sans-serif')
+            chart_obj.set(candle_frame(payload))
+            
+            if volume:
+                series['volume'] = set_series(chart_obj.create_histogram(name='Volume', color='rgba(102, 126, 234, 0.3)'), payload, 'volume')
+            
+            if ema50:
+                series['ema50'] = set_series(chart_obj.create_line(name='EMA 50', color='#fbbf24', width=2), payload, 'ema50')
+            
+            if ema200:
+                series['ema200'] = set_series(chart_obj.create_line(name='EMA 200', color='#a855f7', width=2), payload, 'ema200')
+        except Exception as e:
+            st.error(f"Grid chart error: {str(e)}")
+        return series
@@ -0,0 +1,170 @@
+"""
+Rolling return correlations across a watchlist.
+
+Closes of every symbol are aligned on one time axis and turned into a
+(bars × symbols) array of log returns. `RollingCorrelation` keeps, for the
+last `window` returns, each symbol's sum and the symbols × symbols matrix of
+cross products, so the correlation matrix is one normalization away. A new
+bar is a rank-one update (add the new return row, subtract the one leaving
+the window) and a revised forming bar swaps only the newest row, instead of
+recomputing the whole window.
+
+- `align_closes`: {symbol: bars} -> one forward-filled close table
+- `cluster_order`: spectral seriation so correlated groups form blocks
+- `top_pairs`: the most (or least) correlated pairs of a matrix
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_WINDOW = 60
+
+
+def align_closes(frames):
+    """Time × symbols table of closes on the union of every symbol's timestamps, gaps forward-filled"""
+    closes = pd.DataFrame({symbol: bars['close'] for symbol, bars in frames.items() if 'close' in bars})
+    return closes.sort_index().ffill()
+
+
+class RollingCorrelation:
+    """
+    Correlation of the last `window` log returns of every usable symbol
+
+    A symbol is usable when it has a positive close on each of the last
+    `window + 1` bars. `sync` is safe to call from concurrent sessions.
+    """
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.window = window
+        self.symbols = []
+        self.last_time = None
+        self._lock = threading.Lock()
+        self._rows = None  # (window, n) ring buffer of returns
+        self._pos = 0  # row holding the oldest return
+        self._sum = None
+        self._cross = None
+        self._last_close = None
+        self._prev_close = None
+        self._pushes = 0
+
+    def sync(self, closes):
+        """
+        Bring the window up to `closes` (see `align_closes`)
+
+        Returns what it took: 'none', 'revise' (forming bar changed), 'push'
+        (new bars rolled in), 'rebuild' or 'empty' (too little data).
+        """
+        with self._lock:
+            tail = closes.iloc[-(self.window + 1):]
+            if len(tail) <= self.window:
+                self._clear()
+                return 'empty'
+            usable = (tail > 0).all().to_numpy()
+            symbols = list(tail.columns[usable])
+            if len(symbols) < 2:
+                self._clear()
+                return 'empty'
+
+            if symbols != self.symbols or self.last_time not in closes.index:
+                self._rebuild(tail[symbols], symbols)
+                return 'rebuild'
+            values = closes.loc[self.last_time:, symbols].to_numpy(dtype=float)
+            if len(values) > self.window:
+                self._rebuild(tail[symbols], symbols)
+                return 'rebuild'
+
+            mode = 'none'
+            if not np.array_equal(values[0], self._last_close):
+                self._replace_newest(np.log(values[0] / self._prev_close))
+                self._last_close = values[0]
+                mode = 'revise'
+            for row in values[1:]:
+                self._push(np.log(row / self._last_close))
+                self._prev_close, self._last_close = self._last_close, row
+                mode = 'push'
+            self.last_time = closes.index[-1]
+            return mode
+
+    def _clear(self):
+        self.symbols, self.last_time, self._rows = [], None, None
+
+    def _rebuild(self, tail, symbols):
+        values = tail.to_numpy(dtype=float)
+        self.symbols = symbols
+        self.last_time = tail.index[-1]
+        self._rows = np.diff(np.log(values), axis=0)
+        self._pos = 0
+        self._last_close, self._prev_close = values[-1], values[-2]
+        self._resum()
+
+    def _resum(self):
+        """Exact sums from the buffer; also clears the rounding drift of many rank-one updates"""
+        self._sum = self._rows.sum(axis=0)
+        self._cross = self._rows.T @ self._rows
+        self._pushes = 0
+
+    def _push(self, returns):
+        old = self._rows[self._pos].copy()
+        self._rows[self._pos] = returns
+        self._pos = (self._pos + 1) % self.window
+        self._sum += returns - old
+        self._cross += np.outer(returns, returns)
+        self._cross -= np.outer(old, old)
+        self._pushes += 1
+        if self._pushes >= self.window:
+            self._resum()
+
+    def _replace_newest(self, returns):
+        newest = (self._pos - 1) % self.window
+        old = self._rows[newest].copy()
+        self._rows[newest] = returns
+        self._sum += returns - old
+        self._cross += np.outer(returns, returns)
+        self._cross -= np.outer(old, old)
+
+    def matrix(self):
+        """Symbols × symbols correlation (NaN for a symbol that did not move in the window)"""
+        with self._lock:
+            if self._rows is None:
+                return np.empty((0, 0))
+            mean = self._sum / self.window
+            cov = self._cross / self.window - np.outer(mean, mean)
+        std = np.sqrt(np.clip(np.diag(cov), 0, None))
+        std[std < 1e-12] = np.nan
+        corr = np.clip(cov / np.outer(std, std), -1.0, 1.0)
+        np.fill_diagonal(corr, np.where(np.isnan(std), np.nan, 1.0))
+        return corr
+
+
+def cluster_order(corr):
+    """
+    Row order that puts mutually correlated symbols next to each other
+
+    Sorts by the Fiedler vector of the affinity graph (1 + corr) / 2, which
+    places strongly connected groups in contiguous blocks of the heatmap.
+    """
+    n = len(corr)
+    if n < 3:
+        return np.arange(n)
+    affinity = (1 + np.nan_to_num(corr)) / 2
+    laplacian = np.diag(affinity.sum(axis=1)) - affinity
+    _, vectors = np.linalg.eigh(laplacian)
+    return np.argsort(vectors[:, 1], kind='stable')
+
+
+def top_pairs(corr, symbols, k=10, lowest=False):
+    """The `k` most correlated distinct pairs (least correlated with `lowest`) as a DataFrame"""
+    i, j = np.triu_indices(len(corr), 1)
+    values = corr[i, j]
+    valid = ~np.isnan(values)
+    i, j, values = i[valid], j[valid], values[valid]
+    k = min(k, len(values))
+    if k == 0:
+        return pd.DataFrame(columns=['a', 'b', 'corr'])
+
+    ranked = values if lowest else -values
+    pick = np.argpartition(ranked, k - 1)[:k]
+    pick = pick[np.argsort(ranked[pick], kind='stable')]
+    names = np.asarray(symbols, dtype=object)
+    return pd.DataFrame({'a': names[i[pick]], 'b': names[j[pick]], 'corr': values[pick]})
@@ -0,0 +1,246 @@
+"""
+Headless data API: the dashboard's indicator frames over HTTP.
+
+Other services read the numbers the charts are drawn from without
+rendering the page. Frames come from the same caches the charts read (see
+pro_data.py), and a polled symbol is kept fresh by the background
+refresher like one on screen.
+
+    GET /v1/bars/<symbol>/<timeframe>         time and OHLCV
+    GET /v1/indicators/<symbol>/<timeframe>   time, OHLCV and every indicator column
+    GET /v1/signals/<symbol>/<timeframe>      the latest bar: signal, support/resistance, RSI, MACD, ...
+
+Query parameters:
+- `since=<epoch seconds | ISO time>`: only bars from that time on. Pass the
+  time of the last bar you hold; it is sent again, as it may have been
+  still forming.
+- `format=json` (default) or `format=arrow` (also `Accept:
+  application/vnd.apache.arrow.stream`): one Arrow IPC stream.
+
+Times are UTC: epoch seconds in JSON, timestamp[s, UTC] in Arrow. Every
+answer has a strong ETag over its rows; a request whose If-None-Match
+matches gets a 304 without a body, so an unchanged poll costs a hash
+instead of a serialization.
+
+Run it from process start, so it listens before anyone opens the page:
+
+    python data_api.py               the API alone; it shares the dashboard's
+                                     frames through the shared cache
+    python data_api.py --dashboard   the API, and the Streamlit app in the same
+                                     process (one bar cache, one refresher)
+
+Configuration from the environment:
+DASHBOARD_API_PORT  port of the API (default 8503)
+DASHBOARD_API_HOST  interface to bind (default 127.0.0.1)
+"""
+import hashlib
+import io
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+import numpy as np
+import pandas as pd
+
+from payload import widen
+from telemetry import metrics
+
+BAR_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+SIGNAL_COLUMNS = ['close', 'signal', 'sup', 'res', 'rsi', 'macd_line', 'macd_signal', 'macd_hist',
+                  'ema50', 'ema200', 'bb_up', 'bb_low', 'cum_ret']
+RESOURCES = ('bars', 'indicators', 'signals')
+ARROW_TYPE = 'application/vnd.apache.arrow.stream'
+DEFAULT_PORT = 8503  # next to Streamlit's 8501
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+
+
+class ApiError(Exception):
+    """A request answered with `status` and a JSON error body"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_since(value):
+    """Epoch seconds or an ISO time (UTC unless it says otherwise) -> UTC Timestamp"""
+    try:
+        return pd.Timestamp(float(value), unit='s', tz='UTC')
+    except (ValueError, OverflowError):
+        pass
+    try:
+        stamp = pd.Timestamp(value)
+    except ValueError as e:
+        raise ApiError(400, f"bad since: {value}") from e
+    return stamp.tz_localize('UTC') if stamp.tz is None else stamp.tz_convert('UTC')
+
+
+def select(df, resource, since=None, tz='Asia/Bangkok'):
+    """
+    The rows and columns a resource answers with, indexed by UTC time
+
+    `df` is an indicator frame as `load_pro_data` returns it, with naive
+    wall-clock times in `tz`.
+    """
+    frame = df.set_index(pd.DatetimeIndex(df['time']).tz_localize(tz).tz_convert('UTC')).drop(columns='time')
+    if resource == 'bars':
+        frame = frame[[col for col in BAR_COLUMNS if col in frame]]
+    elif resource == 'signals':
+        frame = frame[[col for col in SIGNAL_COLUMNS if col in frame]].iloc[-1:]
+    if since is not None:
+        frame = frame[frame.index >= since]
+    return frame
+
+
+def etag(frame, *parts):
+    """Strong validator over the rows, the columns and whatever else shapes the answer"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps([*parts, list(frame.columns)]).encode())
+    digest.update(frame.index.as_unit('s').asi8.tobytes())
+    digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return f'"{digest.hexdigest()}"'
+
+
+def matches(if_none_match, tag):
+    """Whether an If-None-Match header names `tag` (weak comparison, as RFC 9110 asks for)"""
+    if not if_none_match:
+        return False
+    candidates = [part.strip() for part in if_none_match.split(',')]
+    return '*' in candidates or tag in (c[2:] if c.startswith('W/') else c for c in candidates)
+
+
+def _json_values(values):
+    """A column as a JSON-ready list: float32 kept at its own precision, NaN as null"""
+    values = widen(values) if values.dtype == np.float32 else values
+    if values.dtype.kind != 'f':
+        return values.tolist()
+    missing = np.isnan(values)
+    if not missing.any():
+        return values.tolist()
+    out = values.astype(object)
+    out[missing] = None
+    return out.tolist()
+
+
+def encode_json(frame, symbol, timeframe, resource):
+    times = frame.index.as_unit('s').asi8.tolist()
+    if resource == 'signals':
+        body = {'symbol': symbol, 'timeframe': timeframe, 'time': times[0] if times else None}
+        body.update((col, _json_values(frame[col].to_numpy())[0] if times else None) for col in frame)
+    else:
+        body = {'symbol': symbol, 'timeframe': timeframe, 'rows': len(frame), 'time': times}
+        body.update((col, _json_values(frame[col].to_numpy())) for col in frame)
+    return json.dumps(body, separators=(',', ':')).encode()
+
+
+def encode_arrow(frame):
+    import pyarrow as pa  # ships with Streamlit; only loaded once an Arrow answer is asked for
+
+    columns = {'time': pa.array(frame.index.as_unit('s').asi8, pa.timestamp('s', tz='UTC'))}
+    columns.update((col, pa.array(frame[col].to_numpy(), from_pandas=True)) for col in frame)
+    table = pa.table(columns)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+class _ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # headers and body go out as two writes; don't hold the body back
+    loader = None  # (symbol, timeframe) -> (df, problem)
+    timeframes = ()
+    tz = 'Asia/Bangkok'
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        parts = [unquote(part) for part in url.path.strip('/').split('/')]
+        resource = parts[1] if len(parts) == 4 and parts[0] == 'v1' else None
+        try:
+            if resource not in RESOURCES:
+                raise ApiError(404, 'expected /v1/{bars|indicators|signals}/<symbol>/<timeframe>')
+            with metrics().span('api', resource=resource) as s:
+                status, headers, body = self._answer(resource, parts[2], parts[3], query)
+                s['bytes'] = len(body)
+        except ApiError as e:
+            status, headers, body = e.status, {'Content-Type': 'application/json'}, json.dumps({'error': str(e)}).encode()
+        metrics().count('api_requests', status=status, resource=resource)
+        self._reply(status, headers, body)
+
+    def _answer(self, resource, symbol, timeframe, query):
+        if timeframe not in self.timeframes:
+            raise ApiError(404, f"unknown timeframe {timeframe}; one of {', '.join(self.timeframes)}")
+        arrow = query.get('format') == 'arrow' or (
+            'format' not in query and ARROW_TYPE in self.headers.get('Accept', ''))
+        if query.get('format') not in (None, 'json', 'arrow'):
+            raise ApiError(400, f"unknown format {query['format']}; json or arrow")
+        since = parse_since(query['since']) if 'since' in query else None
+
+        df, problem = self.loader(symbol, timeframe)
+        if df.empty:
+            level, message = problem or ('warning', f"no data for {symbol}")
+            raise ApiError(502 if level == 'error' else 404, message)
+
+        frame = select(df, resource, since, self.tz)
+        tag = etag(frame, symbol, timeframe, resource, arrow)
+        headers = {'ETag': tag, 'Cache-Control': 'no-cache'}
+        if matches(self.headers.get('If-None-Match'), tag):
+            return 304, headers, b''
+        if arrow:
+            headers['Content-Type'] = ARROW_TYPE
+            return 200, headers, encode_arrow(frame)
+        headers['Content-Type'] = 'application/json'
+        return 200, headers, encode_json(frame, symbol, timeframe, resource)
+
+    def _reply(self, status, headers, body):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # pollers would flood the app log
+
+
+def serve_api(loader, timeframes, port, host='127.0.0.1', tz='Asia/Bangkok'):
+    """Serve the API at http://host:port/v1/... from a daemon thread; returns the server"""
+    handler = type('ApiHandler', (_ApiHandler,), {'loader': staticmethod(loader), 'timeframes': tuple(timeframes),
+                                                  'tz': tz})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='data-api', daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from pro_data import TIMEFRAME_INTERVALS, api_frame
+    from telemetry import setup_from_env
+
+    parser = argparse.ArgumentParser(description="Headless JSON/Arrow API over the dashboard's indicator frames")
+    parser.add_argument('--port', type=int, default=int(os.environ.get('DASHBOARD_API_PORT', DEFAULT_PORT)))
+    parser.add_argument('--host', default=os.environ.get('DASHBOARD_API_HOST', '127.0.0.1'))
+    parser.add_argument('--dashboard', action='store_true', help='also run the Streamlit app in this process')
+    args = parser.parse_args()
+
+    server = serve_api(api_frame, TIMEFRAME_INTERVALS, args.port, args.host)
+    print(f"Data API on http://{args.host}:{server.server_port}/v1/", flush=True)
+    if args.dashboard:
+        # Streamlit's own settings (.streamlit/config.toml, STREAMLIT_* variables) still apply
+        from streamlit.web import bootstrap
+
+        bootstrap.load_config_options({})
+        bootstrap.run(APP_PATH, False, [], {})
+    else:
+        setup_from_env()  # the app turns telemetry on itself when it runs here
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
@@ -0,0 +1,81 @@
+"""
+Pixel-budget downsampling of chart payloads.
+
+A chart can only show about one candle per couple of pixels, so long
+histories are reduced to a fixed number of points before serialization and
+the payload stays the same size however many bars exist server-side.
+
+- `bucket_payload`: consecutive bars merged into buckets that keep the
+  open, high, low and close (volume summed, indicators as of the bucket's
+  last bar), for candle charts and the lines drawn over them
+- `lttb_indices` / `lttb_payload`: Largest-Triangle-Three-Buckets, which
+  keeps the points that carry a line's visual shape, for line-only charts
+"""
+import numpy as np
+
+DEFAULT_BUDGET = 800  # points per chart: about one per 2 px on a wide screen
+
+
+def bucket_starts(n, budget):
+    """Start positions of at most `budget` equal buckets, aligned so the last one ends at the newest bar"""
+    size = -(-n // budget)
+    starts = np.arange(n - size, -size, -size)[::-1]
+    return np.unique(np.maximum(starts, 0))
+
+
+def bucket_payload(payload, budget=DEFAULT_BUDGET):
+    """OHLC-preserving aggregation of a payload to at most `budget` points"""
+    n = len(payload['time'])
+    if n <= budget:
+        return payload
+    starts = bucket_starts(n, budget)
+    ends = np.r_[starts[1:], n] - 1
+
+    out = {'time': payload['time'][starts]}
+    for col, values in payload.items():
+        if col == 'time':
+            continue
+        if col == 'open':
+            out[col] = values[starts]
+        elif col == 'high':
+            out[col] = np.fmax.reduceat(values, starts)
+        elif col == 'low':
+            out[col] = np.fmin.reduceat(values, starts)
+        elif col == 'volume':
+            out[col] = np.add.reduceat(np.nan_to_num(values), starts)
+        else:
+            out[col] = values[ends]
+    return out
+
+
+def lttb_indices(x, y, budget):
+    """Positions of the `budget` points Largest-Triangle-Three-Buckets keeps (first and last included)"""
+    n = len(x)
+    if n <= budget or budget < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+
+    edges = np.linspace(1, n - 1, budget - 1).astype(int)  # budget - 2 inner buckets
+    keep = np.empty(budget, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(budget - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_lo, nxt_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        # Average of the next bucket is the third triangle vertex
+        cx = x[nxt_lo:nxt_hi].mean() if nxt_hi > nxt_lo else x[-1]
+        cy = y[nxt_lo:nxt_hi].mean() if nxt_hi > nxt_lo else y[-1]
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def lttb_payload(payload, col, budget=DEFAULT_BUDGET, columns=None):
+    """Payload rows LTTB picks for `col`; `columns` (default: all) share the same times"""
+    idx = lttb_indices(payload['time'], payload[col], budget)
+    columns = columns or [c for c in payload if c != 'time']
+    out = {'time': payload['time'][idx]}
+    out.update((c, payload[c][idx]) for c in columns)
+    return out
@@ -0,0 +1,385 @@
+"""
+Rate-limited, pooled client for Yahoo's chart API.
+
+Live downloads (providers.LiveProvider) go through the process-wide
+`fetch_client()` instead of `yf.download`. Each ticker is one request to
+`<base>/v8/finance/chart/<ticker>`, the endpoint yfinance itself reads, and
+the answers are put together into a frame shaped like
+`yf.download(..., group_by='column', auto_adjust=False)`.
+
+- One HTTP session for the process (curl_cffi with a browser fingerprint,
+  as yfinance uses; plain `requests` without it). Each worker thread keeps
+  its connections open from one request to the next.
+- A token bucket shared by every thread caps the request rate, so a burst
+  (a universe scan, a wall of cold grid panels) queues here instead of
+  being throttled upstream.
+- Yahoo's cookie/crumb handshake, as yfinance does it: the session picks
+  up a cookie from fc.yahoo.com, asks for a crumb once and sends it with
+  every request; a 401 (crumb expired) fetches a new one and retries.
+- Throttling (429), server errors and network errors are retried with
+  exponential backoff and full jitter; a Retry-After header is honoured.
+  A malformed answer is a failure of that symbol alone.
+- A circuit breaker per symbol: after `failures` failed requests in a row
+  the symbol is not requested again for `cooldown` seconds (then a single
+  trial request decides), and its last good response is served meanwhile.
+  Last good responses live in the byte-budgeted bar cache ('fetch' entries).
+
+Counters (see telemetry.py): fetch_requests{status}, fetch_retries,
+fetch_throttled, fetch_rate_wait_seconds, fetch_breaker_rejected and
+fetch_stale_served; `stats` has the number of open breakers.
+
+The base URL is configurable, so the client runs unchanged against a local
+fake server (benchmarks/fake_yahoo.py).
+
+Configuration from the environment:
+DASHBOARD_YAHOO_URL      chart API base URL (default https://query2.finance.yahoo.com)
+DASHBOARD_FETCH_RATE     requests per second across the process (default 10)
+DASHBOARD_FETCH_BURST    requests that may go at once before the rate applies (default 20)
+DASHBOARD_FETCH_RETRIES  retries after a failed request (default 3)
+DASHBOARD_FETCH_WORKERS  requests in flight per multi-ticker download (default 8)
+"""
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import pandas as pd
+
+from bar_cache import bar_cache
+from telemetry import metrics
+
+DEFAULT_URL = 'https://query2.finance.yahoo.com'
+COOKIE_URL = 'https://fc.yahoo.com'  # answers 404, but sets the cookie the crumb belongs to
+CRUMB_PATH = '/v1/test/getcrumb'
+RETRY_STATUS = {401, 429, 500, 502, 503, 504}  # 401: the crumb was refused
+DAILY_INTERVALS = ('1d', '5d', '1wk', '1mo', '3mo')  # indexed by exchange date, like yfinance
+PRICE_COLUMNS = ['Adj Close', 'Close', 'High', 'Low', 'Open', 'Volume']
+
+
+class FetchError(Exception):
+    """A chart request that failed; `retry` is whether trying again may help"""
+
+    def __init__(self, message, status=None, retry=False, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry = retry
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """`rate` requests per second with up to `burst` saved up, shared by every thread"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, sleeping until it is due; returns the seconds waited"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            # A negative balance is a queue: each caller waits for its own slot
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class CircuitBreaker:
+    """Opens after `failures` failures in a row; after `cooldown` seconds one trial request may go"""
+
+    def __init__(self, failures=5, cooldown=60.0):
+        self.failures = failures
+        self.cooldown = cooldown
+        self._failed = 0
+        self._opened = None
+        self._trial = False
+
+    @property
+    def open(self):
+        return self._opened is not None
+
+    def allow(self):
+        if self._opened is None:
+            return True
+        if self._trial or time.monotonic() - self._opened < self.cooldown:
+            return False
+        self._trial = True
+        return True
+
+    def record(self, ok):
+        self._trial = False
+        if ok:
+            self._failed = 0
+            self._opened = None
+            return
+        self._failed += 1
+        if self._opened is not None or self._failed >= self.failures:
+            self._opened = time.monotonic()
+
+
+def new_session():
+    """Browser-like HTTP session (curl_cffi, as yfinance uses), or plain `requests` without it"""
+    try:
+        from curl_cffi import requests as curl_requests
+    except ImportError:
+        import requests
+
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=32)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers['User-Agent'] = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+        return session
+    return curl_requests.Session(impersonate='chrome')
+
+
+def _utc(stamp):
+    stamp = pd.Timestamp(stamp)
+    return stamp.tz_localize('UTC') if stamp.tz is None else stamp.tz_convert('UTC')
+
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+def chart_params(interval, period=None, start=None, end=None):
+    """Query parameters of a chart request, as yfinance builds them"""
+    params = {'interval': interval, 'includePrePost': 'false'}
+    if start is None and end is None:
+        params['range'] = period or '1mo'
+        return params
+    end = _utc(end) if end is not None else pd.Timestamp.now(tz='UTC')
+    start = _utc(start) if start is not None else end - pd.Timedelta(days=31)
+    params['period1'] = int(start.timestamp())
+    params['period2'] = int(end.timestamp())
+    return params
+
+
+def parse_chart(data, interval):
+    """
+    Bars of one chart API answer, indexed like yf.download
+
+    Intraday bars are indexed by UTC time, daily ones by their (naive) date on
+    the exchange. Yahoo's nulls become NaN; rows without prices are dropped.
+    """
+    chart = data.get('chart') or {}
+    if chart.get('error'):
+        raise FetchError(chart['error'].get('description') or 'chart error')
+    result = (chart.get('result') or [None])[0]
+    if not result or not result.get('timestamp'):
+        return pd.DataFrame(columns=PRICE_COLUMNS, dtype=float)
+
+    quote_ = result['indicators']['quote'][0]
+    adjclose = (result['indicators'].get('adjclose') or [{}])[0].get('adjclose', quote_['close'])
+    index = pd.to_datetime(result['timestamp'], unit='s', utc=True)
+    if interval in DAILY_INTERVALS:
+        tz = (result.get('meta') or {}).get('exchangeTimezoneName') or 'UTC'
+        index = index.tz_convert(tz).normalize().tz_localize(None)
+
+    df = pd.DataFrame({
+        'Adj Close': adjclose, 'Close': quote_['close'], 'High': quote_['high'],
+        'Low': quote_['low'], 'Open': quote_['open'], 'Volume': quote_['volume'],
+    }, index=index, dtype=float)
+    df = df[~df.index.duplicated(keep='last')].sort_index()
+    return df.dropna(how='all', subset=['Close', 'High', 'Low', 'Open'])
+
+
+class FetchClient:
+    """Chart API downloads through one session, one rate limit and a breaker per symbol"""
+
+    def __init__(self, base_url=DEFAULT_URL, rate=10.0, burst=20, retries=3, workers=8,
+                 failures=5, cooldown=60.0, timeout=10.0, backoff=0.5, max_backoff=8.0, session=None,
+                 cookie_url=None):
+        self.base_url = base_url.rstrip('/')
+        # Only Yahoo itself needs the cookie; a local fake serves its crumb without one
+        self.cookie_url = cookie_url or (COOKIE_URL if self.base_url == DEFAULT_URL else None)
+        self.bucket = TokenBucket(rate, burst)
+        self.retries = retries
+        self.workers = workers
+        self.failures = failures
+        self.cooldown = cooldown
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.session = session or new_session()
+        self._breakers = {}  # symbol -> CircuitBreaker
+        self._lock = threading.Lock()
+        self._crumb = None
+        self._crumb_lock = threading.Lock()
+
+    def download(self, tickers, interval='1d', period=None, start=None, end=None, **yf_options):
+        """
+        `yf.download` over the chart API: a (Price, Ticker) frame of every ticker that came back
+
+        A ticker whose request failed, or whose breaker is open, is served
+        from its last good response; without one it is left out. Other
+        yf.download options (progress, threads, ...) are accepted and ignored.
+        """
+        symbols = list(dict.fromkeys(tickers.split() if isinstance(tickers, str) else tickers))
+        params = chart_params(interval, period, start, end)
+        if len(symbols) == 1:
+            frames = {symbols[0]: self.bars(symbols[0], interval, params)}
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(symbols))) as pool:
+                frames = dict(zip(symbols, pool.map(lambda sym: self.bars(sym, interval, params), symbols)))
+
+        frames = {sym: df for sym, df in frames.items() if df is not None and not df.empty}
+        if not frames:
+            return pd.DataFrame()
+        df = pd.concat(frames, axis=1).swaplevel(0, 1, axis=1).sort_index()
+        df.columns.names = ['Price', 'Ticker']
+        df.index.name = 'Date' if interval in DAILY_INTERVALS else 'Datetime'
+        return df
+
+    def bars(self, symbol, interval, params):
+        """
+        One symbol's bars; its last good bars for the same window while upstream fails for it
+
+        Last good bars are kept per `range` ('5d', '10y', ...); those of
+        start/end requests are kept together and cut to the window asked
+        for. None if there are none.
+        """
+        key = ('fetch', symbol, interval, params.get('range'))
+        with self._lock:
+            breaker = self._breakers.setdefault(symbol, CircuitBreaker(self.failures, self.cooldown))
+            allowed = breaker.allow()
+        if not allowed:
+            metrics().count('fetch_breaker_rejected')
+            return self._last_good(key, params)
+
+        ok = False
+        try:
+            df = self._request(symbol, interval, params)
+            ok = True
+        except FetchError:
+            return self._last_good(key, params)
+        finally:
+            # Whatever went wrong, a half-open breaker must hear how its trial went
+            with self._lock:
+                breaker.record(ok)
+        if not df.empty:
+            bar_cache().put(key, df)
+        return df
+
+    def _last_good(self, key, params):
+        df = bar_cache().get(key)
+        if df is not None and 'period1' in params:
+            index = df.index if df.index.tz is not None else df.index.tz_localize('UTC')  # daily: naive dates
+            df = df[(index >= pd.Timestamp(params['period1'], unit='s', tz='UTC'))
+                    & (index < pd.Timestamp(params['period2'], unit='s', tz='UTC'))]
+            df = df if not df.empty else None
+        if df is not None:
+            metrics().count('fetch_stale_served')
+        return df
+
+    def crumb(self, rejected=None):
+        """
+        The session's crumb, asked for once per process
+
+        Passing the crumb a request was refused with asks for a new one,
+        unless another thread already has. '' when none could be had: the
+        requests then go without it.
+        """
+        with self._crumb_lock:
+            if self._crumb is None or (rejected is not None and self._crumb == rejected):
+                self._crumb = self._fetch_crumb()
+            return self._crumb
+
+    def _fetch_crumb(self):
+        try:
+            if self.cookie_url:
+                self.session.get(self.cookie_url, timeout=self.timeout)
+            response = self.session.get(self.base_url + CRUMB_PATH, timeout=self.timeout)
+        except OSError:
+            return ''
+        text = response.text.strip()
+        if response.status_code != 200 or not text or '<' in text:
+            return ''
+        metrics().count('fetch_crumbs')
+        return text
+
+    def _request(self, symbol, interval, params):
+        """One chart request, retried with backoff while the failure is worth retrying"""
+        url = f"{self.base_url}/v8/finance/chart/{quote(symbol, safe='')}"
+        for attempt in range(self.retries + 1):
+            waited = self.bucket.acquire()
+            if waited:
+                metrics().count('fetch_rate_wait_seconds', waited)
+            crumb = self.crumb()
+            try:
+                return self._get(url, dict(params, crumb=crumb) if crumb else params, interval)
+            except FetchError as e:
+                if not e.retry or attempt == self.retries:
+                    raise
+                if e.status == 401:
+                    # The crumb expired (or there was none yet): get one and go again at once
+                    self.crumb(rejected=crumb)
+                    metrics().count('fetch_retries')
+                    continue
+                # Full jitter keeps sessions that failed together from retrying together
+                delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+                if e.retry_after is not None:
+                    if e.retry_after > self.max_backoff:
+                        raise
+                    delay = max(delay, e.retry_after)
+                metrics().count('fetch_retries')
+                time.sleep(delay)
+
+    def _get(self, url, params, interval):
+        with metrics().span('http', interval=interval) as s:
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except OSError as e:
+                metrics().count('fetch_requests', status='error')
+                raise FetchError(f"{url}: {e}", retry=True) from e
+            metrics().count('fetch_requests', status=response.status_code)
+            s['bytes'] = len(response.content)
+        if response.status_code == 429:
+            metrics().count('fetch_throttled')
+        if response.status_code != 200:
+            raise FetchError(f"{url}: HTTP {response.status_code}", response.status_code,
+                             retry=response.status_code in RETRY_STATUS, retry_after=_retry_after(response))
+        try:
+            data = response.json()
+        except ValueError as e:
+            raise FetchError(f"{url}: not JSON", response.status_code, retry=True) from e
+        try:
+            return parse_chart(data, interval)
+        except (KeyError, TypeError, IndexError, ValueError, AttributeError) as e:
+            raise FetchError(f"{url}: malformed chart answer ({e!r})", response.status_code) from e
+
+    @property
+    def stats(self):
+        with self._lock:
+            return {'breakers_open': sum(b.open for b in self._breakers.values()),
+                    'symbols': len(self._breakers), 'rate': self.bucket.rate}
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def fetch_client():
+    """Process-wide client configured by DASHBOARD_YAHOO_URL and DASHBOARD_FETCH_*"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = FetchClient(
+                os.environ.get('DASHBOARD_YAHOO_URL', DEFAULT_URL),
+                rate=float(os.environ.get('DASHBOARD_FETCH_RATE', 10)),
+                burst=int(os.environ.get('DASHBOARD_FETCH_BURST', 20)),
+                retries=int(os.environ.get('DASHBOARD_FETCH_RETRIES', 3)),
+                workers=int(os.environ.get('DASHBOARD_FETCH_WORKERS', 8)),
+            )
+        return _default
@@ -0,0 +1,242 @@
+"""
+Fused indicator kernel over (symbols × bars) arrays.
+
+`compute_indicators` produces every `INDICATOR_COLUMNS` series for many
+symbols in one pass along the time axis. The bars are processed in blocks;
+each block computes all indicators for all symbols and writes them straight
+into one preallocated (columns × symbols × bars) buffer, so the working
+memory is a few block-sized arrays however long the history is.
+
+- EMAs: a small matrix product per EMA_STEP bars, carried step to step
+- rolling mean/std and RSI: differences of float64 running sums over the
+  block plus the bars before it
+- rolling max/min: van Herk/Gil-Werman block scans
+
+Rows may have different history lengths: pad them on the left with NaN
+(`stack_bars` does this). Every output is NaN before a row's first valid
+close, interior gaps are forward-filled, and the values otherwise match
+`indicators.add_indicators`. `dtype=np.float32` halves the memory at about
+six significant digits.
+"""
+import numpy as np
+
+from indicators import INDICATOR_COLUMNS
+
+COLUMN_INDEX = {name: i for i, name in enumerate(INDICATOR_COLUMNS)}
+BLOCK_CELLS = 1 << 16  # symbols × bars per pass; bounds the rolling-window temporaries
+EMA_STEP = 128  # bars per EMA matrix product
+
+
+def allocate(symbols, bars, dtype=np.float64):
+    """Output buffer for `compute_indicators`: out[COLUMN_INDEX['rsi']] is a (symbols × bars) array"""
+    return np.empty((len(INDICATOR_COLUMNS), symbols, bars), dtype=dtype)
+
+
+def stack_bars(frames, columns=('high', 'low', 'close'), dtype=np.float64):
+    """
+    Right-aligned (symbols × bars) arrays of `columns` from a list of bar frames
+
+    Shorter histories are padded with NaN on the left so the newest bar of
+    every symbol sits in the last column. Returns {column: array}.
+    """
+    length = max((len(df) for df in frames), default=0)
+    out = {col: np.full((len(frames), length), np.nan, dtype=dtype) for col in columns}
+    for i, df in enumerate(frames):
+        for col in columns:
+            if len(df):
+                out[col][i, length - len(df):] = df[col].to_numpy(dtype=dtype)
+    return out
+
+
+def _fill(values):
+    """Forward-fill along bars, then back-fill the leading gap with the first valid value"""
+    missing = np.isnan(values)
+    if not missing.any():
+        return values
+    t = np.arange(values.shape[1])
+    last = np.maximum.accumulate(np.where(missing, 0, t), axis=1)
+    filled = np.take_along_axis(values, last, axis=1)
+    first = np.take_along_axis(values, (~missing).argmax(axis=1)[:, None], axis=1)
+    return np.where(np.isnan(filled), first, filled)
+
+
+def _decay_matrix(factor, size):
+    """[k, j] = factor ** (j - k) for j >= k, else 0: the weights of a linear recurrence"""
+    k = np.arange(size)
+    lag = np.subtract.outer(k, k)
+    return np.where(lag <= 0, float(factor) ** np.clip(-lag, 0, None), 0.0)
+
+
+class _Ema:
+    """
+    adjust=False EMA, EMA_STEP bars per matrix product
+
+    Within a step y = x @ W + decay * carry_in. The carry into each step is
+    the previous step's last value, which is itself a recurrence over the
+    steps and is solved the same way, so no Python loop runs per bar or step.
+    """
+
+    def __init__(self, span, dtype):
+        alpha = 2.0 / (span + 1)
+        self.dtype = dtype
+        self.weights = (alpha * _decay_matrix(1 - alpha, EMA_STEP)).astype(dtype)
+        self.decay = ((1 - alpha) ** np.arange(1, EMA_STEP + 1)).astype(dtype)
+        self.step_decay = (1 - alpha) ** EMA_STEP
+        self.carries = np.empty((0, 0))
+        self.carry = None
+
+    def _carry_matrix(self, steps):
+        if len(self.carries) < steps:
+            self.carries = _decay_matrix(self.step_decay, steps).astype(self.dtype)
+        return self.carries[:steps, :steps]
+
+    def __call__(self, x, out):
+        symbols, n = x.shape
+        if self.carry is None:
+            self.carry = x[:, 0].copy()  # seeds y[0] = x[0]
+        steps = -(-n // EMA_STEP)
+        if n < steps * EMA_STEP:
+            x = np.concatenate([x, np.zeros((symbols, steps * EMA_STEP - n), dtype=x.dtype)], axis=1)
+        y = (x.reshape(symbols * steps, EMA_STEP) @ self.weights).reshape(symbols, steps, EMA_STEP)
+
+        powers = (self.step_decay ** np.arange(1, steps + 1)).astype(self.dtype)
+        ends = y[:, :, -1] @ self._carry_matrix(steps) + self.carry[:, None] * powers
+        carry_in = np.concatenate([self.carry[:, None], ends[:, :-1]], axis=1)
+        y += carry_in[:, :, None] * self.decay
+
+        y = y.reshape(symbols, -1)
+        out[:] = y[:, :n]
+        self.carry = y[:, n - 1].copy()
+        return out
+
+
+def _edge_pad(values, width):
+    """`values` with its first column repeated `width` times on the left"""
+    if not width:
+        return values
+    return np.concatenate([np.repeat(values[:, :1], width, axis=1), values], axis=1)
+
+
+def _window_sums(values, window):
+    """Sum of every `window` consecutive values along bars, from a float64 running sum"""
+    total = np.cumsum(values, axis=1, dtype=np.float64)
+    sums = total[:, window - 1:].copy()
+    sums[:, 1:] -= total[:, :-window]
+    return sums
+
+
+def _window_extreme(values, window, fn):
+    """
+    np.maximum / np.minimum of every `window` consecutive values (van Herk/Gil-Werman)
+
+    Running extremes forward and backward within blocks of `window` bars
+    cover every window with two lookups, about three operations per value.
+    """
+    symbols, n = values.shape
+    size = -(-n // window) * window
+    identity = -np.inf if fn is np.maximum else np.inf
+    padded = np.concatenate([values, np.full((symbols, size - n), identity, dtype=values.dtype)], axis=1)
+    blocks = padded.reshape(symbols, -1, window)
+    prefix = fn.accumulate(blocks, axis=2).reshape(symbols, size)
+    suffix = fn.accumulate(blocks[:, :, ::-1], axis=2)[:, :, ::-1].reshape(symbols, size)
+    return fn(suffix[:, :n - window + 1], prefix[:, window - 1:n])
+
+
+def compute_indicators(high, low, close, out=None, dtype=np.float64, block=None):
+    """
+    Every indicator for (symbols × bars) high/low/close arrays in one pass
+
+    1-D inputs are treated as a single symbol. Results go to `out` (see
+    `allocate`), which is created when not given, and is returned. `block`
+    (bars per pass) defaults to BLOCK_CELLS spread over the symbols.
+    """
+    close = np.atleast_2d(np.asarray(close, dtype=dtype))
+    high = np.atleast_2d(np.asarray(high, dtype=dtype))
+    low = np.atleast_2d(np.asarray(low, dtype=dtype))
+    symbols, bars = close.shape
+    if out is None:
+        out = allocate(symbols, bars, dtype)
+    if bars == 0:
+        return out
+    block = block or max(BLOCK_CELLS // symbols, 64)
+
+    first = np.where(np.isnan(close).all(axis=1), bars, (~np.isnan(close)).argmax(axis=1))
+    close, high, low = _fill(close), _fill(high), _fill(low)
+
+    ema50, ema200 = _Ema(50, dtype), _Ema(200, dtype)
+    ema12, ema26, ema9 = _Ema(12, dtype), _Ema(26, dtype), _Ema(9, dtype)
+    c = COLUMN_INDEX
+    growth = np.ones(symbols, dtype=dtype)
+
+    for lo in range(0, bars, block):
+        hi = min(lo + block, bars)
+        view = slice(lo, hi)
+        x = close[:, view]
+
+        ema50(x, out[c['ema50'], :, view])
+        ema200(x, out[c['ema200'], :, view])
+        macd = out[c['macd_line'], :, view]
+        ema12(x, macd)
+        macd -= ema26(x, np.empty_like(x))
+        ema9(macd, out[c['macd_signal'], :, view])
+        np.subtract(macd, out[c['macd_signal'], :, view], out=out[c['macd_hist'], :, view])
+
+        # Rolling windows read the 19 bars before the block (edge-padded at the start)
+        back = max(lo - 19, 0)
+        closes = _edge_pad(close[:, back:hi], 19 - (lo - back))
+        dev = closes - closes[:, :1]  # small magnitudes keep the running sums exact enough
+        s1 = _window_sums(dev, 20)
+        s2 = _window_sums(dev * dev, 20)
+        delta = np.diff(closes, axis=1)
+        moved = _window_sums(delta != 0, 19)  # a window with no moves has a std of exactly 0
+        sma = out[c['sma20'], :, view]
+        std = out[c['std20'], :, view]
+        np.add(closes[:, :1], s1 / 20, out=sma)
+        np.sqrt(np.where(moved > 0, np.clip((s2 - s1 * s1 / 20) / 19, 0, None), 0), out=std)
+        np.add(sma, 2 * std, out=out[c['bb_up'], :, view])
+        np.subtract(sma, 2 * std, out=out[c['bb_low'], :, view])
+
+        out[c['res'], :, view] = _window_extreme(_edge_pad(high[:, back:hi], 19 - (lo - back)), 20, np.maximum)
+        out[c['sup'], :, view] = _window_extreme(_edge_pad(low[:, back:hi], 19 - (lo - back)), 20, np.minimum)
+        # Windows that reach back before a row's first bar are still warming up
+        warm = np.arange(lo, hi)[None, :] < first[:, None] + 19
+        for name in ('sma20', 'std20', 'bb_up', 'bb_low', 'res', 'sup'):
+            out[c[name], :, view][warm] = np.nan
+
+        # RSI: 14-bar means of gains and losses, the deltas of bars lo-13 .. hi-1
+        delta = delta[:, 5:]
+        gain = np.where(delta > 0, delta, 0)
+        loss = np.where(delta < 0, -delta, 0)
+        gains, losses = _window_sums(gain, 14), _window_sums(loss, 14)
+        gains[_window_sums(gain > 0, 14) == 0] = 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = np.where((_window_sums(loss > 0, 14) > 0) & (losses > 0), 100 - 100 / (1 + gains / losses), 50)
+        out[c['rsi'], :, view] = rsi
+
+        # Breakout signal against the previous bar's levels, and its one-bar-hold P/L
+        prev_res = np.concatenate([out[c['res'], :, lo - 1:lo] if lo else np.full((symbols, 1), np.nan, dtype=dtype),
+                                   out[c['res'], :, lo:hi - 1]], axis=1)
+        prev_sup = np.concatenate([out[c['sup'], :, lo - 1:lo] if lo else np.full((symbols, 1), np.nan, dtype=dtype),
+                                   out[c['sup'], :, lo:hi - 1]], axis=1)
+        signal = out[c['signal'], :, view]
+        signal[:] = 0
+        signal[x > prev_res] = 1
+        signal[x < prev_sup] = -1
+
+        prev_close = close[:, lo - 1:hi - 1] if lo else np.concatenate([x[:, :1], x[:, :-1]], axis=1)
+        prev_signal = out[c['signal'], :, max(lo - 1, 0):hi - 1]
+        if not lo:
+            prev_signal = np.concatenate([np.zeros((symbols, 1), dtype=dtype), prev_signal], axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = np.where(prev_close != 0, 1 + prev_signal * (x / prev_close - 1), 1)
+        cum = out[c['cum_ret'], :, view]
+        np.cumprod(step, axis=1, out=cum)
+        cum *= growth[:, None]
+        growth = cum[:, -1].copy()
+        cum -= 1
+
+    # Warm-up and padding: what the pandas reference reports on each row's own history
+    t = np.arange(bars)[None, :]
+    out[c['rsi']][t < first[:, None] + 13] = 50
+    out[:, t < first[:, None]] = np.nan
+    return out
@@ -0,0 +1,72 @@
+"""
+Saved Multi-View Grid layouts.
+
+A layout is a grid size plus the symbol shown in each panel, saved under a
+name. All layouts live in one JSON file so every session, replica on the
+host and restart sees the same trading-desk walls. Changes hold a lock on
+`layouts.json.lock` across the read-modify-write, so concurrent saves from
+any process all land.
+"""
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: the lock covers this process only
+    fcntl = None
+
+LAYOUT_DIR = os.environ.get(
+    'GRID_LAYOUT_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.grid_layouts'),
+)
+
+
+class LayoutStore:
+    """Named {'rows', 'cols', 'symbols'} layouts in `<root>/layouts.json`"""
+
+    def __init__(self, root=LAYOUT_DIR):
+        self.path = os.path.join(root, 'layouts.json')
+        self._lock = threading.Lock()
+
+    def load(self):
+        """{name: layout}; a missing or unreadable file is an empty store"""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive across threads and, where fcntl exists, across processes"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock, open(f"{self.path}.lock", 'a') as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def _write(self, layouts):
+        # Write-then-rename so a concurrent reader never sees a partial file
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(layouts, f, indent=2, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def save(self, name, rows, cols, symbols):
+        with self._locked():
+            layouts = self.load()
+            layouts[name] = {'rows': rows, 'cols': cols, 'symbols': list(symbols)[:rows * cols]}
+            self._write(layouts)
+
+    def delete(self, name):
+        with self._locked():
+            layouts = self.load()
+            if layouts.pop(name, None) is not None:
+                self._write(layouts)
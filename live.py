@@ -0,0 +1,390 @@
+"""
+Live streaming mode: bar feeds pushed into charts that are already on screen.
+
+A `LiveStream` per (symbol, timeframe) reads a `BarFeed`, runs each bar
+through its own `IndicatorEngine.push` (one step, whatever the history
+length) and publishes a small JSON message with the bar and its indicator
+values. Charts subscribe over Server-Sent Events from inside their iframe
+and apply each message with the library's `series.update()`, so a new or
+revised bar costs a few hundred bytes instead of a rerun that rebuilds
+every chart from the full history.
+
+Feeds are pluggable (`FEEDS`):
+- `PollingFeed` tops up the bar store every few seconds (Yahoo)
+- `SimulatedFeed` continues the stored history with a local random walk
+
+Configuration from the environment:
+DASHBOARD_LIVE_FEED  'yahoo' (default) or 'simulated'
+DASHBOARD_LIVE_PORT  port of the SSE endpoint (default 8502)
+DASHBOARD_LIVE_HOST  interface to bind (default 127.0.0.1)
+DASHBOARD_LIVE_URL   base URL the browser uses (default http://localhost:<port>)
+"""
+import json
+import math
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlparse
+
+import numpy as np
+import pandas as pd
+
+from indicators import IndicatorEngine
+from resample import timeframe_store
+from telemetry import metrics
+
+BAR_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+INTERVAL_DELTAS = {'1m': '1min', '5m': '5min', '15m': '15min', '1h': '1h', '1d': '1D'}
+
+
+# ═══════════════════════════════════════════════════════════════
+# 📡 FEEDS
+# ═══════════════════════════════════════════════════════════════
+class BarFeed(ABC):
+    """
+    Source of live bars for one (symbol, interval)
+
+    `bars()` yields (timestamp, {column: value}) for every new or changed
+    bar; a timestamp equal to the previous one revises that bar. `close()`
+    makes the generator return promptly.
+    """
+
+    def __init__(self, symbol, interval, history, period=None):
+        self.symbol = symbol
+        self.interval = interval
+        self.history = history
+        self.period = period
+        self._closed = threading.Event()
+
+    @abstractmethod
+    def bars(self):
+        """Generator of (timestamp, {column: value}) until `close()`"""
+
+    def close(self):
+        self._closed.set()
+
+    @property
+    def closed(self):
+        return self._closed.is_set()
+
+
+class PollingFeed(BarFeed):
+    """Re-reads the symbol's bars every `every` seconds (a bar store top-up) and yields the ones that changed"""
+
+    def __init__(self, symbol, interval, history, period=None, every=15):
+        super().__init__(symbol, interval, history, period)
+        self.every = every
+
+    def bars(self):
+        last = self.history.iloc[-1] if not self.history.empty else None
+        last_stamp = self.history.index[-1] if not self.history.empty else None
+        while not self._closed.wait(self.every):
+            try:
+                stored = timeframe_store().bars(self.symbol, self.interval, self.period or '5d')
+            except Exception:
+                continue  # keep the stream up through a failed poll
+            new = stored if last_stamp is None else stored[stored.index >= last_stamp]
+            for stamp, row in new.iterrows():
+                if stamp == last_stamp and last is not None and row[BAR_COLUMNS].equals(last[BAR_COLUMNS]):
+                    continue
+                last, last_stamp = row, stamp
+                yield stamp, row.to_dict()
+
+
+class SimulatedFeed(BarFeed):
+    """
+    Local random walk that continues the stored history, for testing
+
+    Every `tick` seconds the forming bar gets a new price; after
+    `ticks_per_bar` ticks a new bar opens one interval later.
+    """
+
+    def __init__(self, symbol, interval, history, period=None, tick=0.5, ticks_per_bar=10, seed=None):
+        super().__init__(symbol, interval, history, period)
+        self.tick = tick
+        self.ticks_per_bar = ticks_per_bar
+        self.rng = np.random.default_rng(seed)
+        self.step = pd.Timedelta(INTERVAL_DELTAS.get(interval, '1D'))
+
+    def bars(self):
+        if self.history.empty:
+            return
+        stamp = self.history.index[-1]
+        price = float(self.history['close'].iloc[-1])
+        bar = None
+        ticks = self.ticks_per_bar  # open a new bar on the first tick
+        while not self._closed.wait(self.tick):
+            price *= math.exp(self.rng.normal(0, 0.0015))
+            if ticks >= self.ticks_per_bar:
+                stamp += self.step
+                bar = {'open': price, 'high': price, 'low': price, 'close': price, 'volume': 0.0}
+                ticks = 0
+            bar['high'] = max(bar['high'], price)
+            bar['low'] = min(bar['low'], price)
+            bar['close'] = price
+            bar['volume'] += float(self.rng.integers(100, 5_000))
+            ticks += 1
+            yield stamp, dict(bar)
+
+
+FEEDS = {'yahoo': PollingFeed, 'simulated': SimulatedFeed}
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🔁 STREAMS
+# ═══════════════════════════════════════════════════════════════
+def _number(value):
+    value = float(value)
+    return None if math.isnan(value) or math.isinf(value) else value
+
+
+class LiveStream:
+    """
+    One feed, one indicator engine and a short replay buffer for (symbol, timeframe)
+
+    Messages carry `time` in the same naive wall-clock epoch seconds as the
+    chart payload, so they line up with the bars the page was drawn with.
+    """
+
+    def __init__(self, symbol, timeframe, interval, period, feed_cls, tz='Asia/Bangkok', keep=500, idle=60):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.interval = interval
+        self.period = period
+        self.feed_cls = feed_cls
+        self.tz = tz
+        self.idle = idle
+        self.seq = 0
+        self.subscribers = 0
+        self.last_seen = time.time()
+        self._stopped = threading.Event()
+        self._messages = deque(maxlen=keep)  # (seq, time, json)
+        self._cond = threading.Condition()
+        self._feed = None
+        self._thread = threading.Thread(target=self._run, name=f'live-{symbol}-{timeframe}', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    @property
+    def alive(self):
+        return self._thread.is_alive()
+
+    def stop(self):
+        self._stopped.set()
+        if self._feed is not None:
+            self._feed.close()
+        with self._cond:
+            self._cond.notify_all()
+
+    def _wall_seconds(self, stamp):
+        stamp = pd.Timestamp(stamp)
+        if stamp.tz is not None:
+            stamp = stamp.tz_convert(self.tz).tz_localize(None)
+        return int(stamp.timestamp())
+
+    def _run(self):
+        history = timeframe_store().bars(self.symbol, self.interval, self.period)
+        engine = IndicatorEngine()
+        if history.empty:
+            return
+        engine.update(history)
+        self._feed = self.feed_cls(self.symbol, self.interval, history, self.period)
+        if self._stopped.is_set():
+            return
+        labels = {'symbol': self.symbol, 'timeframe': self.timeframe}
+        for stamp, bar in self._feed.bars():
+            with metrics().span('live_update', **labels) as s:
+                values = engine.push(stamp, bar)
+                message = {'time': self._wall_seconds(stamp)}
+                message.update((col, _number(bar[col])) for col in BAR_COLUMNS if col in bar)
+                message.update((col, _number(v)) for col, v in values.items())
+                text = json.dumps(message)
+                s['bytes'] = len(text)
+                self.publish(message['time'], text)
+        with self._cond:
+            self._cond.notify_all()
+
+    def _stop_if_idle(self):
+        with self._cond:
+            idle = self.subscribers == 0 and time.time() - self.last_seen >= self.idle
+        if idle:
+            self.stop()
+
+    def publish(self, bar_time, text):
+        with self._cond:
+            self.seq += 1
+            self._messages.append((self.seq, bar_time, text))
+            self._cond.notify_all()
+
+    def subscribe(self):
+        with self._cond:
+            self.subscribers += 1
+            self.last_seen = time.time()
+
+    def unsubscribe(self):
+        """Drop a subscriber; the feed stops once nobody has listened for `idle` seconds"""
+        with self._cond:
+            self.subscribers -= 1
+            self.last_seen = time.time()
+            last = self.subscribers == 0
+        if last:
+            timer = threading.Timer(self.idle, self._stop_if_idle)
+            timer.daemon = True
+            timer.start()
+
+    def backlog(self, since):
+        """(seq, [json]) of the newest message per bar at or after `since` (wall-clock seconds)"""
+        with self._cond:
+            latest = {}
+            for _, bar_time, text in self._messages:
+                if bar_time >= since:
+                    latest[bar_time] = text
+            return self.seq, [latest[t] for t in sorted(latest)]
+
+    def wait(self, after, timeout):
+        """Messages published after sequence number `after`, waiting up to `timeout` seconds"""
+        with self._cond:
+            self._cond.wait_for(lambda: self.seq > after or not self.alive, timeout)
+            return self.seq, [text for seq, _, text in self._messages if seq > after]
+
+
+class LiveHub:
+    """Registry of running streams, started on first subscription and stopped when idle"""
+
+    def __init__(self, intervals, periods, feed='yahoo', tz='Asia/Bangkok'):
+        self.intervals = intervals
+        self.periods = periods
+        self.feed_cls = FEEDS[feed] if isinstance(feed, str) else feed
+        self.tz = tz
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def stream(self, symbol, timeframe):
+        if timeframe not in self.intervals:
+            raise KeyError(timeframe)
+        with self._lock:
+            stream = self._streams.get((symbol, timeframe))
+            if stream is None or not stream.alive:
+                stream = LiveStream(symbol, timeframe, self.intervals[timeframe], self.periods[timeframe],
+                                    self.feed_cls, tz=self.tz).start()
+                self._streams[(symbol, timeframe)] = stream
+            return stream
+
+    def streams(self):
+        with self._lock:
+            return {key: s for key, s in self._streams.items() if s.alive}
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🌐 SSE ENDPOINT
+# ═══════════════════════════════════════════════════════════════
+class _LiveHandler(BaseHTTPRequestHandler):
+    hub = None
+    heartbeat = 15
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = url.path.strip('/').split('/')
+        if len(parts) != 3 or parts[0] != 'live':
+            self.send_error(404)
+            return
+        symbol, timeframe = unquote(parts[1]), unquote(parts[2])
+        try:
+            since = int(parse_qs(url.query).get('since', ['0'])[0])
+            stream = self.hub.stream(symbol, timeframe)
+        except (KeyError, ValueError):
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        # Charts live in srcdoc iframes, whose origin is opaque
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+
+        stream.subscribe()
+        try:
+            seq, texts = stream.backlog(since)
+            self._send(texts)
+            while stream.alive:
+                seq, texts = stream.wait(seq, self.heartbeat)
+                if texts:
+                    self._send(texts)
+                else:
+                    self.wfile.write(b': ping\n\n')
+                    self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            stream.unsubscribe()
+
+    def _send(self, texts):
+        if texts:
+            self.wfile.write(''.join(f"data: {text}\n\n" for text in texts).encode())
+            self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_live(hub, port, host='127.0.0.1'):
+    """Serve SSE streams at http://host:port/live/<symbol>/<timeframe> from a daemon thread"""
+    handler = type('LiveHandler', (_LiveHandler,), {'hub': hub})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='live-http', daemon=True).start()
+    return server
+
+
+def start_from_env(intervals, periods, tz='Asia/Bangkok'):
+    """Hub, SSE server and the browser-facing base URL, as configured in the environment"""
+    port = int(os.environ.get('DASHBOARD_LIVE_PORT', '8502'))
+    hub = LiveHub(intervals, periods, feed=os.environ.get('DASHBOARD_LIVE_FEED', 'yahoo'), tz=tz)
+    server = serve_live(hub, port, os.environ.get('DASHBOARD_LIVE_HOST', '127.0.0.1'))
+    base_url = os.environ.get('DASHBOARD_LIVE_URL', f"http://localhost:{server.server_address[1]}")
+    return hub, base_url.rstrip('/')
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🧩 CHART HOOK
+# ═══════════════════════════════════════════════════════════════
+def stream_url(base_url, symbol, timeframe, since):
+    return f"{base_url}/live/{quote(symbol, safe='')}/{quote(timeframe, safe='')}?since={int(since)}"
+
+
+def attach_live(chart, series, url, candles=True):
+    """
+    Subscribe a built chart to a live stream
+
+    `series` maps message columns to the Line/Histogram objects fed from
+    them; with `candles`, the chart's own candlestick and volume series are
+    updated too. Only the changed bar crosses the wire.
+    """
+    targets = ', '.join(f"[{s.id}.series, {json.dumps(col)}]" for col, s in series.items())
+    up = getattr(chart, '_volume_up_color', 'rgba(83,141,131,0.8)')
+    down = getattr(chart, '_volume_down_color', 'rgba(200,127,130,0.8)')
+    candle_js = f'''
+                if (m.close !== null) {{
+                    {chart.id}.series.update({{time: m.time, open: m.open, high: m.high, low: m.low, close: m.close}});
+                    if (m.volume !== null && {chart.id}.volumeSeries)
+                        {chart.id}.volumeSeries.update({{time: m.time, value: m.volume,
+                            color: m.close > m.open ? '{up}' : '{down}'}});
+                }}''' if candles else ''
+    chart.run_script(f'''
+        (function() {{
+            const targets = [{targets}];
+            const source = new EventSource({json.dumps(url)});
+            source.onmessage = (event) => {{
+                const m = JSON.parse(event.data);{candle_js}
+                for (const [series, col] of targets) {{
+                    if (m[col] !== null && m[col] !== undefined) series.update({{time: m.time, value: m[col]}});
+                }}
+            }};
+        }})();
+    ''', run_last=True)
@@ -0,0 +1,285 @@
+"""
+Exchange metadata and trading calendar for Yahoo tickers.
+
+`timezone_for` maps a ticker to the time zone its sessions are defined in,
+from the Yahoo suffix ('.BK' -> Asia/Bangkok). Crypto pairs trade around
+the clock and use UTC days.
+
+`SESSION_HOURS`, `WEEKENDS` and `HOLIDAYS` say when each market trades, in
+its own time zone (lunch breaks are two sessions). `fresh_until` turns that
+into cache policy: while a market is open a fetch is good for the usual
+TTL; once it closes, one more fetch picks up the final bars and then the
+data stays fresh until the next open. Crypto, FX and futures, and suffixes
+without hours, are treated as always open.
+
+The holiday table only covers the larger markets, each up to the year in
+`HOLIDAYS_THROUGH`. Later years come from the `holidays` package when it is
+installed; without it they have no holidays, and the first lookup past a
+table logs a warning and counts `calendar_expired`. A missing holiday is
+harmless: that day is treated as a trading day and refreshed as before.
+"""
+from datetime import datetime, time as dtime, timedelta
+from functools import lru_cache
+import logging
+import time
+from zoneinfo import ZoneInfo
+
+from telemetry import metrics
+
+logger = logging.getLogger('dashboard.markets')
+
+SUFFIX_TIMEZONES = {
+    # Americas
+    '': 'America/New_York', '.TO': 'America/Toronto', '.V': 'America/Toronto', '.CN': 'America/Toronto',
+    '.NE': 'America/Toronto', '.SA': 'America/Sao_Paulo', '.MX': 'America/Mexico_City',
+    '.BA': 'America/Argentina/Buenos_Aires', '.SN': 'America/Santiago',
+    # Asia / Pacific
+    '.T': 'Asia/Tokyo', '.SS': 'Asia/Shanghai', '.SZ': 'Asia/Shanghai', '.HK': 'Asia/Hong_Kong',
+    '.KS': 'Asia/Seoul', '.KQ': 'Asia/Seoul', '.NS': 'Asia/Kolkata', '.BO': 'Asia/Kolkata',
+    '.AX': 'Australia/Sydney', '.NZ': 'Pacific/Auckland', '.TW': 'Asia/Taipei', '.TWO': 'Asia/Taipei',
+    '.KL': 'Asia/Kuala_Lumpur', '.SI': 'Asia/Singapore', '.JK': 'Asia/Jakarta', '.BK': 'Asia/Bangkok',
+    '.VN': 'Asia/Ho_Chi_Minh',
+    # Europe
+    '.L': 'Europe/London', '.DE': 'Europe/Berlin', '.F': 'Europe/Berlin', '.BE': 'Europe/Berlin',
+    '.DU': 'Europe/Berlin', '.MU': 'Europe/Berlin', '.SG': 'Europe/Berlin', '.PA': 'Europe/Paris',
+    '.AS': 'Europe/Amsterdam', '.BR': 'Europe/Brussels', '.LS': 'Europe/Lisbon', '.IR': 'Europe/Dublin',
+    '.MI': 'Europe/Rome', '.MC': 'Europe/Madrid', '.SW': 'Europe/Zurich', '.VI': 'Europe/Vienna',
+    '.ST': 'Europe/Stockholm', '.HE': 'Europe/Helsinki', '.CO': 'Europe/Copenhagen',
+    '.IC': 'Atlantic/Reykjavik', '.TL': 'Europe/Tallinn', '.RG': 'Europe/Riga', '.VS': 'Europe/Vilnius',
+    '.OL': 'Europe/Oslo', '.WA': 'Europe/Warsaw', '.IS': 'Europe/Istanbul', '.AT': 'Europe/Athens',
+    '.RO': 'Europe/Bucharest', '.BD': 'Europe/Budapest', '.PR': 'Europe/Prague', '.ME': 'Europe/Moscow',
+    # Middle East / Africa
+    '.TA': 'Asia/Jerusalem', '.SR': 'Asia/Riyadh', '.QA': 'Asia/Qatar', '.KW': 'Asia/Kuwait',
+    '.CA': 'Africa/Cairo', '.JO': 'Africa/Johannesburg',
+}
+
+CRYPTO_QUOTES = ('-USD', '-USDT', '-EUR', '-BTC', '-ETH')
+
+
+def suffix_of(symbol):
+    """'PTT.BK' -> '.BK', '^SET.BK' -> '.BK', 'AAPL' -> ''"""
+    symbol = symbol.upper()
+    return symbol[symbol.rfind('.'):] if '.' in symbol else ''
+
+
+def is_crypto(symbol):
+    return symbol.upper().endswith(CRYPTO_QUOTES)
+
+
+def timezone_for(symbol):
+    """Time zone the symbol's trading days are defined in"""
+    if is_crypto(symbol):
+        return 'UTC'
+    return SUFFIX_TIMEZONES.get(suffix_of(symbol), 'America/New_York')
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🕰️ TRADING CALENDAR
+# ═══════════════════════════════════════════════════════════════
+ROUND_THE_CLOCK = ('=X', '=F')  # FX pairs and futures trade (nearly) around the clock
+CLOSE_SETTLE = 20 * 60  # seconds after a close before the session's last bars are fetched
+SEARCH_DAYS = 15  # longest run of closed days looked through (Golden Week, Lunar New Year)
+
+EUROPE = ('09:00-17:35',)
+GERMAN_REGIONAL = ('08:00-22:00',)
+NORDIC = ('09:00-17:30',)
+
+# Local trading hours per Yahoo suffix, closing auctions included
+SESSION_HOURS = {
+    # Americas
+    '': ('09:30-16:00',), '.TO': ('09:30-16:00',), '.V': ('09:30-16:00',), '.CN': ('09:30-16:00',),
+    '.NE': ('09:30-16:00',), '.SA': ('10:00-18:00',), '.MX': ('08:30-15:00',),
+    '.BA': ('11:00-17:00',), '.SN': ('09:30-16:00',),
+    # Asia / Pacific
+    '.T': ('09:00-11:30', '12:30-15:30'), '.SS': ('09:30-11:30', '13:00-15:00'),
+    '.SZ': ('09:30-11:30', '13:00-15:00'), '.HK': ('09:30-12:00', '13:00-16:10'),
+    '.KS': ('09:00-15:30',), '.KQ': ('09:00-15:30',), '.NS': ('09:15-15:30',), '.BO': ('09:15-15:30',),
+    '.AX': ('10:00-16:12',), '.NZ': ('10:00-16:45',), '.TW': ('09:00-13:30',), '.TWO': ('09:00-13:30',),
+    '.KL': ('09:00-12:30', '14:30-17:00'), '.SI': ('09:00-12:00', '13:00-17:16'),
+    '.JK': ('09:00-16:00',), '.BK': ('10:00-12:30', '14:30-16:40'), '.VN': ('09:00-11:30', '13:00-15:00'),
+    # Europe
+    '.L': ('08:00-16:35',), '.DE': EUROPE, '.F': GERMAN_REGIONAL, '.BE': GERMAN_REGIONAL,
+    '.DU': GERMAN_REGIONAL, '.MU': GERMAN_REGIONAL, '.SG': GERMAN_REGIONAL, '.PA': EUROPE,
+    '.AS': EUROPE, '.BR': EUROPE, '.LS': ('08:00-16:35',), '.IR': ('08:00-16:30',),
+    '.MI': EUROPE, '.MC': EUROPE, '.SW': ('09:00-17:30',), '.VI': EUROPE,
+    '.ST': NORDIC, '.HE': ('10:00-18:30',), '.CO': NORDIC, '.IC': ('09:30-15:30',),
+    '.TL': ('10:00-16:00',), '.RG': ('10:00-16:00',), '.VS': ('10:00-16:00',), '.OL': ('09:00-16:25',),
+    '.WA': ('09:00-17:05',), '.IS': ('10:00-18:10',), '.AT': ('10:00-17:20',),
+    '.RO': ('10:00-17:45',), '.BD': ('09:00-17:20',), '.PR': ('09:00-16:25',), '.ME': ('10:00-18:50',),
+    # Middle East / Africa
+    '.TA': ('09:59-17:25',), '.SR': ('10:00-15:00',), '.QA': ('09:30-13:15',), '.KW': ('09:00-12:40',),
+    '.CA': ('10:00-14:30',), '.JO': ('09:00-17:00',),
+}
+
+# Days without trading (Monday = 0); Saturday and Sunday unless listed
+WEEKENDS = {'.SR': (4, 5), '.QA': (4, 5), '.KW': (4, 5), '.CA': (4, 5), '.TA': (5,)}
+
+_US_HOLIDAYS = frozenset({
+    '2026-01-01', '2026-01-19', '2026-02-16', '2026-04-03', '2026-05-25', '2026-06-19',
+    '2026-07-03', '2026-09-07', '2026-11-26', '2026-12-25',
+    '2027-01-01', '2027-01-18', '2027-02-15', '2027-03-26', '2027-05-31', '2027-06-18',
+    '2027-07-05', '2027-09-06', '2027-11-25', '2027-12-24',
+})
+_UK_HOLIDAYS = frozenset({
+    '2026-01-01', '2026-04-03', '2026-04-06', '2026-05-04', '2026-05-25', '2026-08-31',
+    '2026-12-25', '2026-12-28',
+    '2027-01-01', '2027-03-26', '2027-03-29', '2027-05-03', '2027-05-31', '2027-08-30',
+    '2027-12-27', '2027-12-28',
+})
+_JP_HOLIDAYS = frozenset({
+    '2026-01-01', '2026-01-02', '2026-01-12', '2026-02-11', '2026-02-23', '2026-03-20',
+    '2026-04-29', '2026-05-04', '2026-05-05', '2026-05-06', '2026-07-20', '2026-08-11',
+    '2026-09-21', '2026-09-22', '2026-09-23', '2026-10-12', '2026-11-03', '2026-11-23',
+    '2026-12-31',
+    '2027-01-01', '2027-01-11', '2027-02-11', '2027-02-23', '2027-03-22', '2027-04-29',
+    '2027-05-03', '2027-05-04', '2027-05-05', '2027-07-19', '2027-08-11', '2027-09-20',
+    '2027-09-23', '2027-10-11', '2027-11-03', '2027-11-23', '2027-12-31',
+})
+_TH_HOLIDAYS = frozenset({
+    '2026-01-01', '2026-03-03', '2026-04-06', '2026-04-13', '2026-04-14', '2026-04-15',
+    '2026-05-01', '2026-05-04', '2026-06-01', '2026-06-03', '2026-07-28', '2026-07-29',
+    '2026-08-12', '2026-10-13', '2026-10-23', '2026-12-07', '2026-12-10', '2026-12-31',
+})
+
+# Full-day closures (local dates) of the larger markets
+HOLIDAYS = {
+    '': _US_HOLIDAYS, '.L': _UK_HOLIDAYS, '.T': _JP_HOLIDAYS, '.BK': _TH_HOLIDAYS,
+}
+# Last year each table covers (SET publishes its lunar holidays a year at a time)
+HOLIDAYS_THROUGH = {'': 2027, '.L': 2027, '.T': 2027, '.BK': 2026}
+
+# Where the `holidays` package has each market's later years: (kind, code, subdivision)
+HOLIDAY_SOURCES = {
+    '': ('financial', 'NYSE', None), '.L': ('country', 'GB', 'ENG'), '.T': ('country', 'JP', None),
+    '.BK': ('country', 'TH', None),
+}
+# Exchange closures that are not public holidays, every year (MM-DD)
+YEARLY_CLOSURES = {'.T': ('01-02', '01-03', '12-31')}
+
+# Half days: local date -> early close
+EARLY_CLOSES = {
+    '': {'2026-11-27': '13:00', '2026-12-24': '13:00', '2027-11-26': '13:00'},
+    '.L': {'2026-12-24': '12:30', '2026-12-31': '12:30', '2027-12-24': '12:30', '2027-12-31': '12:30'},
+}
+
+
+def _clock(text):
+    hours, minutes = text.split(':')
+    return dtime(int(hours), int(minutes))
+
+
+def trades_around_the_clock(symbol):
+    """True for symbols with no session table: crypto, FX, futures"""
+    return is_crypto(symbol) or symbol.upper().endswith(ROUND_THE_CLOCK)
+
+
+def hours_for(symbol):
+    """The symbol's sessions as ('HH:MM-HH:MM', ...) local times, or None if it always trades"""
+    if trades_around_the_clock(symbol):
+        return None
+    return SESSION_HOURS.get(suffix_of(symbol))
+
+
+@lru_cache(maxsize=None)
+def _later_holidays(suffix, year):
+    """Closures in a year past the suffix's table, from the `holidays` package; none without it"""
+    try:
+        import holidays
+    except ImportError:
+        logger.warning("No %s holidays for %d: markets.HOLIDAYS ends in %d and the holidays package is not "
+                       "installed", suffix or 'US', year, HOLIDAYS_THROUGH[suffix])
+        metrics().count('calendar_expired', suffix=suffix or 'US', year=year)
+        return frozenset()
+    kind, code, subdiv = HOLIDAY_SOURCES[suffix]
+    if kind == 'financial':
+        calendar = holidays.financial_holidays(code, years=year)
+    else:
+        calendar = holidays.country_holidays(code, subdiv=subdiv, years=year)
+    return frozenset([day.isoformat() for day in calendar]
+                     + [f"{year}-{month_day}" for month_day in YEARLY_CLOSURES.get(suffix, ())])
+
+
+def is_holiday(suffix, day):
+    """Whether the market of `suffix` is closed all day on the local date `day`"""
+    through = HOLIDAYS_THROUGH.get(suffix)
+    if through is None:
+        return False
+    if day.year <= through:
+        return day.isoformat() in HOLIDAYS[suffix]
+    return day.isoformat() in _later_holidays(suffix, day.year)
+
+
+@lru_cache(maxsize=4096)
+def _sessions(suffix, day):
+    """[(open, close), ...] as epoch seconds on one local date; empty when the market is shut"""
+    if day.weekday() in WEEKENDS.get(suffix, (5, 6)) or is_holiday(suffix, day):
+        return ()
+    tz = ZoneInfo(SUFFIX_TIMEZONES.get(suffix, 'America/New_York'))
+    early = EARLY_CLOSES.get(suffix, {}).get(day.isoformat())
+    sessions = []
+    for span in SESSION_HOURS[suffix]:
+        start, end = (_clock(part) for part in span.split('-'))
+        if early is not None:
+            if start >= _clock(early):
+                continue
+            end = min(end, _clock(early))
+        sessions.append((datetime.combine(day, start, tz).timestamp(), datetime.combine(day, end, tz).timestamp()))
+    return tuple(sessions)
+
+
+def _local_date(symbol, at):
+    return datetime.fromtimestamp(at, ZoneInfo(timezone_for(symbol))).date()
+
+
+def sessions_between(symbol, first, last):
+    """Sessions of the local dates `first`..`last`, in order"""
+    suffix = suffix_of(symbol)
+    days = (first + timedelta(days=i) for i in range((last - first).days + 1))
+    return [s for day in days for s in _sessions(suffix, day)]
+
+
+def is_open(symbol, at=None):
+    """Whether the symbol's market is trading at `at` (epoch seconds, default now)"""
+    if hours_for(symbol) is None:
+        return True
+    at = time.time() if at is None else at
+    today = _local_date(symbol, at)
+    return any(start <= at < end for start, end in sessions_between(symbol, today, today))
+
+
+def last_close(symbol, at=None):
+    """The latest session close at or before `at`, or None (always-open symbols, nothing in range)"""
+    if hours_for(symbol) is None:
+        return None
+    at = time.time() if at is None else at
+    today = _local_date(symbol, at)
+    closes = [end for _, end in sessions_between(symbol, today - timedelta(days=SEARCH_DAYS), today) if end <= at]
+    return closes[-1] if closes else None
+
+
+def next_open(symbol, at=None):
+    """The first session open after `at`, or None (always-open symbols, nothing in range)"""
+    if hours_for(symbol) is None:
+        return None
+    at = time.time() if at is None else at
+    today = _local_date(symbol, at)
+    opens = [start for start, _ in sessions_between(symbol, today, today + timedelta(days=SEARCH_DAYS)) if start > at]
+    return opens[0] if opens else None
+
+
+def fresh_until(symbol, stored_at, ttl):
+    """
+    When data fetched at `stored_at` (epoch seconds) goes stale
+
+    `stored_at + ttl` while the market trades. Data fetched before a close
+    had settled is due `CLOSE_SETTLE` seconds after it, for the session's
+    final bars; data fetched after that stays fresh until the next open.
+    """
+    due = stored_at + ttl
+    if hours_for(symbol) is None or is_open(symbol, due):
+        return due
+    closed = last_close(symbol, due)
+    if closed is not None and stored_at < closed + CLOSE_SETTLE:
+        return max(due, closed + CLOSE_SETTLE)
+    reopens = next_open(symbol, due)
+    return due if reopens is None else max(due, reopens)
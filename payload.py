@@ -0,0 +1,83 @@
+"""
+Chart payload serialization.
+
+`build_payload` turns an indicator frame into one columnar payload, built
+once per rerun: epoch-second integer times plus one float array per column.
+Every chart reads its series from that payload instead of slicing and
+renaming its own copy of the frame. `sparkline_svg` draws one column as a
+few hundred bytes of inline SVG for panels too small for a full chart.
+"""
+import numpy as np
+import pandas as pd
+
+from downsample import lttb_indices
+
+CANDLE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+def build_payload(df):
+    """
+    Serialize an indicator frame once for all charts
+
+    `df['time']` holds naive wall-clock datetimes; they are encoded as epoch
+    seconds so the charts show exchange-local (Bangkok) time as before.
+    """
+    payload = {'time': df['time'].to_numpy(dtype='datetime64[s]').astype(np.int64)}
+    for col in df.columns:
+        if col == 'time' or not pd.api.types.is_numeric_dtype(df[col]):
+            continue
+        values = df[col].to_numpy()
+        payload[col] = widen(values) if values.dtype == np.float32 else values.astype(np.float64)
+    return payload
+
+
+def widen(values):
+    """
+    float32 -> float64 at float32's 7 significant digits
+
+    A plain cast turns 101.23 into 101.23000335693359, which would bloat
+    every number in the chart JSON.
+    """
+    values = values.astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = 10.0 ** (6 - np.floor(np.log10(np.abs(values))))
+        rounded = np.round(values * scale) / scale
+    return np.where(np.isfinite(rounded), rounded, values)
+
+
+def candle_frame(payload):
+    """
+    OHLCV frame for `chart.set()`, which needs datetimes to work out the bar interval
+
+    The library converts with `astype('int64') // 10**9`, so the datetimes
+    must be nanosecond resolution or the chart gets bogus timestamps.
+    """
+    frame = {'time': payload['time'].astype('datetime64[s]').astype('datetime64[ns]')}
+    frame.update((col, payload[col]) for col in CANDLE_COLUMNS if col in payload)
+    return pd.DataFrame(frame, copy=False)
+
+
+def set_series(series, payload, col):
+    """Feed one payload column to a line/histogram, skipping the library's re-formatting; returns the series"""
+    frame = pd.DataFrame({'time': payload['time'], series.name: payload[col]}, copy=False)
+    series.set(frame, format_cols=False)
+    return series
+
+
+def sparkline_svg(values, color, height=48, points=120):
+    """Inline SVG line (with a faint fill) of `values`, LTTB-reduced to at most `points` vertices"""
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    if len(values) < 2:
+        return ''
+    values = values[lttb_indices(np.arange(len(values)), values, points)]
+
+    low, high = values.min(), values.max()
+    span = high - low or 1.0
+    x = np.linspace(0, 100, len(values))
+    y = (high - values) / span * (height - 4) + 2
+    line = ' '.join(f"{a:.1f},{b:.1f}" for a, b in zip(x, y))
+    return (f"<svg viewBox='0 0 100 {height}' preserveAspectRatio='none' width='100%' height='{height}'>"
+            f"<polygon points='0,{height} {line} 100,{height}' fill='{color}' fill-opacity='0.12'/>"
+            f"<polyline points='{line}' fill='none' stroke='{color}' stroke-width='1.5' "
+            f"vector-effect='non-scaling-stroke'/></svg>")
@@ -0,0 +1,198 @@
+"""
+Indicator frames per (symbol, timeframe), behind the process and shared caches.
+
+The data engine behind the dashboard's charts, kept free of Streamlit so
+the data API (see data_api.py) can serve the same frames from a process
+that never runs the page. Everything here is safe to call from any thread.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import pandas as pd
+
+from bar_cache import CompactFrame, bar_cache
+from indicators import get_engine
+from providers import provider
+from refresher import BackgroundRefresher
+from resample import timeframe_store
+from shared_cache import shared_cache
+from telemetry import metrics
+
+TIMEFRAME_INTERVALS = {'5min': '5m', '15min': '15m', '1hour': '1h', '1day': '1d'}
+TIMEFRAME_PERIODS = {'5min': '5d', '15min': '5d', '1hour': '1mo', '1day': '6mo'}
+# Long-history mode: as far back as Yahoo serves each interval
+LONG_HISTORY_PERIODS = {'5min': '60d', '15min': '60d', '1hour': '2y', '1day': '10y'}
+PROCESS_CACHE_TTL = 15  # seconds before a process-cached frame is re-read from the shared cache
+WARM_WORKERS = 8  # symbols loaded ahead at once
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def background_refresher():
+    """
+    One background refresher per process, shared by all sessions
+    
+    Refreshes follow each market's trading hours (see markets.py), except
+    in replay mode, whose clock is not the wall clock.
+    """
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = BackgroundRefresher(shared_cache(), calendar=provider().mode != 'replay')
+        return _default
+
+
+def load_pro_data(symbol, timeframe, long_history=False):
+    """
+    Per-process copy of the shared cache entry for (symbol, timeframe)
+    
+    The shared cache (110 s) coalesces concurrent misses from every session
+    and replica into one fetch. This short-lived layer only saves the
+    backend round trip within a burst of reruns. A stale entry is returned
+    as-is; the background refresher is already revalidating it.
+    
+    Frames are kept packed in the byte-budgeted bar cache (see bar_cache.py),
+    so memory stays bounded however many symbols are opened.
+    """
+    key = pro_data_key(symbol, timeframe, long_history)
+    entry = bar_cache().get(('frame', key))
+    if entry is None or time.time() - entry[0] >= PROCESS_CACHE_TTL:
+        metrics().count('cache_misses', layer='process', symbol=symbol, timeframe=timeframe)
+        packed, problem = shared_cache().get_or_load(key, partial(build_shared_miss, symbol, timeframe, long_history),
+                                                     allow_stale=True, expires=background_refresher().expires(symbol))
+        entry = bar_cache().put(('frame', key), (time.time(), packed, problem))
+    _, packed, problem = entry
+    df = packed.to_frame() if isinstance(packed, CompactFrame) else packed.copy()
+    return df, problem
+
+
+def build_shared_miss(symbol, timeframe, long_history=False):
+    """Loader for a shared-cache miss (refreshes call pack_pro_data directly)"""
+    metrics().count('cache_misses', layer='shared', symbol=symbol, timeframe=timeframe)
+    return pack_pro_data(symbol, timeframe, long_history)
+
+
+def pack_pro_data(symbol, timeframe, long_history=False):
+    """build_pro_data with the frame packed for the caches: float32 columns, no intermediates"""
+    df, problem = build_pro_data(symbol, timeframe, long_history)
+    return CompactFrame.pack(df), problem
+
+
+def pro_data_key(symbol, timeframe, long_history=False):
+    return f"pro_data:{symbol}:{timeframe}" + (":long" if long_history else "")
+
+
+_warm_pool = ThreadPoolExecutor(max_workers=WARM_WORKERS, thread_name_prefix='warm')
+_warming = set()
+_warming_lock = threading.Lock()
+
+
+def warm_pro_data(symbols, timeframe):
+    """
+    Start loading `symbols` in the background and return at once
+    
+    A grid's panels each load their own symbol. Warming them all first
+    means a panel waits for its own fetch only (the shared cache joins it
+    rather than repeating it), never for the slowest symbol on the wall.
+    """
+    for symbol in dict.fromkeys(symbols):
+        key = pro_data_key(symbol, timeframe)
+        with _warming_lock:
+            if key in _warming:
+                continue
+            _warming.add(key)
+        _warm_pool.submit(_warm, key, symbol, timeframe)
+
+
+def _warm(key, symbol, timeframe):
+    try:
+        load_pro_data(symbol, timeframe)
+    except Exception:
+        pass  # the panel loads the symbol itself and reports the problem
+    finally:
+        with _warming_lock:
+            _warming.discard(key)
+
+
+def watch_pro_data(symbol, timeframe, long_history=False):
+    """Keep (symbol, timeframe) fresh in the background while it is on screen"""
+    background_refresher().watch(pro_data_key(symbol, timeframe, long_history),
+                          partial(pack_pro_data, symbol, timeframe, long_history), symbol)
+
+
+def invalidate_pro_data(symbols, timeframe):
+    """Drop cached frames so the next load fetches fresh bars"""
+    for sym in symbols:
+        timeframe_store().invalidate(sym)
+        for key in (pro_data_key(sym, timeframe), pro_data_key(sym, timeframe, long_history=True)):
+            bar_cache().pop(('frame', key))
+            shared_cache().invalidate(key)
+
+
+def build_pro_data(symbol, timeframe, long_history=False):
+    """
+    Fetch and process market data with comprehensive error handling
+    
+    Returns (df, problem) where problem is None or a (level, message) pair.
+    Makes no Streamlit UI calls, so it is safe to run on worker threads.
+    With `long_history` the whole available history is kept (charts
+    downsample it) instead of the last 300 bars.
+    
+    Improvements:
+    - Better error handling with specific error messages
+    - Data validation
+    - Safer timezone handling
+    - Division by zero protection for RSI calculation
+    - Bars persisted on disk; only the newest bars are downloaded
+    - Incremental indicators; only new bars are processed
+    - Vectorized time column (no per-row strftime)
+    """
+    interval = TIMEFRAME_INTERVALS.get(timeframe, '1d')
+    periods = LONG_HISTORY_PERIODS if long_history else TIMEFRAME_PERIODS
+    period = periods.get(timeframe, '6mo')
+    labels = {'symbol': symbol, 'timeframe': timeframe}
+    
+    try:
+        # Derived from the symbol's in-memory 5-minute series; the bar store
+        # only downloads bars newer than the last stored one
+        with metrics().span('fetch', **labels) as s:
+            df = timeframe_store().bars(symbol, interval, period)
+            s['rows'] = len(df)
+        
+        # Validate data
+        if df.empty:
+            return pd.DataFrame(), ('warning', f"⚠️ No data available for {symbol}")
+        
+        # Indicators, stepping only through bars the engine has not seen yet
+        with metrics().span('indicators', **labels):
+            # Long history has its own engine: the two series start at different bars
+            df = get_engine(symbol, f"{timeframe}:long" if long_history else timeframe).update(df)
+        
+        with metrics().span('timezone', **labels) as s:
+            # Timezone handling (the store keeps bars in UTC)
+            df.index = df.index.tz_convert('Asia/Bangkok')
+            
+            # Reset index (naive Bangkok wall-clock times)
+            df = df.reset_index()
+            df['time'] = df['time'].dt.tz_localize(None)
+            
+            df = df.dropna()
+            if not long_history:
+                df = df.tail(300)
+            s['rows'] = len(df)
+        df.attrs['fetched_at'] = time.time()  # epoch seconds: attrs must stay JSON-serializable for st.dataframe
+        return df, None
+        
+    except Exception as e:
+        return pd.DataFrame(), ('error', f"❌ Error fetching data for {symbol}: {str(e)}")
+
+
+def api_frame(symbol, timeframe):
+    """Loader for the data API: the frame the dashboard shows, kept fresh while it is polled"""
+    watch_pro_data(symbol, timeframe)
+    metrics().count('cache_requests', layer='process', symbol=symbol, timeframe=timeframe)
+    return load_pro_data(symbol, timeframe)
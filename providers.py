@@ -0,0 +1,244 @@
+"""
+Market-data providers: live, record and replay.
+
+Every download goes through `download`, which hands it to the process-wide
+provider chosen by DASHBOARD_DATA_MODE:
+
+- 'live' (default): Yahoo's chart API through the rate-limited client in
+  fetch_client.py
+- 'record': live, and every response is also written to the recording
+  directory as one zstd Parquet file, with a line per request
+  in `index.jsonl`
+- 'replay': no network. Each ticker's recorded bars are merged into one
+  history, and requests are answered from it as of the replay clock.
+  Without a speed the clock stands still at DASHBOARD_REPLAY_AT (default:
+  the newest recorded bar), which serves one historical snapshot at full
+  speed. With DASHBOARD_REPLAY_SPEED it starts at DASHBOARD_REPLAY_AT
+  (default: when the recording started) and runs that many times faster
+  than the wall clock, so bars arrive as a stream.
+
+A replayed bar is its last recorded version, so a bar that was still
+forming when recorded shows its final values as soon as it opens.
+
+Replayed history must not mix with live history: `namespace()` names the
+replay's own bar-store directory and shared-cache keys ('replay-<hash of
+the recording directory>'), and replay reads drop stored bars newer than
+the replay clock.
+
+Configuration from the environment:
+DASHBOARD_DATA_MODE     live | record | replay (default live)
+DASHBOARD_RECORD_DIR    recordings directory (default .recordings)
+DASHBOARD_REPLAY_AT     ISO time the replay clock starts at
+DASHBOARD_REPLAY_SPEED  replay clock multiplier, e.g. 60 = an hour per minute
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+from fetch_client import fetch_client
+
+RECORD_DIR = os.environ.get(
+    'DASHBOARD_RECORD_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.recordings'),
+)
+
+# How far back each yfinance `period` reaches
+PERIOD_SPANS = {
+    '5d': pd.Timedelta(days=5),
+    '1mo': pd.Timedelta(days=31),
+    '60d': pd.Timedelta(days=60),
+    '6mo': pd.Timedelta(days=183),
+    '1y': pd.Timedelta(days=366),
+    '2y': pd.Timedelta(days=731),
+    '10y': pd.Timedelta(days=3653),
+}
+
+
+def _tickers(tickers):
+    return tickers.split() if isinstance(tickers, str) else list(tickers)
+
+
+def _utc(stamp):
+    stamp = pd.Timestamp(stamp)
+    return stamp.tz_localize('UTC') if stamp.tz is None else stamp.tz_convert('UTC')
+
+
+class LiveProvider:
+    """Straight to Yahoo"""
+    mode = 'live'
+
+    def download(self, tickers, **kwargs):
+        return fetch_client().download(tickers, **kwargs)
+
+    def now(self):
+        return pd.Timestamp.now(tz='UTC')
+
+
+class RecordingProvider(LiveProvider):
+    """Yahoo, with every response also written to `root`"""
+    mode = 'record'
+
+    def __init__(self, root=RECORD_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def download(self, tickers, **kwargs):
+        raw = super().download(tickers, **kwargs)
+        if raw is not None and not raw.empty:
+            self.record(_tickers(tickers), kwargs, raw)
+        return raw
+
+    def record(self, tickers, request, raw):
+        at = pd.Timestamp.now(tz='UTC')
+        name = f"{time.time_ns()}-{os.getpid()}-{threading.get_ident()}.parquet"
+        os.makedirs(os.path.join(self.root, 'responses'), exist_ok=True)
+        raw.to_parquet(os.path.join(self.root, 'responses', name), compression='zstd')
+
+        entry = {
+            'at': at.isoformat(), 'file': name, 'tickers': tickers, 'rows': len(raw),
+            **{k: str(request[k]) for k in ('interval', 'period', 'start', 'end') if request.get(k) is not None},
+        }
+        with self._lock, open(os.path.join(self.root, 'index.jsonl'), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+
+
+class ReplayProvider:
+    """
+    Answers downloads from a recording as of a replay clock
+
+    `at` is where the clock starts and `speed` how fast it runs (None: it
+    stands still). The recording is read on first use.
+    """
+    mode = 'replay'
+
+    def __init__(self, root=RECORD_DIR, at=None, speed=None):
+        self.root = root
+        self.speed = speed
+        self._at = None if at is None else _utc(at)
+        self._started = time.monotonic()
+        self._history = None  # (interval, ticker) -> raw-shaped bars
+        self._lock = threading.Lock()
+
+    def _entries(self):
+        try:
+            with open(os.path.join(self.root, 'index.jsonl'), encoding='utf-8') as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except OSError:
+            return []
+
+    def _load(self):
+        with self._lock:
+            if self._history is not None:
+                return self._history
+            parts = {}
+            entries = self._entries()
+            for entry in entries:
+                raw = pd.read_parquet(os.path.join(self.root, 'responses', entry['file']))
+                interval = entry.get('interval', '1d')
+                for ticker in entry['tickers']:
+                    if isinstance(raw.columns, pd.MultiIndex):
+                        if ticker not in raw.columns.get_level_values(-1):
+                            continue
+                        bars = raw.xs(ticker, axis=1, level=-1)
+                    else:
+                        bars = raw
+                    parts.setdefault((interval, ticker), []).append(bars.dropna(how='all'))
+
+            history = {}
+            for key, frames in parts.items():
+                bars = pd.concat(frames)
+                # The latest recording of a bar wins (a forming bar is revised by later responses)
+                history[key] = bars[~bars.index.duplicated(keep='last')].sort_index()
+            self._history = history
+
+            if self._at is None:
+                if self.speed is None:
+                    newest = [_utc(bars.index[-1]) for bars in history.values() if len(bars)]
+                    self._at = max(newest, default=pd.Timestamp.now(tz='UTC'))
+                else:
+                    self._at = min((_utc(e['at']) for e in entries), default=pd.Timestamp.now(tz='UTC'))
+                self._started = time.monotonic()
+            return history
+
+    def now(self):
+        """The replay clock"""
+        self._load()
+        if self.speed is None:
+            return self._at
+        return self._at + pd.Timedelta(seconds=(time.monotonic() - self._started) * self.speed)
+
+    def download(self, tickers, interval='1d', period=None, start=None, end=None, **kwargs):
+        history = self._load()
+        now = self.now()
+        frames = {}
+        for ticker in _tickers(tickers):
+            bars = history.get((interval, ticker))
+            if bars is None or bars.empty:
+                continue
+            stamps = bars.index if bars.index.tz is not None else bars.index.tz_localize('UTC')
+            keep = stamps <= now
+            if start is not None:
+                keep &= stamps >= _utc(start)
+            elif period in PERIOD_SPANS:
+                keep &= stamps > now - PERIOD_SPANS[period]
+            if end is not None:
+                keep &= stamps < _utc(end)
+            if keep.any():
+                frames[ticker] = bars[keep]
+        if not frames:
+            return pd.DataFrame()
+
+        # Shaped like yf.download: (Price, Ticker) columns
+        df = pd.concat(frames, axis=1).swaplevel(0, 1, axis=1)
+        df.columns.names = ['Price', 'Ticker']
+        return df
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def provider():
+    """Process-wide provider configured by DASHBOARD_DATA_MODE and friends"""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            mode = os.environ.get('DASHBOARD_DATA_MODE', 'live')
+            root = os.environ.get('DASHBOARD_RECORD_DIR', RECORD_DIR)
+            if mode == 'record':
+                _provider = RecordingProvider(root)
+            elif mode == 'replay':
+                speed = os.environ.get('DASHBOARD_REPLAY_SPEED')
+                _provider = ReplayProvider(root, os.environ.get('DASHBOARD_REPLAY_AT'),
+                                           float(speed) if speed else None)
+            elif mode == 'live':
+                _provider = LiveProvider()
+            else:
+                raise ValueError(f"Unknown DASHBOARD_DATA_MODE: {mode}")
+        return _provider
+
+
+def download(tickers, **kwargs):
+    """`yf.download`-shaped download through the configured provider"""
+    return provider().download(tickers, **kwargs)
+
+
+def now():
+    """Current time for data decisions: the wall clock, or the replay clock when replaying"""
+    return provider().now()
+
+
+def namespace():
+    """
+    Where this mode's derived data lives: '' for live and record, which share real history
+
+    Replays of one recording share 'replay-<hash of its directory>'.
+    """
+    if os.environ.get('DASHBOARD_DATA_MODE', 'live') != 'replay':
+        return ''
+    root = os.path.abspath(os.environ.get('DASHBOARD_RECORD_DIR', RECORD_DIR))
+    return 'replay-' + hashlib.sha1(root.encode()).hexdigest()[:12]
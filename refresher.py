@@ -0,0 +1,110 @@
+"""
+Background refresh scheduler (stale-while-revalidate).
+
+Renders register the (symbol, timeframe) pairs they show with `watch`. A
+daemon thread reloads every watched pair shortly before its cache entry
+goes stale, so the user-facing rerun reads a fresh frame without touching
+the network. Pairs nobody has viewed for `idle` seconds are dropped.
+
+Keys watched with their symbol follow its market's calendar (see
+markets.fresh_until) when `calendar` is on: nothing is refetched while the
+market is closed except once after the close, and when several keys are
+due, those whose market is open go first.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from markets import fresh_until, is_open
+
+
+class BackgroundRefresher:
+    """Keeps watched SharedCache keys fresh from a background thread"""
+
+    def __init__(self, cache, lead=20, idle=600, tick=1.0, workers=4, calendar=True):
+        self.cache = cache
+        self.calendar = calendar
+        self.lead = lead
+        self.idle = idle
+        self.tick = tick
+        self._watched = {}  # key -> [loader, last_viewed, symbol]
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='refresher')
+        self._thread = None
+        self.stats = {'refreshes': 0, 'failures': 0}
+
+    def expires(self, symbol):
+        """Staleness rule of a symbol's keys, for SharedCache `expires`; None means the plain TTL"""
+        if not self.calendar or symbol is None:
+            return None
+        return partial(fresh_until, symbol, ttl=self.cache.ttl)
+
+    def watch(self, key, loader, symbol=None):
+        """Register (or re-touch) a key that is on screen"""
+        with self._lock:
+            self._watched[key] = [loader, time.time(), symbol]
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='refresher-scheduler', daemon=True)
+                self._thread.start()
+
+    def watched(self):
+        with self._lock:
+            return list(self._watched)
+
+    def _refresh_at(self, symbol, stored_at):
+        """When a key stored at `stored_at` is refreshed: `lead` seconds early while its market trades"""
+        expires = self.expires(symbol)
+        if expires is None:
+            return stored_at + self.cache.ttl - self.lead
+        due = expires(stored_at)
+        # Closed at the lead: fetching early would miss the final bars or the opening ones
+        return due - self.lead if is_open(symbol, due - self.lead) else due
+
+    def _due(self):
+        """Keys whose entry is missing or within `lead` seconds of going stale, open markets first"""
+        now = time.time()
+        due = []
+        with self._lock:
+            for key, (loader, viewed, symbol) in list(self._watched.items()):
+                if now - viewed > self.idle:
+                    del self._watched[key]
+                elif key not in self._pending:
+                    due.append((key, loader, symbol))
+
+        ready = []
+        for key, loader, symbol in due:
+            age = self.cache.age(key)
+            if age is None:
+                ready.append((False, 0, key, loader, symbol))
+                continue
+            refresh_at = self._refresh_at(symbol, now - age)
+            if now >= refresh_at:
+                trading = symbol is None or not self.calendar or is_open(symbol, now)
+                ready.append((not trading, refresh_at, key, loader, symbol))
+        ready.sort(key=lambda item: item[:2])
+        return [(key, loader, symbol) for _, _, key, loader, symbol in ready]
+
+    def _refresh(self, key, loader, symbol=None):
+        try:
+            # min_age: if another replica refreshed it meanwhile, keep theirs
+            self.cache.refresh(key, loader, min_age=self.cache.ttl - self.lead, expires=self.expires(symbol))
+            self.stats['refreshes'] += 1
+        except Exception:
+            self.stats['failures'] += 1
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def _run(self):
+        while True:
+            for key, loader, symbol in self._due():
+                with self._lock:
+                    self._pending.add(key)
+                self._pool.submit(self._refresh, key, loader, symbol)
+            with self._lock:
+                if not self._watched:
+                    self._thread = None
+                    return
+            time.sleep(self.tick)
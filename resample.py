@@ -0,0 +1,187 @@
+"""
+Every timeframe from one base-resolution series per symbol.
+
+`TimeframeStore` keeps each symbol's 5-minute bars in memory and derives
+15-minute, hourly and daily bars from them with `resample_bars`, so
+switching timeframes costs a few vectorized reductions instead of a new
+download. Bins start at each session's first bar and never span a break:
+hourly US bars run 9:30, 10:30, ... like Yahoo's own, and Hong Kong's
+afternoon bars start at the 13:00 reopen rather than on the morning's grid.
+
+The base series is only downloaded as far back as the timeframes asked for
+so far need (five days for the default views) and extended backwards when a
+longer one is opened, up to BASE_PERIOD.
+
+A timeframe whose history reaches further back than the base series (daily
+over six months) takes the older bars from a coarse series, fetched only
+when the bar store cannot already cover that span.
+"""
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import providers
+from bar_cache import bar_cache
+from bar_store import PERIOD_SPANS, BarStore, load_bars, within
+from markets import timezone_for
+from telemetry import metrics
+
+BASE_INTERVAL = '5m'
+BASE_PERIOD = '60d'  # the longest 5-minute history Yahoo serves
+
+# Yahoo interval -> bin width derived from the base series
+RESAMPLE_RULES = {'5m': None, '15m': '15min', '30m': '30min', '1h': '1h', '1d': '1D'}
+
+
+def resample_bars(bars, rule, tz='UTC'):
+    """
+    Aggregate bars into `rule` bins (first/max/min/last/sum) within each session
+
+    Intraday bins are anchored at each session's first bar in `tz` and
+    labelled by their start. A session starts with each local day and again
+    after any gap longer than both one base bar and one bin, such as a lunch
+    break. Daily bins are labelled midnight UTC of the local date, the
+    way `normalize_bars` stores Yahoo's daily bars.
+    """
+    bars = bars.dropna(subset=['open', 'high', 'low', 'close'])
+    if bars.empty:
+        return bars
+
+    wall = bars.index.tz_convert(tz).tz_localize(None).as_unit('ns').asi8
+    day = wall - wall % 86_400_000_000_000
+    if rule == '1D':
+        labels = day
+    else:
+        step = pd.Timedelta(rule).value
+        gaps = np.diff(wall)
+        bar = gaps[gaps > 0].min() if (gaps > 0).any() else step  # the base bar width
+        # A bar or two missing from a thin market leaves the grid alone; a break longer than a bin does not
+        starts = np.flatnonzero(np.r_[True, (day[1:] != day[:-1]) | (gaps > max(bar, step))])
+        first = np.repeat(wall[starts], np.diff(np.r_[starts, len(wall)]))
+        labels = first + (wall - first) // step * step
+
+    starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+    ends = np.r_[starts[1:], len(labels)] - 1
+
+    out = {}
+    for col in bars.columns:
+        values = bars[col].to_numpy(dtype=float)
+        if col == 'open':
+            out[col] = values[starts]
+        elif col == 'high':
+            out[col] = np.maximum.reduceat(values, starts)
+        elif col == 'low':
+            out[col] = np.minimum.reduceat(values, starts)
+        elif col == 'volume':
+            out[col] = np.add.reduceat(np.nan_to_num(values), starts)
+        else:  # close, adj close
+            out[col] = values[ends]
+
+    if rule == '1D':
+        index = pd.DatetimeIndex(labels[starts]).tz_localize('UTC')
+    else:
+        # Shift each bin's first bar back to the bin start, keeping the real UTC offset
+        index = bars.index[starts] - pd.to_timedelta(wall[starts] - labels[starts])
+    return pd.DataFrame(out, index=index.rename('time'))
+
+
+class TimeframeStore:
+    """
+    Base-resolution bars per symbol in memory, resampled on demand
+
+    The base series is re-read (a bar store top-up) at most every `ttl`
+    seconds per symbol; concurrent callers for one symbol share that load.
+    Loaded series are held in the byte-budgeted bar cache as
+    (loaded_at, reach, bars), `reach` being the span already fetched.
+    """
+
+    def __init__(self, store=None, ttl=30):
+        self.store = store or BarStore()
+        self.ttl = ttl
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._reach = {}  # symbol -> widest period the base series was fetched for
+
+    def _symbol_lock(self, symbol):
+        with self._lock:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    def base(self, symbol, period=BASE_PERIOD):
+        """
+        The symbol's base-interval bars back `period` (at most BASE_PERIOD)
+
+        From memory when loaded in the last `ttl` seconds and as far back.
+        The first longer period asked for extends the series backwards.
+        """
+        if PERIOD_SPANS.get(period, pd.Timedelta.max) > PERIOD_SPANS[BASE_PERIOD]:
+            period = BASE_PERIOD
+        span = PERIOD_SPANS[period]
+        with self._symbol_lock(symbol):
+            cached = bar_cache().get(('base', self.store.root, symbol))
+            if cached and time.time() - cached[0] < self.ttl and cached[1] >= span:
+                metrics().count('base_bars', result='memory', symbol=symbol)
+                return cached[2]
+            metrics().count('base_bars', result='load', symbol=symbol)
+            reach = self._reach.get(symbol)
+            extend = reach is None or PERIOD_SPANS[reach] < span
+            if extend:
+                self._reach[symbol] = period
+            else:
+                period = reach  # reload as far back as already held
+            bars = load_bars(symbol, BASE_INTERVAL, period, self.store, extend=extend)
+            bar_cache().put(('base', self.store.root, symbol), (time.time(), PERIOD_SPANS[period], bars))
+            return bars
+
+    def invalidate(self, symbol):
+        bar_cache().pop(('base', self.store.root, symbol))
+
+    def _coarse(self, symbol, interval, period, start, until):
+        """Stored `interval` bars back to `start`; downloaded only if the store falls short"""
+        stored = self.store.read(symbol, interval)
+        if not stored.empty and stored.index[0] <= start and stored.index[-1] >= until:
+            return within(stored, period, providers.now())
+        return load_bars(symbol, interval, period, self.store)
+
+    def bars(self, symbol, interval, period):
+        """`interval` bars covering `period`, derived from the base series wherever it reaches"""
+        rule = RESAMPLE_RULES.get(interval, False)
+        if rule is False:
+            return load_bars(symbol, interval, period, self.store)
+
+        base = self.base(symbol, period)
+        if base.empty:
+            # No intraday data for this symbol: fall back to the interval itself
+            return load_bars(symbol, interval, period, self.store)
+
+        with metrics().span('resample', symbol=symbol, interval=interval) as s:
+            derived = base if rule is None else resample_bars(base, rule, timezone_for(symbol))
+            s['rows'] = len(derived)
+
+        span = PERIOD_SPANS.get(period)
+        if span is None or derived.empty or base.index[0] <= providers.now() - span:
+            return derived
+
+        # The first derived bin may be cut short by where the base series starts
+        cut = derived.index[1] if len(derived) > 1 else derived.index[0]
+        coarse = self._coarse(symbol, interval, period, providers.now() - span, cut)
+        if coarse.empty:
+            return derived
+        older = coarse[coarse.index < cut]
+        if older.empty:
+            return derived
+        return pd.concat([older, derived[derived.index >= cut]])
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def timeframe_store():
+    """Process-wide store shared by every session"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = TimeframeStore()
+        return _default
@@ -0,0 +1,220 @@
+"""
+Breakout scanner over a whole universe file.
+
+Runs the dashboard's breakout rule (close above the previous `res`, or below
+the previous `sup`) with RSI and EMA200 filters across every Yahoo-listed
+symbol of a `symbols_*.csv`. Symbols are downloaded in chunked multi-ticker
+batches on the main thread while a process pool runs the indicator kernel
+(one symbols × bars call per chunk) over the chunks already downloaded.
+Finished chunks are appended to a progress file, so an interrupted scan
+resumes where it stopped. Progress is keyed by the data's as-of time (the
+day, or the hour for intraday bars) and removed once a scan completes, so
+a later scan downloads fresh bars. A chunk whose download fails is left
+out of the results and retried by the next run.
+"""
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import providers
+from bar_store import split_download
+from kernels import COLUMN_INDEX, compute_indicators, stack_bars
+from universe import load_universe
+
+PROGRESS_DIR = os.environ.get(
+    'SCAN_PROGRESS_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.scan_progress'),
+)
+MIN_BARS = 21  # 20-bar res/sup plus the previous bar to compare against
+INTRADAY = ('1m', '2m', '5m', '15m', '30m', '60m', '90m', '1h')
+
+logger = logging.getLogger('dashboard.scanner')
+
+RESULT_COLUMNS = ['ticker', 'exchange', 'symbol', 'signal', 'close', 'level', 'strength_pct',
+                  'rsi', 'ema50', 'ema200', 'volume', 'time']
+
+
+def scan_frame(df, rsi_max=70, rsi_min=30, trend_filter=True):
+    """
+    Evaluate the breakout rule on the last bar of one symbol
+
+    A breakout must not be overbought (RSI <= rsi_max) and, with
+    `trend_filter`, must close above EMA200; a breakdown mirrors that.
+    Returns a result dict, or None when nothing qualifies.
+    """
+    return scan_frames([df], rsi_max, rsi_min, trend_filter)[0]
+
+
+def scan_frames(frames, rsi_max=70, rsi_min=30, trend_filter=True):
+    """`scan_frame` for many symbols with one indicator-kernel call; one result (or None) per frame"""
+    frames = [df.dropna(subset=['open', 'high', 'low', 'close']) for df in frames]
+    results = [None] * len(frames)
+    usable = [i for i, df in enumerate(frames) if len(df) >= MIN_BARS]
+    if not usable:
+        return results
+
+    bars = stack_bars([frames[i] for i in usable])
+    indicators = compute_indicators(bars['high'], bars['low'], bars['close'])
+    last, prev = indicators[:, :, -1], indicators[:, :, -2]
+    c = COLUMN_INDEX
+    close, signal, rsi, ema200 = bars['close'][:, -1], last[c['signal']], last[c['rsi']], last[c['ema200']]
+    up = (signal == 1) & (rsi <= rsi_max) & ((close > ema200) | (not trend_filter))
+    down = (signal == -1) & (rsi >= rsi_min) & ((close < ema200) | (not trend_filter))
+    level = np.where(signal == 1, prev[c['res']], prev[c['sup']])
+
+    for k in np.flatnonzero(up | down):
+        df = frames[usable[k]]
+        results[usable[k]] = {
+            'signal': 'BREAKOUT' if signal[k] == 1 else 'BREAKDOWN',
+            'close': float(close[k]),
+            'level': float(level[k]),
+            'strength_pct': float((close[k] / level[k] - 1) * 100),
+            'rsi': float(rsi[k]),
+            'ema50': float(last[c['ema50'], k]),
+            'ema200': float(ema200[k]),
+            'volume': float(df['volume'].iloc[-1]) if 'volume' in df else 0.0,
+            'time': str(df.index[-1]),
+        }
+    return results
+
+
+def _scan_chunk(frames, params):
+    """Worker: evaluate every (row, frame) of one downloaded chunk in one batch"""
+    try:
+        hits = scan_frames([df for _, df in frames], **params)
+    except Exception:
+        # One bad frame should not sink the chunk: fall back to symbol by symbol
+        hits = []
+        for _, df in frames:
+            try:
+                hits.append(scan_frame(df, **params))
+            except Exception:
+                hits.append(None)
+    return [{'ticker': ticker, 'exchange': exchange, 'symbol': symbol, **hit}
+            for ((exchange, symbol, ticker), _), hit in zip(frames, hits) if hit]
+
+
+def download_chunk(rows, interval, period):
+    """One multi-ticker request for a chunk; returns [(row, bars)] for tickers that came back"""
+    tickers = [ticker for _, _, ticker in rows]
+    raw = providers.download(tickers, interval=interval, period=period, group_by='column',
+                             progress=False, auto_adjust=False, threads=True)
+    frames = split_download(raw, tickers)
+    return [(row, frames[row[2]]) for row in rows if row[2] in frames]
+
+
+class ScanProgress:
+    """Append-only JSON-lines record of finished chunks for one scan configuration"""
+
+    def __init__(self, key, root=PROGRESS_DIR):
+        self.path = os.path.join(root, f"{key}.jsonl")
+
+    @staticmethod
+    def as_of(interval, now=None):
+        """The data time a scan stands for: the (UTC) day, or the hour for intraday bars"""
+        now = providers.now() if now is None else now
+        return now.strftime('%Y-%m-%dT%H' if interval in INTRADAY else '%Y-%m-%d')
+
+    @staticmethod
+    def key_for(path, interval, period, chunk_size, params, as_of=None):
+        as_of = as_of or ScanProgress.as_of(interval)
+        spec = json.dumps([os.path.basename(path), interval, period, chunk_size, params, as_of,
+                           providers.namespace()], sort_keys=True)
+        name = os.path.splitext(os.path.basename(path))[0]
+        return f"{name}-{interval}-{hashlib.sha1(spec.encode()).hexdigest()[:10]}"
+
+    def load(self):
+        """{chunk_index: results} for every chunk already finished"""
+        done = {}
+        if not os.path.exists(self.path):
+            return done
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    break  # torn last line from an interrupted run
+                done[rec['chunk']] = rec['results']
+        return done
+
+    def record(self, chunk, results):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'chunk': chunk, 'results': results}) + '\n')
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def scan_universe(path, interval='1d', period='6mo', chunk_size=200, workers=None,
+                  rsi_max=70, rsi_min=30, trend_filter=True, resume=True, on_progress=None):
+    """
+    Scan one universe CSV and return the qualifying symbols ranked by breakout strength
+
+    `on_progress(done_chunks, total_chunks)` is called after every chunk.
+    With `resume=False` any saved progress for this configuration is discarded.
+    The table's `attrs['failed_chunks']` counts chunks that could not be
+    downloaded or scanned; their progress is kept for the next run.
+    """
+    rows = load_universe(path)
+    chunks = [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+    params = {'rsi_max': rsi_max, 'rsi_min': rsi_min, 'trend_filter': trend_filter}
+
+    progress = ScanProgress(ScanProgress.key_for(path, interval, period, chunk_size, params))
+    if not resume:
+        progress.clear()
+    done = progress.load()
+
+    def report():
+        if on_progress:
+            on_progress(len(done), len(chunks))
+
+    report()
+    failed = []
+
+    def finish(j, fut):
+        try:
+            done[j] = fut.result()
+        except Exception:
+            logger.exception("Scanning chunk %d of %s failed", j, path)
+            failed.append(j)
+            return
+        progress.record(j, done[j])
+        report()
+
+    pending = [i for i in range(len(chunks)) if i not in done]
+    if pending:
+        # spawn: forking a process that runs server threads is not safe
+        ctx = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            futures = {}
+            for i in pending:
+                # Downloading the next chunk overlaps with the math on earlier ones
+                try:
+                    frames = download_chunk(chunks[i], interval, period)
+                except Exception:
+                    logger.exception("Downloading chunk %d of %s failed", i, path)
+                    failed.append(i)
+                    continue
+                futures[i] = pool.submit(_scan_chunk, frames, params)
+                for j in [j for j, fut in futures.items() if fut.done()]:
+                    finish(j, futures.pop(j))
+            for j, fut in futures.items():
+                finish(j, fut)
+
+    if not failed:
+        # Complete: progress only ever serves an interrupted run
+        progress.clear()
+    results = [hit for chunk in done.values() for hit in chunk]
+    table = pd.DataFrame(results, columns=RESULT_COLUMNS)
+    if not table.empty:
+        table = table.reindex(table['strength_pct'].abs().sort_values(ascending=False).index).reset_index(drop=True)
+    table.attrs['failed_chunks'] = len(failed)
+    return table
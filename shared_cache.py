@@ -0,0 +1,317 @@
+"""
+Shared cross-session cache with single-flight request coalescing.
+
+`st.cache_data` only lives inside one process. `SharedCache` sits under it
+and stores pickled values in a backend that every session and every replica
+can reach:
+
+- `SQLiteBackend`: a local file, shared by replicas on one host
+- `RedisBackend`: anything with redis-py's get/set/delete, including the
+  in-process `LocalRedis` stand-in
+
+Only one fetch per key is in flight at a time. Callers in the same process
+wait on the leader's result; other replicas see the leader's lease in the
+backend and poll for the value instead of fetching it themselves.
+
+A cache with a `namespace` keeps its keys apart from other caches on the
+same backend: the process-wide cache of a replay never reads or writes the
+keys live sessions use (see providers.namespace).
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from providers import namespace
+
+DEFAULT_URL = 'sqlite:///' + os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '.shared_cache', 'cache.sqlite')
+
+
+class LocalRedis:
+    """In-process stand-in for the subset of redis-py the cache uses"""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _live(self, name):
+        item = self._data.get(name)
+        if item and item[1] is not None and item[1] <= time.time():
+            del self._data[name]
+            return None
+        return item
+
+    def get(self, name):
+        with self._lock:
+            item = self._live(name)
+            return item[0] if item else None
+
+    def set(self, name, value, ex=None, nx=False):
+        with self._lock:
+            if nx and self._live(name):
+                return None
+            self._data[name] = (value, time.time() + ex if ex else None)
+            return True
+
+    def delete(self, *names):
+        with self._lock:
+            return sum(self._data.pop(n, None) is not None for n in names)
+
+
+class RedisBackend:
+    """Backend over a Redis-compatible client (redis.Redis, LocalRedis, ...)"""
+
+    def __init__(self, client, prefix='dashboard:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, value, ex=max(1, int(round(ttl))))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def acquire(self, key, ttl):
+        return bool(self.client.set(self.prefix + key, b'1', ex=max(1, int(round(ttl))), nx=True))
+
+    def release(self, key):
+        self.client.delete(self.prefix + key)
+
+
+class SQLiteBackend:
+    """Key/value table in a local SQLite file with per-row expiry"""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as db:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value BLOB, expires REAL)')
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def get(self, key):
+        with self._connect() as db:
+            row = db.execute('SELECT value FROM kv WHERE key = ? AND expires > ?', (key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ttl):
+        with self._connect() as db:
+            db.execute('INSERT OR REPLACE INTO kv VALUES (?, ?, ?)', (key, value, time.time() + ttl))
+
+    def delete(self, key):
+        with self._connect() as db:
+            db.execute('DELETE FROM kv WHERE key = ?', (key,))
+
+    def acquire(self, key, ttl):
+        now = time.time()
+        with self._connect() as db:
+            db.execute('DELETE FROM kv WHERE key = ? AND expires <= ?', (key, now))
+            cur = db.execute('INSERT OR IGNORE INTO kv VALUES (?, ?, ?)', (key, b'1', now + ttl))
+            return cur.rowcount == 1
+
+    def release(self, key):
+        self.delete(key)
+
+
+def make_backend(url=None):
+    """Backend from a URL: sqlite:///path, memory://, or redis://host:port/db"""
+    url = url or DEFAULT_URL
+    if url.startswith('sqlite:///'):
+        return SQLiteBackend(url[len('sqlite:///'):])
+    if url.startswith('memory://'):
+        return RedisBackend(LocalRedis())
+    if url.startswith(('redis://', 'rediss://')):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("redis:// cache URLs need the 'redis' package (pip install redis)") from e
+        return RedisBackend(redis.Redis.from_url(url))
+    raise ValueError(f"Unsupported cache URL: {url}")
+
+
+class _Flight:
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SharedCache:
+    """
+    Read-through cache over a shared backend with single-flight loads
+
+    Entries are fresh for `ttl` seconds. With `max_stale`, expired entries
+    are kept that much longer so a caller passing `allow_stale=True` gets the
+    last value immediately while a background refresher revalidates it.
+
+    A caller may pass `expires`, a function from an entry's store time to the
+    time it goes stale, in place of the fixed TTL (see markets.fresh_until:
+    a closed market's data stays fresh until it reopens).
+
+    Each entry's store time is also kept under `<key>:at`, so `age` (polled
+    every second by the refresher) reads a few bytes instead of the frame.
+    """
+
+    def __init__(self, backend, ttl=110, max_stale=0, lease=30, poll=0.05, namespace=''):
+        self.backend = backend
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.lease = lease
+        self.poll = poll
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'loads': 0, 'coalesced': 0, 'remote_waits': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _key(self, key):
+        return f"{self.namespace}/{key}" if self.namespace else key
+
+    def _read(self, key):
+        """(stored_at, value) or None"""
+        key = self._key(key)
+        try:
+            raw = self.backend.get(key)
+        except Exception:
+            return None
+        return pickle.loads(raw) if raw is not None else None
+
+    def _fresh(self, stored_at, expires=None):
+        if expires is None:
+            return time.time() - stored_at < self.ttl
+        return time.time() < expires(stored_at)
+
+    def _write(self, key, value, expires=None):
+        entry = (time.time(), value)
+        keep = self.ttl if expires is None else max(self.ttl, expires(entry[0]) - entry[0])
+        try:
+            self.backend.set(self._key(key), pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL), keep + self.max_stale)
+            self.backend.set(f"{self._key(key)}:at", repr(entry[0]).encode(), keep + self.max_stale)
+        except Exception:
+            pass  # the backend being down must not break the page
+
+    def age(self, key):
+        """Seconds since `key` was stored, or None if it is not cached"""
+        try:
+            raw = self.backend.get(f"{self._key(key)}:at")
+        except Exception:
+            return None
+        if raw is None:
+            entry = self._read(key)  # missing, or stored before store times were kept apart
+            return None if entry is None else time.time() - entry[0]
+        return time.time() - float(raw)
+
+    def invalidate(self, key):
+        try:
+            self.backend.delete(self._key(key))
+            self.backend.delete(f"{self._key(key)}:at")
+        except Exception:
+            pass
+
+    def get_or_load(self, key, loader, allow_stale=False, expires=None):
+        """Cached value for `key`, calling `loader()` at most once per key across all waiters"""
+        entry = self._read(key)
+        if entry is not None:
+            if self._fresh(entry[0], expires):
+                self._count('hits')
+                return entry[1]
+            if allow_stale:
+                self._count('stale_hits')
+                return entry[1]
+        self._count('misses')
+        return self._flight(key, loader, lambda stored_at: self._fresh(stored_at, expires), expires)
+
+    def refresh(self, key, loader, min_age=0, expires=None):
+        """
+        Reload `key` unless it was stored less than `min_age` seconds ago
+
+        Coalesces with any load already in flight, here or on another replica.
+        """
+        return self._flight(key, loader, lambda stored_at: time.time() - stored_at < min_age, expires)
+
+    def _flight(self, key, loader, fresh, expires=None):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.stats['coalesced'] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = self._load_once(key, loader, fresh, expires)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _load_once(self, key, loader, fresh, expires=None):
+        """Load under a backend lease so other replicas wait instead of fetching too"""
+        # Another flight may have stored a new value since we last looked
+        entry = self._read(key)
+        if entry is not None and fresh(entry[0]):
+            return entry[1]
+
+        lock_key = f"{self._key(key)}:lock"
+        asked = time.time()
+        try:
+            owner = self.backend.acquire(lock_key, self.lease)
+        except Exception:
+            owner = True
+
+        if not owner:
+            self._count('remote_waits')
+            while time.time() < asked + self.lease:
+                time.sleep(self.poll)
+                entry = self._read(key)
+                if entry is not None and entry[0] >= asked:
+                    return entry[1]
+            # The other replica died or is too slow: fetch anyway
+
+        try:
+            self._count('loads')
+            value = loader()
+            self._write(key, value, expires)
+            return value
+        finally:
+            if owner:
+                try:
+                    self.backend.release(lock_key)
+                except Exception:
+                    pass
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def shared_cache():
+    """Process-wide cache configured by DASHBOARD_CACHE_URL (SQLite file by default), namespaced by data mode"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = SharedCache(make_backend(os.environ.get('DASHBOARD_CACHE_URL')), ttl=110, max_stale=600,
+                                   namespace=namespace())
+        return _default
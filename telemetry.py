@@ -0,0 +1,245 @@
+"""
+Per-stage timing spans and counters for the data and render hot path.
+
+Code under measurement wraps each stage in `metrics().span(stage, **labels)`.
+A span records its duration into a per-(stage, labels) histogram, adds any
+numeric fields set on it (rows, bytes, ...) to counters, and, when JSON
+logging is on, writes one log line. The same registry feeds:
+
+- the in-app debug panel (`summary()`, `recent()`)
+- JSON log lines on the 'dashboard.metrics' logger
+- a Prometheus text endpoint (`serve_prometheus`)
+
+Configuration from the environment (`setup_from_env`):
+DASHBOARD_METRICS_LOG   '-' for stderr or a file path for JSON lines
+DASHBOARD_METRICS_PORT  port for the /metrics endpoint (off when unset)
+DASHBOARD_METRICS_HOST  interface to bind (default 127.0.0.1)
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SAMPLES = 256  # recent durations kept per series for the debug panel's percentiles
+
+logger = logging.getLogger('dashboard.metrics')
+
+
+def _key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def _label_text(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    body = ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in pairs)
+    return '{' + body + '}'
+
+
+class _Histogram:
+    __slots__ = ('counts', 'total', 'count', 'recent')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=SAMPLES)
+
+    def add(self, seconds):
+        i = 0
+        while i < len(BUCKETS) and seconds > BUCKETS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.total += seconds
+        self.count += 1
+        self.recent.append(seconds)
+
+
+class Metrics:
+    """Thread-safe registry of stage histograms and labelled counters"""
+
+    def __init__(self, history=200):
+        self._lock = threading.Lock()
+        self._stages = {}  # (stage, label key) -> _Histogram
+        self._counters = {}  # (name, label key) -> float
+        self._collectors = {}  # name -> callable returning {metric: value}
+        self._recent = deque(maxlen=history)
+
+    @contextmanager
+    def span(self, stage, **labels):
+        """
+        Time the enclosed block as `stage`
+
+        Yields a dict; numeric values put in it (rows=..., bytes=...) are
+        added to `dashboard_stage_<field>_total` for this stage and labels.
+        """
+        fields = {}
+        started = time.perf_counter()
+        error = None
+        try:
+            yield fields
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self._record(stage, labels, time.perf_counter() - started, fields, error)
+
+    def _record(self, stage, labels, seconds, fields, error):
+        key = _key(labels)
+        with self._lock:
+            hist = self._stages.get((stage, key))
+            if hist is None:
+                hist = self._stages[(stage, key)] = _Histogram()
+            hist.add(seconds)
+            for name, value in fields.items():
+                if isinstance(value, (int, float)):
+                    ckey = (f"stage_{name}", (('stage', stage),) + key)
+                    self._counters[ckey] = self._counters.get(ckey, 0) + value
+            if error:
+                ckey = ('stage_errors', (('stage', stage),) + key)
+                self._counters[ckey] = self._counters.get(ckey, 0) + 1
+            event = {'ts': time.time(), 'stage': stage, 'ms': round(seconds * 1000, 3), **labels, **fields}
+            if error:
+                event['error'] = error
+            self._recent.append(event)
+
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(event, default=str))
+
+    def count(self, name, value=1, **labels):
+        """Add `value` to the counter `dashboard_<name>_total{labels}`"""
+        ckey = (name, _key(labels))
+        with self._lock:
+            self._counters[ckey] = self._counters.get(ckey, 0) + value
+
+    def add_collector(self, name, fn):
+        """Export `fn()` -> {metric: value} as `dashboard_<name>_<metric>` on every scrape"""
+        with self._lock:
+            self._collectors[name] = fn
+
+    def recent(self, limit=50):
+        """Newest span events first"""
+        with self._lock:
+            return list(self._recent)[::-1][:limit]
+
+    def summary(self):
+        """One row per (stage, labels): count, total, p50/p95 and last duration in ms"""
+        with self._lock:
+            items = [(stage, dict(key), hist.count, hist.total, list(hist.recent))
+                     for (stage, key), hist in self._stages.items()]
+        rows = []
+        for stage, labels, count, total, recent in items:
+            durations = np.array(recent) * 1000
+            rows.append({
+                'stage': stage, **labels, 'count': count, 'total_ms': total * 1000,
+                'p50_ms': float(np.percentile(durations, 50)), 'p95_ms': float(np.percentile(durations, 95)),
+                'last_ms': float(durations[-1]),
+            })
+        return rows
+
+    def counters(self):
+        """[(name, labels, value)] for every counter"""
+        with self._lock:
+            return [(name, dict(key), value) for (name, key), value in self._counters.items()]
+
+    def prometheus_text(self):
+        """Everything in the Prometheus text exposition format"""
+        with self._lock:
+            stages = [(stage, key, list(hist.counts), hist.total, hist.count)
+                      for (stage, key), hist in self._stages.items()]
+            counters = sorted(self._counters.items())
+            collectors = list(self._collectors.items())
+
+        lines = ['# HELP dashboard_stage_seconds Wall-clock time per pipeline stage',
+                 '# TYPE dashboard_stage_seconds histogram']
+        for stage, key, counts, total, count in sorted(stages):
+            labels = (('stage', stage),) + key
+            cumulative = 0
+            for bound, n in zip(BUCKETS + (float('inf'),), counts):
+                cumulative += n
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"dashboard_stage_seconds_bucket{_label_text(labels, [('le', le)])} {cumulative}")
+            lines.append(f"dashboard_stage_seconds_sum{_label_text(labels)} {total}")
+            lines.append(f"dashboard_stage_seconds_count{_label_text(labels)} {count}")
+
+        typed = set()
+        for (name, key), value in counters:
+            metric = f"dashboard_{name}_total"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{_label_text(key)} {value}")
+
+        for name, fn in collectors:
+            try:
+                values = fn()
+            except Exception:
+                continue
+            for metric, value in sorted(values.items()):
+                lines.append(f"# TYPE dashboard_{name}_{metric} gauge")
+                lines.append(f"dashboard_{name}_{metric} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = None
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.registry.prometheus_text().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scrapes every few seconds would flood the app log
+
+
+def serve_prometheus(registry, port, host='127.0.0.1'):
+    """Serve `registry` at http://host:port/metrics from a daemon thread; returns the server"""
+    handler = type('MetricsHandler', (_MetricsHandler,), {'registry': registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
+
+
+def enable_json_log(target='-'):
+    """Write every span as one JSON line to stderr ('-') or a file"""
+    handler = logging.StreamHandler() if target == '-' else logging.FileHandler(target, encoding='utf-8')
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def setup_from_env(registry=None):
+    """Turn on JSON logging and the /metrics endpoint as configured; returns the server or None"""
+    registry = registry or metrics()
+    target = os.environ.get('DASHBOARD_METRICS_LOG')
+    if target:
+        enable_json_log(target)
+    port = os.environ.get('DASHBOARD_METRICS_PORT')
+    if port:
+        return serve_prometheus(registry, int(port), os.environ.get('DASHBOARD_METRICS_HOST', '127.0.0.1'))
+    return None
+
+
+_default = Metrics()
+
+
+def metrics():
+    """Process-wide registry shared by every session"""
+    return _default
@@ -0,0 +1,163 @@
+"""
+Symbol universe from the regional `*/symbols_*.csv` files.
+
+Each CSV lists (exchange, symbol) pairs in the exchange's own notation.
+`yahoo_symbol` turns a pair into the ticker `yf.download` expects, e.g.
+('TSE', '7203') -> '7203.T' and ('SET', 'PTT') -> 'PTT.BK'. Exchanges that
+Yahoo does not carry map to None and are skipped.
+
+`SymbolIndex` holds every Yahoo-listed symbol of every file in a few sorted
+NumPy arrays for prefix, substring and fuzzy search.
+"""
+import csv
+import difflib
+import glob
+import os
+
+import numpy as np
+
+UNIVERSE_DIR = os.path.dirname(os.path.abspath(__file__))
+REGIONS = ['America', 'Asia', 'Europe', 'Africa', 'SouthAmerica']
+
+YAHOO_SUFFIXES = {
+    # Americas
+    'NYSE': '', 'NASDAQ': '', 'AMEX': '', 'CBOE': '',
+    'TSX': '.TO', 'TSXV': '.V', 'CSE': '.CN', 'NEO': '.NE',
+    'BMFBOVESPA': '.SA', 'BMV': '.MX', 'BIVA': '.MX', 'BCBA': '.BA', 'BCS': '.SN',
+    # Asia / Pacific
+    'TSE': '.T', 'SSE': '.SS', 'SZSE': '.SZ', 'HKEX': '.HK', 'KRX': '.KS',
+    'NSE': '.NS', 'BSE': '.BO', 'ASX': '.AX', 'NZX': '.NZ',
+    'TWSE': '.TW', 'TPEX': '.TWO', 'MYX': '.KL', 'SGX': '.SI', 'IDX': '.JK',
+    'SET': '.BK', 'HOSE': '.VN',
+    # Europe
+    'LSE': '.L', 'XETR': '.DE', 'FWB': '.F', 'BER': '.BE', 'DUS': '.DU', 'MUN': '.MU', 'SWB': '.SG',
+    'MIL': '.MI', 'BME': '.MC', 'SIX': '.SW', 'VIE': '.VI',
+    'OMXSTO': '.ST', 'OMXHEX': '.HE', 'OMXCOP': '.CO', 'OMXICE': '.IC',
+    'OMXTSE': '.TL', 'OMXRSE': '.RG', 'OMXVSE': '.VS', 'OSL': '.OL',
+    'GPW': '.WA', 'NEWCONNECT': '.WA', 'BIST': '.IS', 'ATHEX': '.AT',
+    'BVB': '.RO', 'BET': '.BD', 'PSECZ': '.PR', 'RUS': '.ME',
+    # Middle East / Africa
+    'TASE': '.TA', 'TADAWUL': '.SR', 'QSE': '.QA', 'KSE': '.KW', 'EGX': '.CA', 'JSE': '.JO',
+}
+
+# Euronext is one exchange code spread over several Yahoo suffixes
+EURONEXT_SUFFIXES = {'FRA': '.PA', 'NLD': '.AS', 'BEL': '.BR', 'PRT': '.LS', 'IRL': '.IR'}
+
+
+def yahoo_symbol(exchange, symbol, country=None):
+    """Yahoo ticker for an (exchange, symbol) pair, or None if Yahoo does not list it"""
+    if exchange == 'EURONEXT':
+        suffix = EURONEXT_SUFFIXES.get(country)
+    else:
+        suffix = YAHOO_SUFFIXES.get(exchange)
+    if suffix is None:
+        return None
+
+    if exchange == 'HKEX' and symbol.isdigit():
+        symbol = symbol.zfill(4)
+    # Share classes: BRK.B -> BRK-B, BT.A -> BT-A.L
+    symbol = symbol.replace('.', '-')
+    return f"{symbol}{suffix}"
+
+
+def country_of(path):
+    """'Asia/symbols_TH.csv' -> 'TH'"""
+    return os.path.splitext(os.path.basename(path))[0].split('_', 1)[1]
+
+
+def universe_files(root=UNIVERSE_DIR):
+    """{'Asia/symbols_TH.csv': absolute path, ...} for every region CSV"""
+    files = {}
+    for region in REGIONS:
+        for path in sorted(glob.glob(os.path.join(root, region, 'symbols_*.csv'))):
+            files[os.path.relpath(path, root)] = path
+    return files
+
+
+def load_universe(path):
+    """List of (exchange, symbol, yahoo_ticker) rows from one CSV, Yahoo-listed only"""
+    country = country_of(path)
+    rows = []
+    with open(path, newline='', encoding='utf-8') as f:
+        for rec in csv.DictReader(f):
+            ticker = yahoo_symbol(rec['exchange'], rec['symbol'], country)
+            if ticker:
+                rows.append((rec['exchange'], rec['symbol'], ticker))
+    return rows
+
+
+class SymbolIndex:
+    """
+    Sorted, array-backed table of (exchange, symbol, Yahoo ticker)
+
+    Rows are sorted by upper-cased symbol, so a prefix lookup is two binary
+    searches. Exchanges are stored once and referenced by a small int id.
+    """
+
+    def __init__(self, rows):
+        rows = sorted(rows, key=lambda r: (r[1].upper(), r[0]))
+        self.exchanges = sorted({r[0] for r in rows})
+        ids = {name: i for i, name in enumerate(self.exchanges)}
+        self.exchange_ids = np.array([ids[r[0]] for r in rows], dtype=np.int16)
+        self.symbols = np.array([r[1] for r in rows], dtype=str)
+        self.tickers = np.array([r[2] for r in rows], dtype=str)
+        self.keys = np.char.upper(self.symbols)
+        self.ticker_keys = np.char.upper(self.tickers)
+
+    @classmethod
+    def build(cls, root=UNIVERSE_DIR):
+        rows = []
+        for path in universe_files(root).values():
+            rows.extend(load_universe(path))
+        return cls(rows)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def row(self, i):
+        return self.exchanges[self.exchange_ids[i]], str(self.symbols[i]), str(self.tickers[i])
+
+    def search(self, query, limit=10):
+        """
+        Best matches for `query` as (exchange, symbol, ticker) rows
+
+        Prefix matches come first, then symbols containing the query, then
+        close spellings (same first letter, similar length).
+        """
+        q = query.strip().upper()
+        if not q:
+            return []
+        if '.' in q:
+            # A full Yahoo ticker such as PTT.BK, or a share class written
+            # the way `yahoo_symbol` normalizes it (BRK.B -> BRK-B, BT.A.L
+            # -> BT-A.L): match it directly before dropping the suffix
+            head, _, tail = q.rpartition('.')
+            tickers = {q, q.replace('.', '-'), f"{head.replace('.', '-')}.{tail}"}
+            symbols = {q, q.replace('.', '-')}
+            exact = np.flatnonzero(np.isin(self.ticker_keys, list(tickers))
+                                   | np.isin(self.keys, list(symbols)))
+            if len(exact):
+                return [self.row(i) for i in exact[:limit]]
+            q = q.split('.', 1)[0]
+
+        lo = int(np.searchsorted(self.keys, q, side='left'))
+        hi = int(np.searchsorted(self.keys, q + '\uffff', side='left'))
+        hits = list(range(lo, min(hi, lo + limit)))
+
+        if len(hits) < limit:
+            inside = np.flatnonzero(np.char.find(self.keys, q) > 0)
+            hits.extend(inside[:limit - len(hits)].tolist())
+
+        if len(hits) < limit:
+            first = int(np.searchsorted(self.keys, q[0], side='left'))
+            last = int(np.searchsorted(self.keys, q[0] + '\uffff', side='left'))
+            pool = {str(k) for k in self.keys[first:last] if abs(len(k) - len(q)) <= 2}
+            seen = set(hits)
+            for key in difflib.get_close_matches(q, pool, n=limit, cutoff=0.6):
+                start = int(np.searchsorted(self.keys, key, side='left'))
+                stop = int(np.searchsorted(self.keys, key, side='right'))
+                hits.extend(i for i in range(start, stop) if i not in seen)
+                if len(hits) >= limit:
+                    break
+
+        return [self.row(i) for i in hits[:limit]]